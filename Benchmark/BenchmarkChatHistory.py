@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Compare fetching the whole chat document and slicing in Python with the server-side $slice projection
+used by get_chat_by_userid, on documents with long histories.
+
+Needs a MongoDB at MONGO_URI (a throwaway "saleadvisor_benchmark" database is used and dropped).
+With --offline only the client-side cost (BSON size and decoding) is measured, without a server.
+
+Run from the repository root:
+    python -m Benchmark.BenchmarkChatHistory --messages 2000 --rounds 200
+    python -m Benchmark.BenchmarkChatHistory --offline
+"""
+import argparse
+import time
+
+import bson
+
+from Database.Connection import get_client, CHAT_HISTORY_LIMIT
+
+BENCHMARK_DATABASE_NAME = "saleadvisor_benchmark"
+
+
+def build_chat(user_id: str, message_count: int) -> dict:
+    text = "Dạ bên em có liệu trình bấm huyệt trị liệu giúp giảm đau mỏi vai gáy rất hiệu quả ạ. " * 3
+    return {
+        "user_id": user_id,
+        "messages": [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{i} {text}"}
+                     for i in range(message_count)],
+    }
+
+
+def timed(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def run_offline(chat: dict, rounds: int):
+    full = bson.encode(chat)
+    sliced = bson.encode({**chat, "messages": chat["messages"][-CHAT_HISTORY_LIMIT:]})
+    full_ms = timed(lambda: bson.decode(full)["messages"][-CHAT_HISTORY_LIMIT:], rounds)
+    sliced_ms = timed(lambda: bson.decode(sliced)["messages"], rounds)
+    return (len(full), full_ms), (len(sliced), sliced_ms)
+
+
+def run_mongo(chat: dict, rounds: int):
+    client = get_client()
+    collection = client[BENCHMARK_DATABASE_NAME]["chat"]
+    collection.drop()
+    collection.create_index("user_id", unique=True)
+    collection.insert_one(dict(chat))
+    user_id = chat["user_id"]
+    try:
+        def fetch_full():
+            document = collection.find_one({"user_id": user_id}, {"_id": 0})
+            return document["messages"][-CHAT_HISTORY_LIMIT:]
+
+        def fetch_sliced():
+            return collection.find_one({"user_id": user_id},
+                                       {"_id": 0, "messages": {"$slice": -CHAT_HISTORY_LIMIT}})["messages"]
+
+        assert fetch_full() == fetch_sliced()
+        full_size = len(bson.encode(collection.find_one({"user_id": user_id}, {"_id": 0})))
+        sliced_size = len(bson.encode(collection.find_one(
+            {"user_id": user_id}, {"_id": 0, "messages": {"$slice": -CHAT_HISTORY_LIMIT}})))
+        return (full_size, timed(fetch_full, rounds)), (sliced_size, timed(fetch_sliced, rounds))
+    finally:
+        client.drop_database(BENCHMARK_DATABASE_NAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--offline", action="store_true")
+    args = parser.parse_args()
+
+    chat = build_chat("benchmark-user", args.messages)
+    (full_size, full_ms), (sliced_size, sliced_ms) = (run_offline if args.offline else run_mongo)(chat, args.rounds)
+
+    print(f"{args.messages} stored messages, last {CHAT_HISTORY_LIMIT} needed"
+          f"{' (offline: BSON decode only)' if args.offline else ''}")
+    print(f"Whole document : {full_size / 1024:8.1f} KiB, {full_ms:7.3f} ms per fetch")
+    print(f"$slice         : {sliced_size / 1024:8.1f} KiB, {sliced_ms:7.3f} ms per fetch")
+
+
+if __name__ == '__main__':
+    main()
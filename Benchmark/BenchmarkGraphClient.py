@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Compare Graph API send throughput: a new connection per call (plain requests.post), the pooled
+keep-alive GraphHttpClient used by MessageClient, and the asyncio AsyncMessageClient, against a local stub Graph API.
+
+Run from the repository root:
+    python -m Benchmark.BenchmarkGraphClient --messages 200 --latency 0.02 --connect-delay 0.1
+"""
+import argparse
+import asyncio
+import shutil
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from Benchmark.FakeGraphServer import FakeGraphServer
+from Service.MessageService.AsyncMessageClient import AsyncMessageClient
+from Service.MessageService.GraphHttpClient import GraphHttpClient
+
+
+def run_threads(send, messages: int, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(messages)))
+    return time.perf_counter() - started
+
+
+def bench_unpooled(server, messages, concurrency) -> float:
+    url = f"{server.base_url}/v21.0/me/messages"
+
+    def send(i):
+        requests.post(url, json={"recipient": {"id": str(i)}, "message": {"text": "hi"}},
+                      verify=server.cert_file or True).raise_for_status()
+
+    return run_threads(send, messages, concurrency)
+
+
+def bench_pooled(server, messages, concurrency) -> float:
+    url = f"{server.base_url}/v21.0/me/messages"
+    client = GraphHttpClient()
+
+    def send(i):
+        client.request("POST", url, json={"recipient": {"id": str(i)}, "message": {"text": "hi"}},
+                       verify=server.cert_file or True).raise_for_status()
+
+    return run_threads(send, messages, concurrency)
+
+
+async def bench_async(server, messages, concurrency) -> float:
+    async with AsyncMessageClient("token", "page", graph_base_url=server.base_url, pool_size=concurrency,
+                                  verify=ssl.create_default_context(cafile=server.cert_file)
+                                  if server.cert_file else True) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client.send_message(str(i), "hi") for i in range(messages)))
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--connect-delay", type=float, default=0.1,
+                        help="Simulated handshake round trips per new connection, in seconds")
+    parser.add_argument("--no-tls", action="store_true", help="Plain HTTP, e.g. when openssl is not installed")
+    args = parser.parse_args()
+    tls = not args.no_tls and shutil.which("openssl") is not None
+
+    print(f"{args.messages} messages, concurrency {args.concurrency}, "
+          f"{args.latency * 1000:.0f} ms stub latency, {args.connect_delay * 1000:.0f} ms connect delay, "
+          f"{'HTTPS' if tls else 'HTTP'}")
+    for name, bench in [("New connection per call", bench_unpooled), ("Pooled session", bench_pooled),
+                        ("Async client", lambda s, m, c: asyncio.run(bench_async(s, m, c)))]:
+        with FakeGraphServer(latency_seconds=args.latency, tls=tls, connect_delay_seconds=args.connect_delay) as server:
+            elapsed = bench(server, args.messages, args.concurrency)
+            print(f"{name:<24}: {args.messages / elapsed:7.1f} msg/s, {server.connection_count} connections")
+
+
+if __name__ == '__main__':
+    main()
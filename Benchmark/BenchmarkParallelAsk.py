@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Measure end-to-end latency of answering a multi-question message sequentially
+versus with the concurrent fan-out, against a local fake OpenAI server.
+
+Run from the repository root:
+    python -m Benchmark.BenchmarkParallelAsk --questions 4 --latency 0.5
+"""
+import argparse
+import time
+
+import openai
+
+from Benchmark.FakeOpenAIServer import FakeOpenAIServer
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+
+
+def measure(service: OpenAIChatService, questions: list, rounds: int) -> float:
+    system_message = {"role": "system", "content": "Bạn là trợ lý tư vấn."}
+    started = time.perf_counter()
+    for _ in range(rounds):
+        replies = service.complete_questions(questions, system_message, chat_history=[], functions=[
+            {"name": "noop", "parameters": {"type": "object", "properties": {}}}
+        ])
+        assert len(replies) == len(questions)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    questions = [f"Câu hỏi số {i}" for i in range(args.questions)]
+    with FakeOpenAIServer(latency_seconds=args.latency) as server:
+        openai.api_base = server.api_base
+        # The response cache would answer repeated rounds locally, so only the fan-out is measured
+        sequential = measure(OpenAIChatService("dummy", "fake", max_parallel_requests=1, enable_response_cache=False),
+                             questions, args.rounds)
+        parallel = measure(OpenAIChatService("dummy", "fake", max_parallel_requests=args.concurrency,
+                                             enable_response_cache=False), questions, args.rounds)
+
+    print(f"{args.questions} questions, {args.latency:.2f}s simulated OpenAI latency")
+    print(f"Sequential : {sequential:.3f} s per message")
+    print(f"Parallel   : {parallel:.3f} s per message (concurrency {args.concurrency})")
+    print(f"Reduction  : {(1 - parallel / sequential) * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Measure time-to-first-message for a long answer with and without streaming the first paragraph,
+against a local fake OpenAI server that emits one word per chunk.
+
+Run from the repository root:
+    python -m Benchmark.BenchmarkStreaming --paragraphs 4 --token-delay 0.02
+"""
+import argparse
+import time
+
+import openai
+
+from Benchmark.FakeOpenAIServer import FakeOpenAIServer
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+
+
+def build_reply(paragraphs: int) -> str:
+    sentence = "Dạ bên em có liệu trình bấm huyệt trị liệu giúp giảm đau mỏi vai gáy rất hiệu quả ạ."
+    return "\n\n".join(" ".join([sentence] * 3) for _ in range(paragraphs))
+
+
+def time_to_first_message(service: OpenAIChatService, stream: bool) -> tuple:
+    system_message = {"role": "system", "content": "Bạn là trợ lý tư vấn."}
+    first_sent_at = []
+    started = time.perf_counter()
+    service.complete_question("Liệu trình bấm huyệt thế nào?", system_message, chat_history=[], functions=[
+        {"name": "noop", "parameters": {"type": "object", "properties": {}}}
+    ], on_first_block=(lambda block: first_sent_at.append(time.perf_counter())) if stream else None)
+    finished = time.perf_counter()
+    return (first_sent_at[0] if first_sent_at else finished) - started, finished - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=4)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency_seconds=args.latency, reply=build_reply(args.paragraphs),
+                          token_delay_seconds=args.token_delay) as server:
+        openai.api_base = server.api_base
+        service = OpenAIChatService("dummy", "fake", enable_response_cache=False)
+        blocking_first, blocking_total = time_to_first_message(service, stream=False)
+        streaming_first, streaming_total = time_to_first_message(service, stream=True)
+
+    print(f"{args.paragraphs} paragraphs, {args.token_delay * 1000:.0f} ms per token")
+    print(f"Full completion   : first message after {blocking_first:.2f} s (total {blocking_total:.2f} s)")
+    print(f"Stream first block: first message after {streaming_first:.2f} s (total {streaming_total:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
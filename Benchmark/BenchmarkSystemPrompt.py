@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the per-message CPU cost of rendering the system prompt on every call
+against reusing the prompt precompiled once per config version.
+
+Run from the repository root:
+    python -m Benchmark.BenchmarkSystemPrompt --entries 2000 --iterations 200
+"""
+import argparse
+import time
+
+import Service.ChatService.OpenAIChatService as chat_module
+from Database.Connection import config_cache
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+
+
+def build_faq(entries: int) -> list:
+    faq = []
+    for i in range(entries):
+        if i % 3 == 0:
+            answer = [{"tên": f"Dịch vụ {i}-{j}", "giá": f"{300 + j}.000đ/1 suất", "thời_gian": f"{30 + j} phút"}
+                      for j in range(5)]
+        elif i % 3 == 1:
+            answer = {"địa chỉ": f"Số {i} đường Lê Lợi", "giờ mở cửa": "8h - 20h"}
+        else:
+            answer = f"Câu trả lời mẫu số {i} cho khách hàng."
+        faq.append({"question": f"Câu hỏi số {i}?", "answer": answer})
+    return faq
+
+
+def measure(func, iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Serve synthetic config instead of MongoDB so only rendering is measured
+    faq = build_faq(args.entries)
+    chat_module.get_faq = lambda: faq
+    chat_module.get_prompt = lambda: "Bạn là trợ lý tư vấn của phòng khám."
+    chat_module.get_welcome_prompt = lambda: "Hãy chào khách hàng mới."
+    config_cache.invalidate()
+
+    service = OpenAIChatService(openai_key="dummy", model="dummy")
+    before = measure(lambda: service.render_system_prompt(include_welcome=False), args.iterations)
+    after = measure(lambda: service.get_system_prompt(include_welcome=False), args.iterations)
+    prompt_size = len(service.get_system_prompt(include_welcome=False))
+
+    print(f"FAQ entries: {args.entries} | prompt size: {prompt_size} chars")
+    print(f"Render per message : {before:.3f} ms CPU")
+    print(f"Precompiled prompt : {after:.4f} ms CPU")
+    print(f"Speed-up           : {before / after if after else float('inf'):.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Compare FAQ retrieval (top-k BM25 sections) against sending the whole FAQ in every prompt.
+
+Reports, per mode, how often the expected FAQ section is in the prompt (recall) and the average FAQ prompt size.
+With --with-llm the questions are also answered by OpenAI and an answer counts as correct when it contains every
+`expected_answer_contains` string (needs OPENAI_API_KEY).
+
+The dataset is a JSON file with "questions" and optionally "faq" (documents shaped like the faq collection);
+without "faq" the FAQ is read from MongoDB.
+
+Run from the repository root:
+    python -m Benchmark.EvaluateFaqRetrieval --top-k 1 3 5
+    python -m Benchmark.EvaluateFaqRetrieval --dataset my_eval.json --with-llm --model gpt-4o-mini
+"""
+import argparse
+import json
+import os
+
+import openai
+
+from Service.ChatService.ContextBuilder import ContextBuilder, estimate_tokens
+from Service.ChatService.FaqRetriever import FaqRetriever
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(__file__), "faq_eval_sample.json")
+SYSTEM_PROMPT = "Bạn là nhân viên tư vấn. Chỉ trả lời dựa trên các thông tin FAQ có sẵn là:\n"
+
+
+def load_faq_sections(service: OpenAIChatService, dataset: dict) -> dict:
+    if "faq" in dataset:
+        faq = dataset["faq"]
+    else:
+        from Database.Connection import get_faq
+        faq = get_faq()
+    return {question: service.format_faq_data({question: answer})
+            for question, answer in service.filter_faq_data(faq).items()}
+
+
+def answer_is_correct(service: OpenAIChatService, faq_text: str, item: dict) -> bool:
+    response = openai.ChatCompletion.create(
+        model=service.model,
+        messages=[{"role": "system", "content": SYSTEM_PROMPT + faq_text},
+                  {"role": "user", "content": item["question"]}],
+        temperature=0,
+    )
+    answer = response['choices'][0]['message']['content'].lower()
+    return all(expected.lower() in answer for expected in item.get("expected_answer_contains", []))
+
+
+def evaluate(service, sections, questions, top_k, faq_token_budget, with_llm) -> dict:
+    full_text = "\n".join(sections.values())
+    retriever = FaqRetriever(sections)
+    builder = ContextBuilder(faq_token_budget=faq_token_budget)
+    found, tokens, correct = 0, 0, 0
+    for item in questions:
+        faq_text = builder.select_faq(item["question"], retriever, top_k) if top_k else full_text
+        found += all(sections.get(title, "\0") in faq_text for title in item.get("expected_sections", []))
+        tokens += estimate_tokens(faq_text)
+        if with_llm:
+            correct += answer_is_correct(service, faq_text, item)
+    return {
+        "recall": found / len(questions),
+        "avg_faq_tokens": tokens / len(questions),
+        "accuracy": correct / len(questions) if with_llm else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--faq-budget", type=int, default=2500)
+    parser.add_argument("--with-llm", action="store_true")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        dataset = json.load(f)
+    service = OpenAIChatService(os.getenv("OPENAI_API_KEY", "dummy"), args.model)
+    sections = load_faq_sections(service, dataset)
+    questions = dataset["questions"]
+
+    print(f"{len(sections)} FAQ sections, {len(questions)} questions")
+    print(f"{'mode':<10}{'recall':>8}{'faq tokens':>12}{'accuracy':>10}")
+    for top_k in [0] + args.top_k:
+        result = evaluate(service, sections, questions, top_k, args.faq_budget, args.with_llm)
+        accuracy = f"{result['accuracy']:.0%}" if result["accuracy"] is not None else "-"
+        mode = f"top-{top_k}" if top_k else "full"
+        print(f"{mode:<10}{result['recall']:>8.0%}{result['avg_faq_tokens']:>12.0f}{accuracy:>10}")
+
+
+if __name__ == '__main__':
+    main()
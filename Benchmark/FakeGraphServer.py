@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal local stand-in for the Facebook Graph API endpoints used by MessageClient, used by the benchmarks.
+
+With tls=True it serves HTTPS with a throwaway self-signed certificate (needs the openssl CLI), so the cost of
+a TLS handshake per request shows up like it does against graph.facebook.com.
+"""
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class FakeGraphServer:
+    def __init__(self, latency_seconds=0.02, tls=False, fail_every=0, connect_delay_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        # Simulated TCP + TLS round trips of a new connection over a real network
+        self.connect_delay_seconds = connect_delay_seconds
+        # Answer every Nth request with a 429 to exercise the retries
+        self.fail_every = fail_every
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._cert_dir = None
+        self.cert_file = None
+        if tls:
+            self._enable_tls()
+
+    @property
+    def base_url(self):
+        scheme = "https" if self.cert_file else "http"
+        return f"{scheme}://127.0.0.1:{self._server.server_address[1]}"
+
+    def _enable_tls(self):
+        self._cert_dir = tempfile.TemporaryDirectory()
+        self.cert_file = os.path.join(self._cert_dir.name, "cert.pem")
+        key_file = os.path.join(self._cert_dir.name, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-keyout", key_file, "-out", self.cert_file, "-subj", "/CN=127.0.0.1",
+                        "-addext", "subjectAltName=IP:127.0.0.1"], check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file, key_file)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+
+    def _build_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real Graph API
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connection_count += 1
+                time.sleep(fake.connect_delay_seconds)
+
+            def _reply(self, payload):
+                with fake._lock:
+                    fake.request_count += 1
+                    failing = fake.fail_every and fake.request_count % fake.fail_every == 0
+                time.sleep(fake.latency_seconds)
+                status = 429 if failing else 200
+                body = json.dumps({"error": {"message": "Rate limited"}} if failing else payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                recipient_id = request.get("recipient", {}).get("id")
+                self._reply({"recipient_id": recipient_id, "message_id": f"m_{fake.request_count}"})
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path.endswith("/me/conversations"):
+                    self._reply({"data": [{"id": "t_1"}]})
+                else:
+                    self._reply({"id": "t_1", "participants": {"data": [
+                        {"id": "user", "name": "Nguyễn Văn A"}, {"id": "page", "name": "Page"}]}})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._cert_dir:
+            self._cert_dir.cleanup()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal local stand-in for the OpenAI chat completions API, used by the benchmarks.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    def __init__(self, latency_seconds=0.5, reply="Dạ, em xin gửi thông tin ạ.", token_delay_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.reply = reply
+        self.token_delay_seconds = token_delay_seconds
+        self.request_count = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _build_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                fake.request_count += 1
+                time.sleep(fake.latency_seconds)
+
+                if request.get("stream"):
+                    self._stream(request)
+                    return
+
+                # A full completion is only returned once every token has been generated
+                time.sleep(fake.token_delay_seconds * len(re.findall(r"\S+\s*", fake.reply)))
+                body = json.dumps({
+                    "id": f"chatcmpl-{fake.request_count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request):
+                # Server-sent events, one word per chunk, like the real streaming API
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for token in re.findall(r"\S+\s*", fake.reply):
+                    chunk = {
+                        "id": f"chatcmpl-{fake.request_count}",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(fake.token_delay_seconds)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from Database.Connection import get_database
+
+FOLLOW_UP_CHECKPOINT_COLLECTION_NAME = "follow_up_checkpoints"
+
+
+class CampaignCheckpoint:
+    """
+    Per-user progress of a campaign run stored in MongoDB, so a crashed or restarted run skips the users
+    already handled. Documents expire through a TTL index once the campaign is over.
+    """
+
+    def __init__(self, ttl_seconds=7 * 24 * 3600, database_provider=get_database):
+        self.ttl_seconds = ttl_seconds
+        self.database_provider = database_provider
+        self._indexes_ready = False
+
+    def _collection(self):
+        collection = self.database_provider()[FOLLOW_UP_CHECKPOINT_COLLECTION_NAME]
+        if not self._indexes_ready:
+            collection.create_index("updated_at", expireAfterSeconds=self.ttl_seconds)
+            collection.create_index([("campaign_id", 1), ("status", 1)])
+            self._indexes_ready = True
+        return collection
+
+    def completed_user_ids(self, campaign_id) -> set:
+        cursor = self._collection().find({"campaign_id": campaign_id, "status": "sent"}, {"_id": 0, "user_id": 1})
+        return {item["user_id"] for item in cursor}
+
+    def mark(self, campaign_id, user_id, status, error=None):
+        self._collection().update_one(
+            {"_id": f"{campaign_id}:{user_id}"},
+            {"$set": {"campaign_id": campaign_id, "user_id": user_id, "status": status, "error": error,
+                      "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
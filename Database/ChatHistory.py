@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from Database.Connection import get_chat_by_userid
+
+
+class ChatHistory:
+    """
+    Chat history of one user for one turn, loaded at most once and shared by everything handling the turn.
+    """
+
+    def __init__(self, user_id, loader=get_chat_by_userid):
+        self.user_id = user_id
+        self.loader = loader
+        self._messages = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return the stored messages (None for a user without chat), loading them on first use.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._messages = self.loader(self.user_id)
+                self._loaded = True
+            return self._messages
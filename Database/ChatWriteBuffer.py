@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from Database.Connection import post_chat
+
+
+class ChatWriteBuffer:
+    """
+    Messages of one conversation turn, written to the chat collection with a single post_chat upsert.
+
+    The customer message is recorded once per turn, however many answers the turn produces.
+    """
+
+    def __init__(self, user_id, writer=post_chat):
+        self.user_id = user_id
+        self.writer = writer
+        self.messages = []
+        self._user_messages = set()
+        self._touch = False
+
+    def add_user_message(self, content):
+        if content in self._user_messages:
+            return
+        self._user_messages.add(content)
+        self.messages.append({"role": "user", "content": content})
+        # Only customer messages move updated_at, which drives the follow-up schedule
+        self._touch = True
+
+    def add_assistant_message(self, content):
+        self.messages.append({"role": "assistant", "content": content})
+
+    def flush(self):
+        if not self.messages:
+            return
+        messages, self.messages = self.messages, []
+        try:
+            self.writer(self.user_id, messages, is_update=self._touch)
+        except Exception as e:
+            print(f"❌ Error saving chat for {self.user_id}: {e}")
+        self._touch = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
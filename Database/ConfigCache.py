@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import functools
+import threading
+import time
+
+
+class ConfigCache:
+    """
+    In-process cache for static configuration (prompts, FAQ, functions, keywords).
+
+    Entries expire after `ttl_seconds`. A background watcher invalidates every entry as soon as the
+    configuration version changes, either from a MongoDB change stream or by polling a version counter,
+    so reads on the hot path never touch the database.
+    """
+
+    def __init__(self, ttl_seconds=3600, version_check_seconds=30, version_loader=None, change_stream_factory=None):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.version_loader = version_loader
+        self.change_stream_factory = change_stream_factory
+        self.version = None
+        self._entries = {}
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader` when it is missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._counters["hits"] += 1
+                return entry[0]
+            self._counters["misses"] += 1
+            generation = self._counters["invalidations"]
+
+        value = loader()
+
+        with self._lock:
+            # Drop values loaded before an invalidation that happened while we were loading
+            if generation == self._counters["invalidations"]:
+                self._entries[key] = (value, now)
+        return value
+
+    def cached(self, func):
+        """
+        Decorator caching `func` results by function name and positional arguments.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            return self.get((func.__name__,) + args, lambda: func(*args))
+
+        wrapper.uncached = func
+        return wrapper
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of invalidations so far, whatever triggered them (version poll, change stream, refresh).
+        Caches derived from the configuration can scope their entries to it.
+        """
+        with self._lock:
+            return self._counters["invalidations"]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def refresh(self):
+        """
+        Drop every entry and re-read the configuration version.
+        """
+        self.invalidate()
+        if self.version_loader:
+            try:
+                self.version = self.version_loader()
+            except Exception as e:
+                print(f"❌ Error reading config version: {e}")
+        print(f"🔄 Config cache refreshed (version: {self.version})")
+
+    def check_version(self):
+        """
+        Invalidate the cache when the stored configuration version differs from the cached one.
+        """
+        if not self.version_loader:
+            return False
+        current_version = self.version_loader()
+        if current_version != self.version:
+            self.invalidate()
+            print(f"🔄 Config version changed {self.version} -> {current_version}, cache invalidated")
+            self.version = current_version
+            return True
+        return False
+
+    def start_watcher(self):
+        """
+        Start the background thread that keeps the cache in sync with the database.
+        """
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="config-cache-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_event.set()
+
+    def _watch(self):
+        if self.change_stream_factory and self._watch_change_stream():
+            return
+        self._poll_version()
+
+    def _watch_change_stream(self):
+        # Change streams need a replica set; return False so the caller falls back to polling
+        try:
+            with self.change_stream_factory() as stream:
+                print("👀 Config cache is watching MongoDB change stream")
+                self.invalidate()
+                while not self._stop_event.is_set() and stream.alive:
+                    change = stream.try_next()
+                    if change is None:
+                        self._stop_event.wait(1)
+                        continue
+                    self.invalidate()
+                    print(f"🔄 Config changed ({change.get('ns', {}).get('coll')}), cache invalidated")
+            return self._stop_event.is_set()
+        except Exception as e:
+            print(f"⚠️ Config change stream unavailable, polling version instead: {e}")
+            return False
+
+    def _poll_version(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check_version()
+            except Exception as e:
+                print(f"❌ Error checking config version: {e}")
+            self._stop_event.wait(self.version_check_seconds)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                **self._counters,
+            }
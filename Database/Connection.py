@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime
+import os
+import threading
+import time
+from datetime import datetime, timedelta
 
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import OperationFailure
+
+from Database.ConfigCache import ConfigCache
 
 # MongoDB connection URI
-MONGO_URI = "mongodb://localhost:27017"  # Replace with your MongoDB URI
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")  # Replace with your MongoDB URI
 DATABASE_NAME = "saleadvisor"
 CONFIG_COLLECTION_NAME = "config"
 FUNCTION_COLLECTION_NAME = "functions"
@@ -12,12 +18,229 @@ CONSTANT_MESSAGE_COLLECTION_NAME = "constant_message"
 FAQ_COLLECTION_NAME = "faq"
 PROMPT_COLLECTION_NAME = "prompt"
 CHAT_COLLECTION_NAME = "chat"
+CLASSIFIED_MESSAGE_COLLECTION_NAME = "classified_messages"
+USER_PROFILE_COLLECTION_NAME = "user_profiles"
+
+# Connection pool settings (override with environment variables)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+# Messages sent to the model as chat history
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "20"))
+# Messages kept per chat document: never fewer than the history read back
+CHAT_STORED_MESSAGES_LIMIT = max(20, CHAT_HISTORY_LIMIT)
+
+# Above this many users the inactivity scan filters client-side instead of sending a $in list
+INACTIVITY_IN_QUERY_LIMIT = int(os.getenv("INACTIVITY_IN_QUERY_LIMIT", "5000"))
+
+# Facebook user names change rarely; re-fetch them after this long
+USER_PROFILE_TTL_SECONDS = int(os.getenv("USER_PROFILE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Static config cache settings
+CONFIG_CACHE_TTL_SECONDS = int(os.getenv("CONFIG_CACHE_TTL_SECONDS", "3600"))
+CONFIG_VERSION_CHECK_SECONDS = int(os.getenv("CONFIG_VERSION_CHECK_SECONDS", "30"))
+CONFIG_WATCHED_COLLECTIONS = [
+    CONFIG_COLLECTION_NAME,
+    FUNCTION_COLLECTION_NAME,
+    CONSTANT_MESSAGE_COLLECTION_NAME,
+    FAQ_COLLECTION_NAME,
+    PROMPT_COLLECTION_NAME,
+]
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Count connection pool events so the pool can be inspected from the health endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checked_out": 0,
+            "pool_cleared": 0,
+        }
+
+    def _increment(self, key, value=1):
+        with self._lock:
+            self.counters[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._increment("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._increment("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._increment("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._increment("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._increment("checkouts")
+        self._increment("checked_out")
+
+    def connection_checked_in(self, event):
+        self._increment("checked_out", -1)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_pool_metrics = PoolMetricsListener()
+
+
+def _reset_client_after_fork():
+    # The parent's sockets must not be shared with a forked gunicorn worker
+    global _client, _client_pid, _client_lock, _pool_metrics
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    _pool_metrics = PoolMetricsListener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+def get_client() -> MongoClient:
+    """
+    Return the process-wide pooled MongoClient, creating it on first use.
+
+    The client is recreated when the process id changes, so each gunicorn worker owns its own pool.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[_pool_metrics],
+            )
+            _client_pid = pid
+        return _client
+
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+def close_client():
+    """
+    Close the pooled client, e.g. on worker shutdown.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def get_mongo_pool_metrics() -> dict:
+    """
+    Return the pool configuration and connection counters for this process.
+    """
+    return {
+        "pid": os.getpid(),
+        "client_initialized": _client is not None and _client_pid == os.getpid(),
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        **_pool_metrics.snapshot(),
+    }
+
+
+def check_mongo_health() -> dict:
+    """
+    Ping MongoDB using the pooled client and report the round-trip time.
+    """
+    started = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+        latency_ms = (time.perf_counter() - started) * 1000
+        return {"status": "ok", "latency_ms": round(latency_ms, 2)}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+def get_config_version():
+    """
+    Read the configuration version counter stored in the config collection.
+    """
+    db = get_database()
+    collection = db[CONFIG_COLLECTION_NAME]
+
+    config = collection.find_one({}, {"_id": 0, "config_version": 1})
+
+    return (config or {}).get("config_version", 0)
+
+
+def bump_config_version():
+    """
+    Increment the configuration version so every worker drops its cached config.
+    """
+    db = get_database()
+    collection = db[CONFIG_COLLECTION_NAME]
+
+    collection.update_one({}, {"$inc": {"config_version": 1}})
+
+    return get_config_version()
+
+
+def watch_config_changes():
+    """
+    Open a change stream on the config-related collections (requires a replica set).
+    """
+    db = get_database()
+    return db.watch([{"$match": {"ns.coll": {"$in": CONFIG_WATCHED_COLLECTIONS}}}])
+
+
+config_cache = ConfigCache(ttl_seconds=CONFIG_CACHE_TTL_SECONDS,
+                           version_check_seconds=CONFIG_VERSION_CHECK_SECONDS,
+                           version_loader=get_config_version,
+                           change_stream_factory=watch_config_changes)
 
 
 def get_credentials():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CONFIG_COLLECTION_NAME]
 
     # Query the collection for credentials
@@ -42,10 +265,9 @@ def get_credentials():
     return verify_token, page_access_token, openai_api_key, gpt_model, recurring_time, fb_page_id, telegram_token, telegram_group_id
 
 
+@config_cache.cached
 def get_functions():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[FUNCTION_COLLECTION_NAME]
 
     # Query the collection for the prompt
@@ -57,10 +279,9 @@ def get_functions():
     return function
 
 
+@config_cache.cached
 def get_constant_message(type: str):
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CONSTANT_MESSAGE_COLLECTION_NAME]
 
     # Query the collection for the constant message
@@ -72,10 +293,9 @@ def get_constant_message(type: str):
     return constant_message.get("content", "")
 
 
+@config_cache.cached
 def get_faq():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[FAQ_COLLECTION_NAME]
 
     # Query the collection for FAQs
@@ -87,10 +307,9 @@ def get_faq():
     return faq
 
 
+@config_cache.cached
 def get_prompt():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[PROMPT_COLLECTION_NAME]
 
     # Query the collection for the prompt
@@ -102,10 +321,9 @@ def get_prompt():
     return prompt.get("content", "")
 
 
+@config_cache.cached
 def get_follow_up_prompt():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[PROMPT_COLLECTION_NAME]
 
     # Query the collection for the follow-up prompt
@@ -117,10 +335,9 @@ def get_follow_up_prompt():
     return prompt.get("content", "")
 
 
+@config_cache.cached
 def get_welcome_prompt():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[PROMPT_COLLECTION_NAME]
 
     # Query the collection for the introduce prompt
@@ -132,10 +349,9 @@ def get_welcome_prompt():
     return prompt.get("content", "")
 
 
+@config_cache.cached
 def get_classify_prompt():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[PROMPT_COLLECTION_NAME]
 
     # Query the collection for the classify prompt
@@ -147,73 +363,79 @@ def get_classify_prompt():
     return prompt.get("content", "")
 
 
+_chat_indexes_ready = False
+
+
+def ensure_chat_indexes(collection):
+    """
+    One chat document per user; the unique index also lets concurrent upserts for a new user converge.
+    """
+    global _chat_indexes_ready
+    if _chat_indexes_ready:
+        return
+    try:
+        collection.create_index("user_id", unique=True)
+    except OperationFailure as e:
+        # Older data may contain duplicated user documents created by the previous find/insert path
+        print(f"⚠️ Could not create unique index on chat.user_id: {e}")
+    # Covers the inactivity scan: filter on updated_at, return user_id without reading the documents
+    collection.create_index([("updated_at", 1), ("user_id", 1)])
+    _chat_indexes_ready = True
+
+
 def post_chat(user_id, message, is_update=True):
     """
     Posts or updates chat messages for a user in the MongoDB collection.
 
+    A single upsert appends every message atomically and keeps the last CHAT_STORED_MESSAGES_LIMIT.
+
     Args:
         user_id (str): The ID of the user.
         message (list): The list of messages to be added.
         is_update (bool): Flag to determine whether to update the `updated_at` field. Defaults to True.
     """
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CHAT_COLLECTION_NAME]
+    ensure_chat_indexes(collection)
 
-    # Query the collection for the user
-    existed_user = collection.find_one({"user_id": user_id})
-
+    now = datetime.utcnow()
     update_data = {
         "$push": {
             "messages": {
                 "$each": message,
-                "$slice": -20
+                "$slice": -CHAT_STORED_MESSAGES_LIMIT
             }
         },
-        "$setOnInsert": {"created_at": datetime.utcnow()}
+        "$setOnInsert": {"created_at": now}
     }
 
     if is_update:
-        update_data["$set"] = {"updated_at": datetime.utcnow()}
-
-    if existed_user:
-        # Update existing user chat
-        collection.update_one({"user_id": user_id}, update_data, upsert=True)
+        update_data["$set"] = {"updated_at": now}
     else:
-        # Create new user chat
-        collection.insert_one({
-            "user_id": user_id,
-            "messages": message,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
-
-
-def get_chat_by_userid(user_id):
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+        update_data["$setOnInsert"]["updated_at"] = now
+
+    collection.update_one({"user_id": user_id}, update_data, upsert=True)
+
+
+def get_chat_by_userid(user_id, limit=CHAT_HISTORY_LIMIT):
+    """
+    Get the last `limit` messages of a user, or None when the user has no chat yet.
+
+    The $slice projection trims the array on the server, so long histories are never transferred.
+    """
+    db = get_database()
     collection = db[CHAT_COLLECTION_NAME]
 
-    # Query the collection for the chat messages
-    chat = collection.find_one({"user_id": user_id}, {"_id": 0})
+    chat = collection.find_one({"user_id": user_id}, {"_id": 0, "messages": {"$slice": -limit}})
 
     if not chat:
         return None
 
-    messages = chat.get("messages", [])
-
-    # ✅ Get 20 last messages
-    last_messages = messages[-20:] if len(messages) > 10 else messages
-
-    return last_messages
+    return chat.get("messages", [])
 
 
 def get_all_chat():
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CHAT_COLLECTION_NAME]
 
     # Query the collection for all chat messages
@@ -225,12 +447,38 @@ def get_all_chat():
     return chats
 
 
+def iter_inactive_chats(inactive_since, user_ids=None, batch_size=1000):
+    """
+    Stream {"user_id", "updated_at"} of chats not updated since `inactive_since`, oldest first.
+
+    The (updated_at, user_id) index covers the query, so documents and their messages are never read.
+    `user_ids` (a set) restricts the result: small sets are sent to the server with $in, large ones are
+    intersected while streaming.
+    """
+    db = get_database()
+    collection = db[CHAT_COLLECTION_NAME]
+    ensure_chat_indexes(collection)
+
+    query = {"updated_at": {"$lt": inactive_since}}
+    if user_ids is not None:
+        if not user_ids:
+            return
+        if len(user_ids) <= INACTIVITY_IN_QUERY_LIMIT:
+            query["user_id"] = {"$in": list(user_ids)}
+
+    cursor = collection.find(query, {"_id": 0, "user_id": 1, "updated_at": 1}).sort("updated_at", 1) \
+        .batch_size(batch_size)
+    with cursor:
+        for chat in cursor:
+            if user_ids is None or chat.get("user_id") in user_ids:
+                yield chat
+
+
 def get_gg_sheet_key():
     """
     Get the Google Sheet key from the database.
     """
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CONFIG_COLLECTION_NAME]
 
     sheet_key = collection.find_one()
@@ -241,12 +489,12 @@ def get_gg_sheet_key():
     return sheet_key.get("sheet_key", "")
 
 
+@config_cache.cached
 def get_follow_up_keywords():
     """
     Get the follow-up keywords from the database.
     """
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
+    db = get_database()
     collection = db[CONSTANT_MESSAGE_COLLECTION_NAME]
 
     keywords = collection.find_one({"type": "follow_up_keywords"}, {"_id": 0})
@@ -255,3 +503,63 @@ def get_follow_up_keywords():
         raise ValueError("Follow-up keywords not found in the database")
 
     return keywords.get("content", [])
+
+
+def save_classified_message(message: str, label: str):
+    """
+    Store a message classified by the LLM so the local classifier can be trained on it.
+    """
+    db = get_database()
+    collection = db[CLASSIFIED_MESSAGE_COLLECTION_NAME]
+
+    collection.update_one(
+        {"message": message},
+        {"$set": {"label": label, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def get_classified_messages(limit=20000):
+    """
+    Get the most recent (message, label) pairs classified by the LLM.
+    """
+    db = get_database()
+    collection = db[CLASSIFIED_MESSAGE_COLLECTION_NAME]
+
+    cursor = collection.find({}, {"_id": 0, "message": 1, "label": 1}).sort("updated_at", -1).limit(limit)
+
+    return [(item["message"], item["label"]) for item in cursor if item.get("message") and item.get("label")]
+
+
+_user_profile_indexes_ready = False
+
+
+def get_user_profile(user_id):
+    """
+    Get the stored Facebook profile (name) of a user, or None when missing or older than the TTL.
+    """
+    db = get_database()
+    collection = db[USER_PROFILE_COLLECTION_NAME]
+
+    # The TTL monitor only runs once a minute, so expired documents are filtered here too
+    fresh_since = datetime.utcnow() - timedelta(seconds=USER_PROFILE_TTL_SECONDS)
+    return collection.find_one({"_id": user_id, "updated_at": {"$gte": fresh_since}}, {"_id": 0, "name": 1})
+
+
+def save_user_profile(user_id, name):
+    """
+    Store the Facebook profile of a user; MongoDB removes it after USER_PROFILE_TTL_SECONDS.
+    """
+    global _user_profile_indexes_ready
+    db = get_database()
+    collection = db[USER_PROFILE_COLLECTION_NAME]
+
+    if not _user_profile_indexes_ready:
+        collection.create_index("updated_at", expireAfterSeconds=USER_PROFILE_TTL_SECONDS)
+        _user_profile_indexes_ready = True
+
+    collection.update_one(
+        {"_id": user_id},
+        {"$set": {"name": name, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+import time
+
+USER_ID_COLUMN = "ID_Facebook"
+
+
+def to_sheet_value(value):
+    """
+    Convert a Python value into the string form returned by get_all_values.
+    """
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return "" if value is None else str(value)
+
+
+def parse_appended_row_number(response):
+    """
+    Extract the first row number from an append response ("Customer!A12:D12" -> 12).
+    """
+    updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    return int(match.group(1)) if match else None
+
+
+class CustomerSheetMirror:
+    """
+    Local mirror of the 'Customer' sheet indexed by ID_Facebook.
+
+    Reads are served from memory, writes go to the sheet and are applied to the mirror immediately
+    (write-through). Every `refresh_seconds` the spreadsheet's Drive modifiedTime is checked, and the sheet
+    is downloaded only when it changed since the last sync, to pick up rows edited by hand.
+    """
+
+    def __init__(self, sheet_loader, refresh_seconds=60, sheet_name="Customer", write_queue=None):
+        self.sheet_loader = sheet_loader
+        self.refresh_seconds = refresh_seconds
+        self.sheet_name = sheet_name
+        self.write_queue = write_queue
+        self.headers = []
+        self.records = {}
+        self.row_numbers = {}
+        self.last_row_number = 1
+        self.last_refreshed_at = None
+        self.last_modified_time = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._refresher = None
+        self._stop_event = threading.Event()
+        self._counters = {"checks": 0, "downloads": 0}
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.refresh()
+                self.start_auto_refresh()
+
+    def refresh(self, force=False):
+        """
+        Re-sync the mirror when the spreadsheet changed since the last download (or always with `force`),
+        applying only the rows that changed to the local index.
+        """
+        # The lock is held from the flush to the end of the sync: a set_value landing in between is neither on
+        # the downloaded sheet nor still queued, so the stale row would overwrite it in the mirror
+        with self._lock:
+            if self.write_queue:
+                # Pending writes must land first, otherwise the download would overwrite them locally
+                self.write_queue.flush()
+            sheet = self.sheet_loader()
+            if sheet is None:
+                raise ConnectionError("Customer sheet is not available")
+
+            self._counters["checks"] += 1
+            modified_time = self.get_modified_time(sheet)
+            if not force and self._loaded and modified_time is not None \
+                    and modified_time == self.last_modified_time:
+                self.last_refreshed_at = time.time()
+                return
+
+            self._counters["downloads"] += 1
+            values = sheet.get_all_values()
+            headers = values[0] if values else []
+            records = {}
+            row_numbers = {}
+            for offset, row in enumerate(values[1:]):
+                record = dict(zip(headers, row + [""] * (len(headers) - len(row))))
+                user_id = str(record.get(USER_ID_COLUMN, "")).strip()
+                if not user_id:
+                    continue
+                # +2 because sheet is 1-indexed and has header row
+                row_numbers.setdefault(user_id, []).append(offset + 2)
+                records.setdefault(user_id, record)
+
+            changed = [user_id for user_id, record in records.items() if self.records.get(user_id) != record]
+            removed = self.records.keys() - records.keys()
+            for user_id in changed:
+                self.records[user_id] = records[user_id]
+            for user_id in removed:
+                del self.records[user_id]
+            self.headers = headers
+            self.row_numbers = row_numbers
+            self.last_row_number = len(values)
+            self.last_modified_time = modified_time
+            self.last_refreshed_at = time.time()
+            self._loaded = True
+
+        if changed or removed:
+            print(f"🔄 Customer sheet mirror synced: {len(changed)} changed, {len(removed)} removed, "
+                  f"{len(records)} users")
+
+    @staticmethod
+    def get_modified_time(sheet):
+        """
+        Drive modifiedTime of the spreadsheet (one small metadata call), or None when it cannot be read.
+        """
+        spreadsheet = getattr(sheet, "spreadsheet", None)
+        if spreadsheet is None:
+            return None
+        try:
+            return spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"⚠️ Could not read Customer sheet modifiedTime, downloading it: {e}")
+            return None
+
+    def start_auto_refresh(self):
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresher = threading.Thread(target=self._auto_refresh, name="customer-sheet-mirror", daemon=True)
+        self._refresher.start()
+
+    def stop_auto_refresh(self):
+        self._stop_event.set()
+
+    def _auto_refresh(self):
+        while not self._stop_event.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Error refreshing customer sheet mirror: {e}")
+
+    def contains(self, user_id) -> bool:
+        self.ensure_loaded()
+        return str(user_id) in self.records
+
+    def get(self, user_id):
+        self.ensure_loaded()
+        record = self.records.get(str(user_id))
+        return dict(record) if record else None
+
+    def find_user_ids(self, predicate) -> list:
+        self.ensure_loaded()
+        with self._lock:
+            return [user_id for user_id, record in self.records.items() if predicate(record)]
+
+    def column_index(self, column_name) -> int:
+        self.ensure_loaded()
+        return self.headers.index(column_name) + 1
+
+    def set_value(self, user_id, column_name, value) -> bool:
+        """
+        Update one column for every row of `user_id` on the sheet and in the mirror.
+
+        With a write queue the sheet update is batched and sent later; the mirror is updated right away.
+        """
+        self.ensure_loaded()
+        user_id = str(user_id)
+        # Under the lock so a concurrent refresh cannot sync a download that misses this write
+        with self._lock:
+            row_numbers = self.row_numbers.get(user_id)
+            if not row_numbers:
+                return False
+
+            column = self.column_index(column_name)
+            if self.write_queue:
+                for row_number in row_numbers:
+                    self.write_queue.update_cell(self.sheet_name, row_number, column, value)
+            else:
+                sheet = self.sheet_loader()
+                for row_number in row_numbers:
+                    sheet.update_cell(row_number, column, value)
+            self.apply_value(user_id, column_name, value)
+            return True
+
+    def apply_value(self, user_id, column_name, value):
+        with self._lock:
+            if str(user_id) in self.records:
+                self.records[str(user_id)][column_name] = to_sheet_value(value)
+
+    def append(self, row) -> int:
+        """
+        Append a row to the sheet and index it locally.
+        """
+        self.ensure_loaded()
+        sheet = self.sheet_loader()
+        response = sheet.append_row(row)
+        return self.apply_append(row, parse_appended_row_number(response))
+
+    def apply_append(self, row, row_number=None):
+        with self._lock:
+            row_number = row_number or self.last_row_number + 1
+            self.last_row_number = max(self.last_row_number, row_number)
+            record = dict(zip(self.headers, [to_sheet_value(value) for value in row]))
+            user_id = str(record.get(USER_ID_COLUMN, row[0]))
+            self.row_numbers.setdefault(user_id, []).append(row_number)
+            self.records.setdefault(user_id, record)
+            return row_number
+
+    def get_metrics(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "users": len(self.records),
+            "last_refreshed_at": self.last_refreshed_at,
+            "last_modified_time": self.last_modified_time,
+            "refresh_seconds": self.refresh_seconds,
+            **self._counters,
+        }
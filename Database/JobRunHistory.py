@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from Database.Connection import get_database
+
+JOB_RUN_COLLECTION_NAME = "job_runs"
+
+
+class JobRunHistory:
+    """
+    One document per scheduled job run, recording who ran it, when, and how it ended.
+
+    Runs are keyed by `run_key` (job name and scheduled time), so a run can be claimed only once even if
+    two processes briefly both believe they are leader. A run that did not finish can be taken over by
+    the next leader, up to `max_attempts` times in total.
+    """
+
+    def __init__(self, ttl_seconds=90 * 24 * 3600, database_provider=get_database):
+        self.ttl_seconds = ttl_seconds
+        self.database_provider = database_provider
+        self._indexes_ready = False
+
+    def _collection(self):
+        collection = self.database_provider()[JOB_RUN_COLLECTION_NAME]
+        if not self._indexes_ready:
+            collection.create_index("started_at", expireAfterSeconds=self.ttl_seconds)
+            collection.create_index([("job", 1), ("started_at", DESCENDING)])
+            self._indexes_ready = True
+        return collection
+
+    def start(self, job, run_key, owner_id) -> bool:
+        """
+        Claim the run. Return False when another process already claimed the same `run_key`.
+        """
+        try:
+            self._collection().insert_one({
+                "_id": run_key,
+                "job": job,
+                "owner_id": owner_id,
+                "status": "running",
+                "attempts": 1,
+                "started_at": datetime.utcnow(),
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def take_over(self, run_key, owner_id, max_attempts=3) -> bool:
+        """
+        Claim a run that failed, was interrupted, or is still marked running by another owner (which lost
+        the lease, so it stopped or died). Return False when the run succeeded or ran out of attempts.
+        """
+        result = self._collection().update_one(
+            {
+                "_id": run_key,
+                # Runs recorded before attempts were counted have no attempts field
+                "attempts": {"$not": {"$gte": max_attempts}},
+                "$or": [
+                    {"status": {"$in": ["failed", "interrupted"]}},
+                    {"status": "running", "owner_id": {"$ne": owner_id}},
+                ],
+            },
+            {"$set": {"owner_id": owner_id, "status": "running", "resumed_at": datetime.utcnow()},
+             "$inc": {"attempts": 1}}
+        )
+        return result.modified_count == 1
+
+    def finish(self, run_key, status, result=None, error=None):
+        finished_at = datetime.utcnow()
+        # Pipeline update so the duration is computed from the stored start time in the same round trip
+        self._collection().update_one({"_id": run_key}, [{"$set": {
+            "status": status,
+            "result": {"$literal": result},
+            "error": {"$literal": error},
+            "finished_at": finished_at,
+            "duration_seconds": {"$divide": [{"$subtract": [finished_at, "$started_at"]}, 1000]},
+        }}])
+
+    def recent(self, job=None, limit=10) -> list:
+        query = {"job": job} if job else {}
+        return list(self._collection().find(query).sort("started_at", DESCENDING).limit(limit))
@@ -0,0 +1,98 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from Database.Connection import get_database
+
+LEADER_LEASE_COLLECTION_NAME = "leader_leases"
+
+
+class LeaderLease:
+    """
+    Leader election through a lease document in MongoDB: the process holding `name` until `expires_at`
+    is the leader, and keeps the lease by renewing it more often than `ttl_seconds`. When the leader
+    dies, another process takes the lease over once it expires.
+
+    A process that cannot renew stops considering itself leader when its own copy of the lease expires,
+    before anyone else can take over.
+    """
+
+    def __init__(self, name, owner_id=None, ttl_seconds=60, database_provider=get_database):
+        self.name = name
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.ttl_seconds = ttl_seconds
+        self.database_provider = database_provider
+        self._lock = threading.Lock()
+        self._valid_until = 0.0
+        self._counters = {"acquired": 0, "renewed": 0, "lost": 0, "errors": 0}
+
+    def _collection(self):
+        return self.database_provider()[LEADER_LEASE_COLLECTION_NAME]
+
+    def try_acquire(self) -> bool:
+        """
+        Take the lease if it is free or expired, or renew it if already held. Return True when leader.
+        """
+        started = time.monotonic()
+        now = datetime.utcnow()
+        was_leader = self.is_leader
+        try:
+            lease = self._collection().find_one_and_update(
+                {"_id": self.name, "$or": [{"owner_id": self.owner_id}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner_id": self.owner_id, "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                          "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            leader = lease is not None and lease.get("owner_id") == self.owner_id
+        except DuplicateKeyError:
+            # Another process holds a valid lease, so the upsert collided with its document
+            leader = False
+        except PyMongoError as e:
+            print(f"❌ Error renewing leader lease {self.name}: {e}")
+            with self._lock:
+                self._counters["errors"] += 1
+            return self.is_leader
+
+        with self._lock:
+            if leader:
+                self._valid_until = started + self.ttl_seconds
+                self._counters["renewed" if was_leader else "acquired"] += 1
+            else:
+                self._valid_until = 0.0
+                if was_leader:
+                    self._counters["lost"] += 1
+        if leader != was_leader:
+            print(f"👑 {self.owner_id} {'is now' if leader else 'is no longer'} leader of {self.name}")
+        return leader
+
+    @property
+    def is_leader(self) -> bool:
+        with self._lock:
+            return time.monotonic() < self._valid_until
+
+    def release(self):
+        """
+        Give the lease up so another process can take over without waiting for it to expire.
+        """
+        with self._lock:
+            self._valid_until = 0.0
+        try:
+            self._collection().delete_one({"_id": self.name, "owner_id": self.owner_id})
+        except PyMongoError as e:
+            print(f"❌ Error releasing leader lease {self.name}: {e}")
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "name": self.name,
+                "owner_id": self.owner_id,
+                "leader": time.monotonic() < self._valid_until,
+            }
@@ -1,11 +1,19 @@
+import atexit
 import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
 import gspread
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 
 from gspread_formatting import Color, format_cell_range, CellFormat
 
 from Database.Connection import get_gg_sheet_key
+from Database.CustomerSheetMirror import CustomerSheetMirror
+from Database.SheetWriteQueue import SheetWriteQueue
 
 # Constants
 SCOPES = [
@@ -14,39 +22,146 @@ SCOPES = [
 ]
 CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "credentials.json")
 SHEET_KEY = get_gg_sheet_key()
+CUSTOMER_SHEET_NAME = "Customer"
+BOOKING_SHEET_NAME = "Booking"
+CHATBOT_COLUMN = "Turn on Chat bot"
+FOLLOW_UP_COLUMN = "Follow up"
+CUSTOMER_MIRROR_REFRESH_SECONDS = int(os.getenv("CUSTOMER_MIRROR_REFRESH_SECONDS", "60"))
+SHEET_WRITE_BATCH_SIZE = int(os.getenv("SHEET_WRITE_BATCH_SIZE", "100"))
+SHEET_WRITE_FLUSH_SECONDS = float(os.getenv("SHEET_WRITE_FLUSH_SECONDS", "2"))
+SHEETS_HTTP_TIMEOUT_SECONDS = float(os.getenv("SHEETS_HTTP_TIMEOUT_SECONDS", "30"))
+
+# Long-lived client and worksheet handles (one per process)
+_sheet_lock = threading.Lock()
+_sheet_credentials = None
+_sheet_client = None
+_spreadsheet = None
+_worksheets = {}
+
+# Sheets API call instrumentation
+_api_call_lock = threading.Lock()
+_api_calls = Counter()
+_api_call_turns = {"turns": 0, "calls": 0, "max_calls": 0}
+_turn_state = threading.local()
+
+
+class CountingHTTPClient(gspread.http_client.HTTPClient):
+    """
+    gspread HTTP client that counts every Sheets/Drive API request.
+    """
+
+    def request(self, method, endpoint, *args, **kwargs):
+        with _api_call_lock:
+            _api_calls["total"] += 1
+            _api_calls[method.upper()] += 1
+        if getattr(_turn_state, "calls", None) is not None:
+            _turn_state.calls += 1
+        return super().request(method, endpoint, *args, **kwargs)
+
+
+@contextmanager
+def track_sheet_api_calls(label=""):
+    """
+    Count the Sheets API calls made by the current thread inside the block (e.g. one webhook turn).
+    """
+    _turn_state.calls = 0
+    try:
+        yield _turn_state
+    finally:
+        calls = _turn_state.calls
+        _turn_state.calls = None
+        with _api_call_lock:
+            _api_call_turns["turns"] += 1
+            _api_call_turns["calls"] += calls
+            _api_call_turns["max_calls"] = max(_api_call_turns["max_calls"], calls)
+        print(f"📊 Sheets API calls {label}: {calls}")
+
+
+def get_sheet_api_metrics() -> dict:
+    with _api_call_lock:
+        turns = _api_call_turns["turns"]
+        return {
+            **dict(_api_calls),
+            "tracked_turns": turns,
+            "avg_calls_per_turn": round(_api_call_turns["calls"] / turns, 2) if turns else 0,
+            "max_calls_per_turn": _api_call_turns["max_calls"],
+            "cached_worksheets": list(_worksheets),
+        }
+
+
+def reset_google_sheet_cache():
+    """
+    Drop the cached client and worksheet handles so the next call re-authorizes.
+    """
+    global _sheet_credentials, _sheet_client, _spreadsheet
+    with _sheet_lock:
+        _sheet_credentials = None
+        _sheet_client = None
+        _spreadsheet = None
+        _worksheets.clear()
 
 
 def get_google_sheet(sheet_name):
     """
     Connect to a specific Google Sheet by name.
     """
+    global _sheet_credentials, _sheet_client, _spreadsheet
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(SHEET_KEY).worksheet(sheet_name)
-        return sheet
+        sheet = _worksheets.get(sheet_name)
+        if sheet is not None and _sheet_credentials.valid:
+            return sheet
+
+        with _sheet_lock:
+            if _sheet_client is None:
+                _sheet_credentials = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
+                _sheet_client = gspread.authorize(_sheet_credentials, http_client=CountingHTTPClient)
+                _sheet_client.set_timeout(SHEETS_HTTP_TIMEOUT_SECONDS)
+                _spreadsheet = _sheet_client.open_by_key(SHEET_KEY)
+            elif not _sheet_credentials.valid:
+                # Refresh the access token ahead of the next request instead of waiting for a 401
+                _sheet_credentials.refresh(Request())
+
+            if sheet_name not in _worksheets:
+                _worksheets[sheet_name] = _spreadsheet.worksheet(sheet_name)
+            return _worksheets[sheet_name]
     except gspread.exceptions.APIError as e:
         print(f"❌ Google Sheets API error: {e}")
+        if e.code == 401:
+            reset_google_sheet_cache()
     except Exception as e:
         print(f"❌ Error connecting to Google Sheet: {e}")
     return None
 
 
+def highlight_booking_rows(sheet, first_row, last_row):
+    """
+    Highlight newly appended booking rows in one formatting call.
+    """
+    # Định dạng màu cho các hàng vừa thêm (ví dụ màu nền vàng nhạt)
+    yellow_fill = CellFormat(backgroundColor=Color(1, 1, 0.6))  # RGB (255, 255, 153))
+    format_cell_range(sheet, f"A{first_row}:D{last_row}", yellow_fill)
+
+
+sheet_write_queue = SheetWriteQueue(sheet_loader=get_google_sheet,
+                                    max_batch_size=SHEET_WRITE_BATCH_SIZE,
+                                    flush_interval_seconds=SHEET_WRITE_FLUSH_SECONDS)
+sheet_write_queue.register_append_hook(BOOKING_SHEET_NAME, highlight_booking_rows)
+atexit.register(sheet_write_queue.stop)
+
+customer_mirror = CustomerSheetMirror(sheet_loader=lambda: get_google_sheet(CUSTOMER_SHEET_NAME),
+                                      refresh_seconds=CUSTOMER_MIRROR_REFRESH_SECONDS,
+                                      sheet_name=CUSTOMER_SHEET_NAME,
+                                      write_queue=sheet_write_queue)
+
+
 def save_booking_to_sheet(user_id, user_name, message_text):
     """
     Save booking information to the 'Booking' sheet.
     """
     try:
-        sheet = get_google_sheet("Booking")
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheet.append_row([timestamp, user_id, user_name, message_text])
-
-        # Xác định dòng vừa thêm
-        new_row_index = len(sheet.get_all_values())
-
-        # Định dạng màu cho hàng đó (ví dụ màu nền vàng nhạt)
-        yellow_fill = CellFormat(backgroundColor=Color(1, 1, 0.6))  # RGB (255, 255, 153))
-        format_cell_range(sheet, f"A{new_row_index}:D{new_row_index}", yellow_fill)
+        # Queued so that booking spikes are sent as one append_rows call
+        sheet_write_queue.append_row(BOOKING_SHEET_NAME, [timestamp, user_id, user_name, message_text])
         set_user_chatbot_action(user_id, False)  # Disable chatbot action after booking
     except Exception as e:
         print(f"❌ Error saving booking to sheet: {e}")
@@ -57,10 +172,7 @@ def get_user_existed_on_sheet(user_id):
     Check if a user exists in the 'Customer' sheet by user_id.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-        matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-        return len(matching_rows) > 0
+        return customer_mirror.contains(user_id)
     except Exception as e:
         print(f"❌ Error checking user existence on sheet: {e}")
         return False
@@ -71,11 +183,10 @@ def add_user_to_sheet(user_id, user_name, is_chatbot_on=False):
     Add a new user to the 'Customer' sheet.
     """
     try:
-        sheet = get_google_sheet("Customer")
         if get_user_existed_on_sheet(user_id):
             print(f"User {user_id} already exists in the sheet.")
             return
-        sheet.append_row([user_id, user_name, is_chatbot_on, True])
+        customer_mirror.append([user_id, user_name, is_chatbot_on, True])
     except Exception as e:
         print(f"❌ Error adding user to sheet: {e}")
 
@@ -85,11 +196,10 @@ def add_user_permission_user_to_sheet(user_id, user_name):
        Add a new user to the 'Customer' sheet.
        """
     try:
-        sheet = get_google_sheet("Customer")
         if get_user_existed_on_sheet(user_id):
             print(f"User {user_id} already exists in the sheet.")
             return
-        sheet.append_row([user_id, user_name, True, False])
+        customer_mirror.append([user_id, user_name, True, False])
     except Exception as e:
         print(f"❌ Error adding user to sheet: {e}")
 
@@ -99,15 +209,7 @@ def set_user_chatbot_action(user_id, action):
     Set the chatbot action for a specific user in the 'Customer' sheet.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-        matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-        if matching_rows:
-            for row in matching_rows:
-                row_index = all_values.index(row) + 2  # +2 because gspread is 1-indexed and has header row
-                sheet.update_cell(row_index, 3, action)
-
-        else:
+        if not customer_mirror.set_value(user_id, CHATBOT_COLUMN, action):
             print(f"User {user_id} not found in the sheet.")
     except Exception as e:
         print(f"❌ Error setting user chatbot action: {e}")
@@ -118,15 +220,7 @@ def set_user_follow_up_action(user_id, action: bool):
     Set the chatbot action for a specific user in the 'Customer' sheet.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-        matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-        if matching_rows:
-            for row in matching_rows:
-                row_index = all_values.index(row) + 2  # +2 because gspread is 1-indexed and has header row
-                sheet.update_cell(row_index, 4, action)
-
-        else:
+        if not customer_mirror.set_value(user_id, FOLLOW_UP_COLUMN, action):
             print(f"User {user_id} not found in the sheet.")
     except Exception as e:
         print(f"❌ Error setting user chatbot action: {e}")
@@ -137,11 +231,9 @@ def get_chatbot_turn_on(user_id):
     Check if the chatbot is turned on for a specific user.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-        matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-        if matching_rows:
-            return matching_rows[0].get('Turn on Chat bot', 'FALSE') == 'TRUE'
+        row = customer_mirror.get(user_id)
+        if row:
+            return row.get(CHATBOT_COLUMN, 'FALSE') == 'TRUE'
         return False
     except Exception as e:
         print(f"❌ Error checking chatbot status: {e}")
@@ -153,11 +245,9 @@ def get_follow_up_turn_on(user_id):
     Check if follow-up is turned on for a specific user.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-        matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-        if matching_rows:
-            return matching_rows[0].get('Follow up', 'FALSE') == 'TRUE'
+        row = customer_mirror.get(user_id)
+        if row:
+            return row.get(FOLLOW_UP_COLUMN, 'FALSE') == 'TRUE'
         return False
     except Exception as e:
         print(f"❌ Error checking follow-up status: {e}")
@@ -169,15 +259,13 @@ def get_chat_and_follow_up_turn_on():
     Retrieve a list of user IDs where both chatbot and follow-up are turned on.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
+        # Re-sync first so the daily job sees the latest manual edits
+        customer_mirror.refresh()
 
         # Filter users with both chatbot and follow-up enabled
-        return [
-            str(row.get('ID_Facebook'))
-            for row in all_values
-            if row.get('Turn on Chat bot', 'FALSE') == 'TRUE' and row.get('Follow up', 'FALSE') == 'TRUE'
-        ]
+        return customer_mirror.find_user_ids(
+            lambda row: row.get(CHATBOT_COLUMN, 'FALSE') == 'TRUE' and row.get(FOLLOW_UP_COLUMN, 'FALSE') == 'TRUE'
+        )
     except Exception as e:
         print(f"❌ Error checking chatbot and follow-up status: {e}")
         return []
@@ -188,17 +276,10 @@ def set_follow_up_to_false_by_user_ids(user_ids, action=False):
     Set the 'Follow up' column to False for a list of user IDs in the 'Customer' sheet.
     """
     try:
-        sheet = get_google_sheet("Customer")
-        all_values = sheet.get_all_records()
-
         for user_id in user_ids:
-            matching_rows = [row for row in all_values if str(row.get('ID_Facebook')) == user_id]
-            if matching_rows:
-                for row in matching_rows:
-                    row_index = all_values.index(row) + 2  # +2 because gspread is 1-indexed and has a header row
-                    sheet.update_cell(row_index, 4, action)  # Assuming 'Follow up' is the 4th column
-            else:
+            if not customer_mirror.set_value(user_id, FOLLOW_UP_COLUMN, action):
                 print(f"User {user_id} not found in the sheet.")
+        sheet_write_queue.flush()
         print("✅ 'Follow up' column updated to False for the provided user IDs.")
     except Exception as e:
         print(f"❌ Error updating 'Follow up' column: {e}")
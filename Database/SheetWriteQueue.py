@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import gspread
+import requests
+from gspread.utils import rowcol_to_a1, ValueInputOption
+
+from Database.CustomerSheetMirror import parse_appended_row_number
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Network failures; a missing sheet (get_google_sheet returns None on any error) is raised as ConnectionError
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError)
+
+
+class SheetWriteQueue:
+    """
+    Write-behind queue for Google Sheets.
+
+    Cell updates are coalesced per (sheet, row, column) and appends are grouped per sheet, then sent as
+    one batch_update / append_rows call per sheet when `max_batch_size` pending writes accumulate or
+    every `flush_interval_seconds`. Quota (429), server and network errors are retried with exponential
+    backoff. Writes are accepted before they reach the sheet, so a failed batch is put back in the queue
+    for the next flush unless the error is a permanent 4xx.
+    """
+
+    def __init__(self, sheet_loader, max_batch_size=100, flush_interval_seconds=2.0, max_retries=5,
+                 backoff_seconds=1.0):
+        self.sheet_loader = sheet_loader
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._updates = {}
+        self._appends = {}
+        self._append_hooks = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._worker = None
+        self._counters = {"cells_queued": 0, "rows_queued": 0, "api_calls": 0, "retries": 0, "failures": 0}
+
+    def update_cell(self, sheet_name, row, col, value):
+        with self._lock:
+            self._updates.setdefault(sheet_name, {})[(row, col)] = value
+            self._counters["cells_queued"] += 1
+        self._after_enqueue()
+
+    def append_row(self, sheet_name, row):
+        with self._lock:
+            self._appends.setdefault(sheet_name, []).append(list(row))
+            self._counters["rows_queued"] += 1
+        self._after_enqueue()
+
+    def register_append_hook(self, sheet_name, hook):
+        """
+        Register `hook(sheet, first_row, last_row)` called after rows are appended to `sheet_name`.
+        """
+        self._append_hooks[sheet_name] = hook
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(cells) for cells in self._updates.values()) + \
+                sum(len(rows) for rows in self._appends.values())
+
+    def _after_enqueue(self):
+        if self.pending_count() >= self.max_batch_size:
+            self._wake_event.set()
+        self.start()
+
+    def start(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stop_event.clear()
+            self._worker = threading.Thread(target=self._run, name="sheet-write-queue", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """
+        Stop the background worker and flush whatever is still pending.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval_seconds)
+            self._wake_event.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Send every pending write now.
+        """
+        with self._flush_lock:
+            with self._lock:
+                updates, self._updates = self._updates, {}
+                appends, self._appends = self._appends, {}
+
+            for sheet_name in set(updates) | set(appends):
+                try:
+                    sheet = self.sheet_loader(sheet_name)
+                    if sheet is None:
+                        raise ConnectionError(f"Sheet '{sheet_name}' is not available")
+                    if sheet_name in updates:
+                        self._flush_updates(sheet, updates[sheet_name])
+                    if sheet_name in appends:
+                        self._flush_appends(sheet, sheet_name, appends[sheet_name])
+                except Exception as e:
+                    self._counters["failures"] += 1
+                    print(f"❌ Error flushing writes to sheet '{sheet_name}': {e}")
+                    if not self._is_permanent(e):
+                        self._requeue(sheet_name, updates.get(sheet_name, {}), appends.get(sheet_name, []))
+
+    def _flush_updates(self, sheet, cells):
+        data = [{"range": rowcol_to_a1(row, col), "values": [[value]]} for (row, col), value in cells.items()]
+        self._call_with_retry(
+            lambda: sheet.batch_update(data, value_input_option=ValueInputOption.user_entered)
+        )
+        # Updates were sent; do not resend them if the appends fail afterwards
+        cells.clear()
+
+    def _flush_appends(self, sheet, sheet_name, rows):
+        response = self._call_with_retry(lambda: sheet.append_rows(rows))
+        first_row = parse_appended_row_number(response)
+        hook = self._append_hooks.get(sheet_name)
+        if hook and first_row:
+            try:
+                self._call_with_retry(lambda: hook(sheet, first_row, first_row + len(rows) - 1))
+            except Exception as e:
+                print(f"❌ Error running append hook for sheet '{sheet_name}': {e}")
+
+    def _requeue(self, sheet_name, cells, rows):
+        with self._lock:
+            pending_cells = self._updates.setdefault(sheet_name, {})
+            for key, value in cells.items():
+                pending_cells.setdefault(key, value)
+            self._appends.setdefault(sheet_name, [])[:0] = rows
+
+    @staticmethod
+    def _is_retryable(error) -> bool:
+        if isinstance(error, gspread.exceptions.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        return isinstance(error, TRANSPORT_ERRORS)
+
+    @staticmethod
+    def _is_permanent(error) -> bool:
+        # The request itself is wrong (bad range, missing permission): sending it again cannot succeed
+        return isinstance(error, gspread.exceptions.APIError) and error.code not in RETRYABLE_STATUS_CODES \
+            and 400 <= error.code < 500
+
+    def _call_with_retry(self, call):
+        attempt = 0
+        while True:
+            try:
+                self._counters["api_calls"] += 1
+                return call()
+            except Exception as e:
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                attempt += 1
+                self._counters["retries"] += 1
+                reason = e.code if isinstance(e, gspread.exceptions.APIError) else type(e).__name__
+                print(f"⚠️ Google Sheets API error {reason}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+                time.sleep(delay)
+
+    def get_metrics(self) -> dict:
+        return {"pending": self.pending_count(), **self._counters}
@@ -1,25 +1,47 @@
 # -*- coding: utf-8 -*-
-import asyncio
-import re
-import threading
-import time
+import html
+import os
 import traceback
-from collections import defaultdict
 from dataclasses import dataclass, field
 
-from cachetools import TTLCache
-from telegram import Bot
-
-from Database.Connection import post_chat, get_chat_by_userid, get_follow_up_keywords
-from Database.SheetConnection import get_user_existed_on_sheet
+from Database.ChatHistory import ChatHistory
+from Database.ChatWriteBuffer import ChatWriteBuffer
+from Database.Connection import get_follow_up_keywords
+from Database.SheetConnection import get_user_existed_on_sheet, track_sheet_api_calls
 from Service.ChatService import IChatService
+from Service.ChatService.ReplyParts import split_text_and_json, first_block_to_send, remove_sent_prefix, \
+    join_text_and_json
+from Service.DelayScheduler import DelayScheduler
 from Service.MessageService import MessageClient
+from Service.MessageService.TelegramNotifier import TelegramNotifier
+from Service.OutboundMessageScheduler import OutboundMessageScheduler
+from Service.SharedState.ISharedStateBackend import ISharedStateBackend
+from Service.SharedState.SharedStateFactory import create_shared_state_backend
 
-# Caching setup
-processed_message_ids = TTLCache(maxsize=10000, ttl=300)
-message_buffers = defaultdict(list)
-debounce_timers = {}
 DEBOUNCE_DELAY_SECONDS = 5
+# Timers on different workers/nodes fire slightly apart; accept a flush this much earlier than the delay
+DEBOUNCE_CLOCK_TOLERANCE_SECONDS = 0.5
+DEBOUNCE_WORKER_COUNT = int(os.getenv("DEBOUNCE_WORKER_COUNT", "8"))
+OUTBOUND_WORKER_COUNT = int(os.getenv("OUTBOUND_WORKER_COUNT", "4"))
+# Pauses between the parts of one answer, so they do not arrive as a single burst
+INTRODUCE_IMAGE_DELAY_SECONDS = 2
+FOLLOW_UP_DELAY_SECONDS = 3
+
+# One timer thread for every pending debounce, flushes run on a fixed worker pool
+debounce_scheduler = DelayScheduler(worker_count=DEBOUNCE_WORKER_COUNT, name="debounce")
+# Paced sends to users, in order per recipient, without sleeping worker threads
+outbound_scheduler = OutboundMessageScheduler(DelayScheduler(worker_count=OUTBOUND_WORKER_COUNT, name="outbound"))
+
+
+def drain_schedulers(debounce_timeout=20, outbound_timeout=10):
+    """
+    Before the worker exits: process the buffered messages right away, then send the queued replies.
+    Debounce flushes queue sends, so the outbound queue is drained second.
+    """
+    debounce_scheduler.drain(debounce_timeout)
+    debounce_scheduler.shutdown()
+    outbound_scheduler.drain(outbound_timeout)
+    outbound_scheduler.shutdown()
 
 
 @dataclass
@@ -27,13 +49,17 @@ class ChatMessageHandler:
     chat_service: IChatService
     messenger: MessageClient
     fb_page_id: str
-    permission_cache: TTLCache = field(init=False)
     telegram_token: str
     telegram_group_id: str
+    # Dedup ids, debounce buffers and permission cache shared by every worker
+    shared_state: ISharedStateBackend = field(default_factory=create_shared_state_backend)
+    # Send the first paragraph of long answers while the rest is still streaming
+    stream_first_block: bool = False
+    # Escalation alerts to the staff group, sent in the background
+    telegram_notifier: TelegramNotifier = field(init=False, repr=False)
 
     def __post_init__(self):
-        # Initialize the permission cache with a TTL of 300 seconds and max size of 10,000
-        self.permission_cache = TTLCache(maxsize=10000, ttl=300)
+        self.telegram_notifier = TelegramNotifier(token=self.telegram_token, chat_id=self.telegram_group_id)
 
     def handle_entry(self, entry):
         for event in entry.get('messaging', []):
@@ -53,34 +79,34 @@ class ChatMessageHandler:
         print(f"📨 Received message_id: {message_id} | From: {sender_id} | Text: {message_text}")
 
         if message_id:
-            if message_id in processed_message_ids:
+            if not self.shared_state.mark_message_processed(message_id):
                 print(f"⚠️ Already processed message_id: {message_id}, skipping.")
                 return
-            processed_message_ids[message_id] = True
         else:
             print("⚠️ Message has no 'mid' — continuing anyway.")
 
         self.debounce_user_message(sender_id, message_text)
 
     def debounce_user_message(self, sender_id, message_text):
-        if message_text and message_text not in message_buffers[sender_id]:
-            message_buffers[sender_id].append(message_text)
-
-        if sender_id in debounce_timers:
-            debounce_timers[sender_id].cancel()
+        if message_text:
+            self.shared_state.append_message(sender_id, message_text)
 
-        debounce_timers[sender_id] = threading.Timer(
-            DEBOUNCE_DELAY_SECONDS,
-            self.debounce_process_message,
-            args=(sender_id,)
-        )
-        debounce_timers[sender_id].start()
+        debounce_scheduler.debounce(sender_id, DEBOUNCE_DELAY_SECONDS, self.debounce_process_message, sender_id)
 
     def debounce_process_message(self, sender_id):
-        raw_messages = message_buffers[sender_id]
+        with track_sheet_api_calls(f"for {sender_id}"):
+            self.process_buffered_message(sender_id)
+
+    def process_buffered_message(self, sender_id):
+        # When shutting down the flush runs early: claim the buffer without waiting for the quiet period
+        quiet_seconds = 0 if debounce_scheduler.draining else DEBOUNCE_DELAY_SECONDS - DEBOUNCE_CLOCK_TOLERANCE_SECONDS
+        raw_messages = self.shared_state.claim_messages(sender_id, quiet_seconds)
+        if raw_messages is None:
+            print(f"⏳ Newer message from {sender_id} is still debouncing, skipping this flush.")
+            return
+
         unique_messages = list(dict.fromkeys(raw_messages))
         full_message = "\n".join(unique_messages)
-        message_buffers[sender_id].clear()
 
         if not full_message.strip():
             print(f"⚠️ Empty message from {sender_id}, skipping.")
@@ -95,116 +121,135 @@ class ChatMessageHandler:
         if not self.get_cached_permission(sender_id) or sender_id == self.fb_page_id:
             return
 
+        # The history is read once per turn; every message of the turn is saved with one write when it ends
+        history = ChatHistory(sender_id)
+        chat_turn = ChatWriteBuffer(sender_id)
         try:
             print(f"🤖 Sending message to ChatService from {sender_id}:\n{full_message}")
-            response = self.chat_service.ask(full_message, sender_id)
+            sent_blocks = []
+
+            def on_first_block(block):
+                sent_block = self.send_first_block(sender_id, block)
+                if sent_block:
+                    sent_blocks.append(sent_block)
+
+            response = self.chat_service.ask(full_message, sender_id,
+                                             on_first_block=on_first_block if self.stream_first_block else None,
+                                             history=history)
 
             if (response.get("content")
                     and isinstance(response.get("content"), list)
                     and any(isinstance(item, dict) and "function_call" in item for item in response.get("content"))):
-                self.messenger.send_introduce_message(sender_id)
-                time.sleep(2)
-                self.messenger.send_image(sender_id)
+                outbound_scheduler.send(sender_id, self.messenger.send_introduce_message, sender_id)
+                outbound_scheduler.send(sender_id, self.messenger.send_image, sender_id,
+                                        delay=INTRODUCE_IMAGE_DELAY_SECONDS)
                 # return
 
             if isinstance(response.get("content"), list):
-                for item in response.get("content"):
+                for index, item in enumerate(response.get("content")):
                     if isinstance(item, dict) and "function_call" in item:
                         continue  # Skip function calls
 
                     item_content = self.chat_service.convert_markdown_bold_to_unicode(item.get("content", ""))
-                    self._handle_content_item(sender_id, item_content, full_message)
+                    sent_prefix = sent_blocks[0] if index == 0 and sent_blocks else None
+                    self._handle_content_item(sender_id, item_content, full_message, chat_turn, history,
+                                              sent_prefix=sent_prefix)
 
                     message_out_of_scope = self.is_message_response_out_of_scope(item_content)
                     if message_out_of_scope:
-                        async def send_telegram_message():
-                            bot = Bot(token=self.telegram_token)
-                            await bot.send_message(chat_id=self.telegram_group_id,
-                                                   text=f"📣 Tin nhắn cần hỗ trợ khách hàng có <b> Mã ID: {sender_id} </b>\n"
-                                                        f"<b>Nội dung:</b> {full_message}",
-                                                   parse_mode="HTML")
-
-                        asyncio.run(send_telegram_message())
+                        self.telegram_notifier.notify(f"📣 Tin nhắn cần hỗ trợ khách hàng có <b> Mã ID: {sender_id} </b>\n"
+                                                      f"<b>Nội dung:</b> {html.escape(full_message)}")
 
                 return
 
-            self._handle_content_item(sender_id, response, full_message)
+            self._handle_content_item(sender_id, response, full_message, chat_turn, history)
 
         except Exception as e:
             print(f"❌ Error while processing message from {sender_id}: {e}")
             traceback.print_exc()
+        finally:
+            chat_turn.flush()
 
-    def _handle_content_item(self, sender_id, response, full_message):
+    def send_first_block(self, sender_id, block):
+        """
+        Send the first streamed paragraph right away when it is plain main content.
+        Return the text that was sent, or None when the block must wait for the full answer.
+        """
+        content = first_block_to_send(self.chat_service.convert_markdown_bold_to_unicode(block),
+                                      get_follow_up_keywords())
+        if content is None:
+            return None
+
+        print(f"⚡ Sending first paragraph early to {sender_id}")
+        outbound_scheduler.send(sender_id, self.messenger.send_message_with_no_logs, sender_id, content)
+        return content
+
+    def _handle_content_item(self, sender_id, response, full_message, chat_turn: ChatWriteBuffer,
+                             history: ChatHistory, sent_prefix=None):
         content = self.chat_service.convert_markdown_bold_to_unicode(response)
         text_part, json_part = self.split_text_and_json(content)
 
         if text_part == "booking":
-            self.messenger.send_booking_message(sender_id, message_text=full_message)
+            outbound_scheduler.send(sender_id, self.messenger.send_booking_message, sender_id, full_message)
             self.set_cached_permission(sender_id, False)
             return True
 
         if json_part:
-            self.messenger.send_message(sender_id, (text_part, json_part), full_message)
+            # Like the plain text below: send only what was not streamed yet, but log the whole answer
+            outbound_scheduler.send(sender_id, self.messenger.send_message_with_no_logs, sender_id,
+                                    join_text_and_json(remove_sent_prefix(text_part, sent_prefix), json_part))
+            chat_turn.add_user_message(full_message)
+            chat_turn.add_assistant_message(join_text_and_json(text_part, json_part))
             return True
 
-        main, followup = self.split_main_and_followup(text_part, sender_id)
+        main, followup = self.split_main_and_followup(text_part, history, pending_messages=chat_turn.messages)
 
-        post_chat(sender_id, [{"role": "user", "content": full_message}], is_update=True)
-        self.messenger.send_message_with_no_logs(sender_id, main)
-        post_chat(sender_id, [{"role": "assistant", "content": main}], is_update=False)
+        chat_turn.add_user_message(full_message)
+        # The first paragraph may already have been sent while streaming
+        remaining_main = remove_sent_prefix(main, sent_prefix)
+        if remaining_main.strip():
+            outbound_scheduler.send(sender_id, self.messenger.send_message_with_no_logs, sender_id, remaining_main)
+        chat_turn.add_assistant_message(main)
 
         if followup.strip():
-            time.sleep(3)
-            self.messenger.send_message_with_no_logs(sender_id, followup)
-            post_chat(sender_id, [{"role": "assistant", "content": followup}], is_update=False)
+            outbound_scheduler.send(sender_id, self.messenger.send_message_with_no_logs, sender_id, followup,
+                                    delay=FOLLOW_UP_DELAY_SECONDS)
+            chat_turn.add_assistant_message(followup)
 
         return True
 
     def set_cached_permission(self, user_id, value=True):
-        self.permission_cache[user_id] = value
+        self.shared_state.set_permission(user_id, value)
 
     def get_cached_permission(self, user_id):
-        if user_id in self.permission_cache:
-            return self.permission_cache[user_id]
+        permission = self.shared_state.get_permission(user_id)
+        if permission is not None:
+            return permission
         permission = self.messenger.check_permission_auto_message(user_id)
         self.set_cached_permission(user_id, permission)
         return permission
 
     def get_user_existed_on_cached(self, user_id):
-        return user_id in self.permission_cache
+        return self.shared_state.get_permission(user_id) is not None
 
     def delete_cache_permission(self, user_id):
-        if user_id in self.permission_cache:
-            del self.permission_cache[user_id]
+        if self.shared_state.delete_permission(user_id):
             print(f"✅ Deleted cached permission for user {user_id}")
         else:
             print(f"⚠️ No cached permission found for user {user_id}")
 
-    @staticmethod
-    def split_text_and_json(response_text):
-        if not isinstance(response_text, str):
-            print(f"[⚠️] Invalid response_text type: {type(response_text)}")
-            return "", None
-
-        pattern = r"```json\s*(\{[\s\S]*?\})\s*```"
-        match = re.search(pattern, response_text)
-
-        if match:
-            json_part = match.group(1).strip()
-            text_without_json = re.sub(pattern, '', response_text, flags=re.DOTALL).strip()
-            return text_without_json, json_part
-
-        return response_text.strip(), None
+    split_text_and_json = staticmethod(split_text_and_json)
 
-    def split_main_and_followup(self, text: str, user_id: str) -> tuple:
+    def split_main_and_followup(self, text: str, history: ChatHistory, pending_messages=()) -> tuple:
         blocks = text.strip().split("\n\n")
         follow_up_keywords = get_follow_up_keywords()
-        history = get_chat_by_userid(user_id)
+        # Include the answers of this turn that are not saved yet
+        history_messages = (history.get() or []) + list(pending_messages)
 
         main = [b for b in blocks if not any(kw in b.lower() for kw in follow_up_keywords)]
         followup = [b for b in blocks if any(kw in b.lower() for kw in follow_up_keywords)]
 
-        if followup and self.has_answer_been_sent(history, follow_up_keywords):
+        if followup and self.has_answer_been_sent(history_messages, follow_up_keywords):
             followup = []
 
         return "\n\n".join(main), "\n\n".join(followup)
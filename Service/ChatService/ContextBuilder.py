@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+from collections import Counter
+
+# Fixed cost of a chat message (role, separators) on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "Tóm tắt các tin nhắn trước đó của khách: "
+
+
+def estimate_tokens(text) -> int:
+    """
+    Cheap local token estimate, no tokenizer download needed.
+
+    The OpenAI tokenizer splits accented Vietnamese syllables into about two tokens and ASCII words into one.
+    """
+    if not isinstance(text, str):
+        text = "" if text is None else str(text)
+    return sum(1 if piece.isascii() else 2 for piece in re.findall(r"\w+|[^\w\s]", text))
+
+
+def estimate_message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content"))
+    if message.get("function_call"):
+        tokens += estimate_tokens(str(message["function_call"]))
+    return tokens
+
+
+class ContextBuilder:
+    """
+    Fit the chat history and the FAQ part of the system prompt into token budgets.
+
+    History keeps the most recent messages that fit; older ones are folded into a short summary message.
+    The FAQ part is either the whole FAQ or the sections retrieved for the question, within the FAQ budget.
+    """
+
+    def __init__(self, history_token_budget=1500, faq_token_budget=2500, summary_token_budget=200):
+        self.history_token_budget = history_token_budget
+        self.faq_token_budget = faq_token_budget
+        self.summary_token_budget = summary_token_budget
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def trim_history(self, chat_history) -> list:
+        if not chat_history:
+            return chat_history
+
+        kept, used = [], 0
+        for message in reversed(chat_history):
+            tokens = estimate_message_tokens(message)
+            if used + tokens > self.history_token_budget:
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        # A function result is meaningless without the assistant call before it
+        while kept and kept[0].get("role") == "function":
+            used -= estimate_message_tokens(kept.pop(0))
+
+        dropped = chat_history[:len(chat_history) - len(kept)]
+        summary = self.summarize(dropped)
+        if summary:
+            kept.insert(0, summary)
+            used += estimate_message_tokens(summary)
+
+        with self._lock:
+            self._counters["histories"] += 1
+            self._counters["history_messages_in"] += len(chat_history)
+            self._counters["history_messages_dropped"] += len(dropped)
+            self._counters["history_tokens_in"] += sum(estimate_message_tokens(m) for m in chat_history)
+            self._counters["history_tokens_out"] += used
+        return kept
+
+    def summarize(self, messages: list):
+        """
+        Extractive summary of dropped messages: the customer's own earlier messages, newest kept first.
+        """
+        user_texts = [m["content"].strip() for m in messages
+                      if m.get("role") == "user" and isinstance(m.get("content"), str) and m["content"].strip()]
+        if not user_texts:
+            return None
+
+        parts, used = [], estimate_tokens(SUMMARY_PREFIX)
+        for text in reversed(user_texts):
+            tokens = estimate_tokens(text) + 1
+            if used + tokens > self.summary_token_budget:
+                break
+            parts.append(text)
+            used += tokens
+        if not parts:
+            return None
+        return {"role": "system", "content": SUMMARY_PREFIX + "; ".join(reversed(parts))}
+
+    def fits_faq_budget(self, faq_text: str) -> bool:
+        return estimate_tokens(faq_text) <= self.faq_token_budget
+
+    def select_faq(self, question: str, faq_index, top_k=None) -> str:
+        """
+        Join the `top_k` most relevant FAQ sections for the question, in FAQ order, up to the FAQ budget.
+
+        Follow-ups like "ok" or "vậy còn gói kia thì sao" match nothing; they get as much of the FAQ as fits
+        the budget instead of none of it.
+        """
+        hits = faq_index.search(question, top_k)
+        fallback = not hits
+        if fallback:
+            hits = [(position, 0.0) for position in range(len(faq_index.texts))]
+
+        selected, used = [], 0
+        for position, _ in hits:
+            tokens = faq_index.token_counts[position]
+            if used + tokens > self.faq_token_budget:
+                continue
+            selected.append(position)
+            used += tokens
+
+        with self._lock:
+            self._counters["faq_selections"] += 1
+            self._counters["faq_fallbacks"] += fallback
+            self._counters["faq_sections_selected"] += len(selected)
+            self._counters["faq_tokens_full"] += sum(faq_index.token_counts)
+            self._counters["faq_tokens_selected"] += used
+        return "\n".join(faq_index.texts[position] for position in sorted(selected))
+
+    def record_full_faq(self):
+        with self._lock:
+            self._counters["faq_full"] += 1
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        histories = counters.get("histories", 0)
+        selections = counters.get("faq_selections", 0)
+        return {
+            **counters,
+            "avg_history_tokens_in": round(counters.get("history_tokens_in", 0) / histories, 1) if histories else 0,
+            "avg_history_tokens_out": round(counters.get("history_tokens_out", 0) / histories, 1) if histories else 0,
+            "avg_faq_tokens_selected": round(counters.get("faq_tokens_selected", 0) / selections, 1)
+            if selections else 0,
+        }
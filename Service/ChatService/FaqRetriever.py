@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import math
+from collections import Counter, defaultdict
+
+from Service.ChatService.ContextBuilder import estimate_tokens
+from Service.ChatService.MessageClassifier import tokenize
+
+
+class FaqRetriever:
+    """
+    BM25 index over FAQ sections (one section per FAQ question) using accent-free unigram/bigram tokens.
+
+    The FAQ question is indexed twice so a match on it outweighs a match in a long answer.
+    """
+
+    def __init__(self, sections: dict, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.titles = list(sections)
+        self.texts = [sections[title] for title in self.titles]
+        self.token_counts = [estimate_tokens(text) for text in self.texts]
+        self.postings = defaultdict(dict)
+        self.lengths = []
+        for position, (title, text) in enumerate(zip(self.titles, self.texts)):
+            terms = Counter(tokenize(title) * 2 + tokenize(text))
+            for term, frequency in terms.items():
+                self.postings[term][position] = frequency
+            self.lengths.append(sum(terms.values()))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        section_count = len(self.titles)
+        self.idf = {
+            term: math.log(1 + (section_count - len(positions) + 0.5) / (len(positions) + 0.5))
+            for term, positions in self.postings.items()
+        }
+
+    def search(self, question: str, top_k=None) -> list:
+        """
+        Return [(position, score)] of the sections matching the question, best first.
+        """
+        scores = Counter()
+        for term in set(tokenize(question)):
+            for position, frequency in self.postings.get(term, {}).items():
+                length_norm = 1 - self.b + self.b * self.lengths[position] / self.average_length
+                scores[position] += self.idf[term] * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k] if top_k else ranked
@@ -3,9 +3,11 @@ from abc import ABC, abstractmethod
 
 class IChatService(ABC):
     @abstractmethod
-    def ask(self, user_input: str, user_id: str) -> dict:
+    def ask(self, user_input: str, user_id: str, on_first_block=None, history=None) -> dict:
         """
         Gửi tin nhắn và nhận phản hồi từ AI.
+        `on_first_block` nhận đoạn văn đầu tiên ngay khi có (chế độ streaming).
+        `history` là ChatHistory dùng chung trong lượt chat, để chỉ đọc lịch sử một lần.
         """
         pass
 
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from cachetools import LRUCache
+
+BOOKING_LABEL = "booking"
+
+# Matched against the normalized message with its accents: removing them merges different words
+# ("dắt chó" and "đặt chỗ" both become "dat cho"). The plain form is accepted for customers typing
+# without accents at all.
+DEFAULT_BOOKING_PATTERNS = [
+    r"\b(đặt|dat) (lịch|lich|hẹn|hen|chỗ|cho|slot|suất|suat)\b",
+    r"\b(hẹn|hen|giữ|giu|xếp|xep|lấy|lay) (lịch|lich)\b",
+    r"\bbook (lịch|lich|hẹn|hen|chỗ|cho|slot)\b",
+    r"\bbooking\b",
+    r"\b(đăng ký|dang ky) (lịch|lich|hẹn|hen)\b",
+]
+
+# Question words: "Có cần đặt lịch trước không?" mentions booking but asks for information
+QUESTION_PATTERN = re.compile(
+    r"\b(không|khong|ko|hông|chưa|gì|nào|sao|bao nhiêu|bao giờ|mấy|hả|hở|có cần|được không|đc không)\b"
+)
+
+
+def normalize_message(text: str) -> str:
+    """
+    Lowercase, strip punctuation and collapse whitespace so equivalent messages share a cache key.
+    """
+    text = unicodedata.normalize("NFC", text or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def looks_like_question(message: str) -> bool:
+    return "?" in (message or "") or QUESTION_PATTERN.search(normalize_message(message)) is not None
+
+
+def remove_vietnamese_accents(text: str) -> str:
+    text = unicodedata.normalize("NFD", text).replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in text if unicodedata.category(c) != "Mn")
+
+
+def tokenize(text: str) -> list:
+    words = remove_vietnamese_accents(normalize_message(text)).split()
+    # Unigrams plus bigrams, since Vietnamese meaning is carried by word pairs ("dat lich")
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesClassifier:
+    """
+    Multinomial naive Bayes over unigram/bigram tokens, small enough to retrain in-process.
+    """
+
+    def __init__(self):
+        self.label_counts = Counter()
+        self.token_counts = defaultdict(Counter)
+        self.token_totals = Counter()
+        self.vocabulary = set()
+
+    def fit(self, samples):
+        self.__init__()
+        for text, label in samples:
+            tokens = tokenize(text)
+            self.label_counts[label] += 1
+            self.token_counts[label].update(tokens)
+            self.token_totals[label] += len(tokens)
+            self.vocabulary.update(tokens)
+        return self
+
+    @property
+    def trained(self) -> bool:
+        return len(self.label_counts) > 1
+
+    def predict(self, text: str) -> tuple:
+        """
+        Return (label, confidence) for the most likely label.
+
+        The probability is scaled by the share of known words, so mostly unseen messages are never confident.
+        """
+        all_tokens = tokenize(text)
+        tokens = [token for token in all_tokens if token in self.vocabulary]
+        words = [token for token in all_tokens if "_" not in token]
+        coverage = sum(1 for word in words if word in self.vocabulary) / len(words) if words else 0
+        total_samples = sum(self.label_counts.values())
+        vocabulary_size = len(self.vocabulary)
+
+        log_scores = {}
+        for label, count in self.label_counts.items():
+            score = math.log(count / total_samples)
+            denominator = self.token_totals[label] + vocabulary_size
+            for token in tokens:
+                score += math.log((self.token_counts[label][token] + 1) / denominator)
+            log_scores[label] = score
+
+        best_label = max(log_scores, key=log_scores.get)
+        normalizer = sum(math.exp(score - log_scores[best_label]) for score in log_scores.values())
+        return best_label, coverage / normalizer
+
+
+class MessageClassifier:
+    """
+    Local fast path in front of the LLM "booking" classifier.
+
+    Order: LRU cache on the normalized text, then a naive Bayes model trained on messages previously
+    classified by the LLM. The LLM is called when the model is not confident.
+
+    A booking label turns the bot off for the customer, so it is never decided by keywords alone: booking
+    rules only add `rule_confidence_boost` to a booking prediction, and messages that look like questions
+    are never labelled booking locally.
+    """
+
+    def __init__(self, llm_classifier, training_loader=None, training_recorder=None, booking_patterns=None,
+                 confidence_threshold=0.95, rule_confidence_boost=0.1, min_training_samples=200,
+                 retrain_every=100, cache_size=5000):
+        self.llm_classifier = llm_classifier
+        self.training_loader = training_loader
+        self.training_recorder = training_recorder
+        self.booking_patterns = [re.compile(p) for p in (booking_patterns or DEFAULT_BOOKING_PATTERNS)]
+        self.confidence_threshold = confidence_threshold
+        self.rule_confidence_boost = rule_confidence_boost
+        self.min_training_samples = min_training_samples
+        self.retrain_every = retrain_every
+        self.model = NaiveBayesClassifier()
+        self._cache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self._llm_labels_since_training = 0
+        self._training = False
+        self._counters = Counter()
+        self._llm_seconds = 0.0
+
+    def classify(self, message: str) -> str:
+        key = normalize_message(message)
+
+        with self._lock:
+            label = self._cache.get(key)
+        if label is not None:
+            return self._record_local("cache", label)
+
+        if self.model.trained:
+            label, confidence = self.model.predict(key)
+            source = "model"
+            if label == BOOKING_LABEL:
+                if looks_like_question(message):
+                    confidence = 0
+                elif confidence < self.confidence_threshold and \
+                        any(pattern.search(key) for pattern in self.booking_patterns):
+                    confidence += self.rule_confidence_boost
+                    source = "rules"
+            if confidence >= self.confidence_threshold:
+                return self._remember(key, self._record_local(source, label))
+
+        started = time.perf_counter()
+        label = self.llm_classifier(message)
+        with self._lock:
+            self._llm_seconds += time.perf_counter() - started
+            self._counters["llm"] += 1
+            self._llm_labels_since_training += 1
+            should_retrain = self._llm_labels_since_training >= self.retrain_every
+        self._remember(key, label)
+
+        if self.training_recorder:
+            try:
+                self.training_recorder(key, label)
+            except Exception as e:
+                print(f"❌ Error saving classified message: {e}")
+        if should_retrain:
+            self.start_training()
+        return label
+
+    def _record_local(self, source: str, label: str) -> str:
+        with self._lock:
+            self._counters[source] += 1
+        return label
+
+    def _remember(self, key: str, label: str) -> str:
+        with self._lock:
+            self._cache[key] = label
+        return label
+
+    def train(self):
+        """
+        Refit the model on every message the LLM has classified so far.
+        """
+        if not self.training_loader:
+            return
+        samples = list(self.training_loader())
+        if len(samples) < self.min_training_samples:
+            print(f"ℹ️ Classifier has {len(samples)} samples, need {self.min_training_samples} before training")
+            return
+        model = NaiveBayesClassifier().fit(samples)
+        with self._lock:
+            self.model = model
+            self._llm_labels_since_training = 0
+        print(f"✅ Message classifier trained on {len(samples)} samples ({dict(model.label_counts)})")
+
+    def start_training(self):
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+            self._llm_labels_since_training = 0
+
+        def run():
+            try:
+                self.train()
+            except Exception as e:
+                print(f"❌ Error training message classifier: {e}")
+            finally:
+                self._training = False
+
+        threading.Thread(target=run, name="classifier-training", daemon=True).start()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            llm_calls = self._counters["llm"]
+            local = sum(count for source, count in self._counters.items() if source != "llm")
+            total = local + llm_calls
+            avg_llm_ms = self._llm_seconds / llm_calls * 1000 if llm_calls else 0
+            return {
+                **self._counters,
+                "local_hit_rate": round(local / total, 3) if total else 0,
+                "avg_llm_ms": round(avg_llm_ms, 1),
+                "estimated_saved_ms": round(local * avg_llm_ms),
+                "model_trained": self.model.trained,
+            }
@@ -1,51 +1,175 @@
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import openai
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from Database.Connection import get_functions, get_faq, get_chat_by_userid, get_welcome_prompt, get_prompt, \
-    get_follow_up_prompt, get_classify_prompt
+    get_follow_up_prompt, get_classify_prompt, config_cache, get_classified_messages, save_classified_message
+from Database.ChatHistory import ChatHistory
+from Service.ChatService.ContextBuilder import ContextBuilder
+from Service.ChatService.FaqRetriever import FaqRetriever
 from Service.ChatService.IChatService import IChatService
+from Service.ChatService.MessageClassifier import MessageClassifier, looks_like_question, normalize_message
+from Service.ChatService.ResponseCache import ResponseCache
 
 
 @dataclass
 class OpenAIChatService(IChatService):
     openai_key: str
     model: str
+    # Max concurrent completions when one message contains several questions
+    max_parallel_requests: int = 4
+    # Answer repeated FAQ-style questions from the response cache instead of the LLM
+    enable_response_cache: bool = True
+    # Shorter fragments ("ok", "vậy thì sao") only make sense together with the conversation before them
+    min_cacheable_question_words: int = 4
+    # Token budgets for the chat history and the FAQ part of the system prompt
+    history_token_budget: int = 1500
+    faq_token_budget: int = 2500
+    # FAQ sections retrieved per question once the whole FAQ no longer fits its budget; 0 means no limit
+    faq_top_k: int = 5
+    # Runs classification and context loading side by side
+    pipeline_executor: ThreadPoolExecutor = field(init=False, repr=False)
+    stage_metrics: dict = field(init=False, repr=False)
+    message_classifier: MessageClassifier = field(init=False, repr=False)
+    response_cache: ResponseCache = field(init=False, repr=False)
+    context_builder: ContextBuilder = field(init=False, repr=False)
 
     def __post_init__(self):
         openai.api_key = self.openai_key
-
-    def ask(self, user_input: str, user_id: str) -> dict:
-        classification = self.classify_message_with_prompt(user_input)
+        self.pipeline_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ask-pipeline")
+        self.stage_metrics = {}
+        self._stage_metrics_lock = threading.Lock()
+        # Skip the classify LLM call when the local classifier is confident
+        self.message_classifier = MessageClassifier(llm_classifier=self.classify_message_with_prompt,
+                                                    training_loader=get_classified_messages,
+                                                    training_recorder=save_classified_message)
+        self.response_cache = ResponseCache(version_provider=lambda: config_cache.generation)
+        self.context_builder = ContextBuilder(history_token_budget=self.history_token_budget,
+                                              faq_token_budget=self.faq_token_budget)
+
+    def ask(self, user_input: str, user_id: str, on_first_block=None, history: ChatHistory = None) -> dict:
+        timings = {}
+        started = time.perf_counter()
+
+        # Classification and context loading do not depend on each other, run them concurrently
+        classification_future = self.pipeline_executor.submit(
+            self.run_stage, timings, "classify", self.message_classifier.classify, user_input)
+        context_future = self.pipeline_executor.submit(
+            self.run_stage, timings, "load_context", self.load_context, user_id, history)
+
+        classification = classification_future.result()
         if classification == "booking":
-            return {"content": [{"content": "booking"}]}
+            # The context is not needed for a booking; let the loading finish in the background
+            self.record_timings(timings, started)
+            return {"content": [{"content": "booking"}], "timings": timings}
 
-        # Prepare data
-        functions = get_functions()
-        faq_data = self.filter_faq_data(get_faq())
-        chat_history = get_chat_by_userid(user_id=user_id)
+        functions, system_message, chat_history = context_future.result()
 
-        welcome_prompt = get_welcome_prompt() + "\n" if not chat_history else ""
-        formatted_faq_text = self.format_faq_data(faq_data)
+        results = self.run_stage(timings, "complete", self.complete_questions,
+                                 self.split_user_questions(user_input), system_message, chat_history, functions,
+                                 on_first_block)
 
-        system_message = {
+        self.record_timings(timings, started)
+        return {"content": results, "timings": timings}
+
+    def load_context(self, user_id: str, history: ChatHistory = None) -> tuple:
+        """
+        Load functions, the trimmed chat history and the system message needed for the main completion.
+        """
+        functions = get_functions()
+        chat_history = (history or ChatHistory(user_id)).get()
+        system_message = self.get_system_message(include_welcome=not chat_history)
+        return functions, system_message, self.context_builder.trim_history(chat_history)
+
+    def get_system_message(self, include_welcome: bool):
+        """
+        Return the system message with the whole FAQ while it fits the FAQ budget, otherwise a function of the
+        question that sends only the retrieved FAQ sections.
+        """
+        if self.context_builder.fits_faq_budget(self.get_formatted_faq()):
+            self.context_builder.record_full_faq()
+            return {"role": "system", "content": self.get_system_prompt(include_welcome)}
+
+        base_prompt = config_cache.get(("base_prompt", include_welcome),
+                                       lambda: self.render_base_prompt(include_welcome))
+        # Rebuilt whenever the FAQ changes, since config_cache is cleared on a config version bump
+        faq_retriever = config_cache.get("faq_retriever", lambda: FaqRetriever(self.get_faq_sections()))
+        return lambda question: {
             "role": "system",
-            "content": get_prompt() + "\n" +
-                       welcome_prompt + "Các thông tin FAQ có sẵn là:\n" +
-                       formatted_faq_text
+            "content": base_prompt + self.context_builder.select_faq(question, faq_retriever, self.faq_top_k or None)
         }
 
-        results = []
-        for q in self.split_user_questions(user_input):
-
-            # Build messages list
-            messages = [system_message]
-            if chat_history:
-                messages.extend(chat_history)
-            messages.append({"role": "user", "content": q})
+    @staticmethod
+    def run_stage(timings: dict, stage: str, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+    def record_timings(self, timings: dict, started: float):
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"⏱️ ask() stage timings (ms): {timings}")
+        with self._stage_metrics_lock:
+            for stage, elapsed_ms in timings.items():
+                metric = self.stage_metrics.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                metric["count"] += 1
+                metric["total_ms"] += elapsed_ms
+                metric["max_ms"] = max(metric["max_ms"], elapsed_ms)
+
+    def get_metrics(self) -> dict:
+        with self._stage_metrics_lock:
+            return {
+                stage: {**metric, "avg_ms": round(metric["total_ms"] / metric["count"], 1)}
+                for stage, metric in self.stage_metrics.items()
+            }
+
+    def complete_questions(self, questions: list, system_message: dict, chat_history: list, functions: list,
+                           on_first_block=None) -> list:
+        """
+        Send every question to OpenAI concurrently (up to `max_parallel_requests`) and keep the input order.
 
-            # Send to OpenAI
+        Only the first question streams its first paragraph to `on_first_block`, so messages are sent in order.
+        `system_message` may also be a function of the question, see `get_system_message`.
+        """
+        def complete(index_and_question):
+            index, q = index_and_question
+            return self.complete_question(q, system_message, chat_history, functions,
+                                          on_first_block if index == 0 else None)
+
+        if len(questions) <= 1 or self.max_parallel_requests <= 1:
+            return [complete(item) for item in enumerate(questions)]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel_requests, len(questions))) as executor:
+            return list(executor.map(complete, enumerate(questions)))
+
+    def complete_question(self, question: str, system_message: dict, chat_history: list, functions: list,
+                          on_first_block=None) -> dict:
+        # Only answers written without chat history are cached: a reply to one user's conversation must never
+        # be served to another user
+        cache_scope = "new"
+        use_cache = self.enable_response_cache and not chat_history and self.is_cacheable_question(question)
+        if use_cache:
+            cached_reply = self.response_cache.get(question, cache_scope)
+            if cached_reply is not None:
+                return cached_reply
+
+        # Build messages list
+        if callable(system_message):
+            system_message = system_message(question)
+        messages = [system_message]
+        if chat_history:
+            messages.extend(chat_history)
+        messages.append({"role": "user", "content": question})
+
+        # Send to OpenAI
+        if on_first_block:
+            reply = self.stream_completion(messages, functions, on_first_block)
+        else:
             response = openai.ChatCompletion.create(
                 model=self.model,  # Đổi từ gpt-4-turbo
                 functions=functions,
@@ -54,15 +178,102 @@ class OpenAIChatService(IChatService):
                 temperature=0.7,
                 # max_tokens=150,
             )
-
             reply = response['choices'][0]['message']
-            content = reply.get("content", "")
-            if isinstance(content, str):
-                content = self.correct_price_in_response(content)
-            reply["content"] = content
-            results.append(reply)
 
-        return {"content": results}
+        content = reply.get("content", "")
+        if isinstance(content, str):
+            content = self.correct_price_in_response(content)
+        reply["content"] = content
+
+        if use_cache and self.is_cacheable_reply(reply):
+            self.response_cache.put(question, reply, cache_scope)
+        return reply
+
+    def stream_completion(self, messages: list, functions: list, on_first_block) -> dict:
+        """
+        Stream the completion and hand the first complete "\n\n" paragraph to `on_first_block` as soon as
+        it arrives. Return the full reply in the same shape as a non-streamed message.
+        """
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            functions=functions,
+            function_call="auto",
+            messages=messages,
+            temperature=0.7,
+            stream=True,
+        )
+
+        content_parts = []
+        function_call = None
+        first_block_handled = False
+        for chunk in response:
+            delta = chunk['choices'][0].get('delta', {})
+            if delta.get("function_call"):
+                function_call = function_call or {"name": "", "arguments": ""}
+                function_call["name"] += delta["function_call"].get("name") or ""
+                function_call["arguments"] += delta["function_call"].get("arguments") or ""
+            if delta.get("content"):
+                content_parts.append(delta["content"])
+
+            if not first_block_handled and function_call is None:
+                text = "".join(content_parts).lstrip()
+                if "\n\n" in text:
+                    first_block_handled = True
+                    first_block = text.split("\n\n", 1)[0].strip()
+                    if first_block:
+                        on_first_block(self.correct_price_in_response(first_block))
+
+        reply = {"role": "assistant", "content": "".join(content_parts) if content_parts else None}
+        if function_call is not None:
+            reply["function_call"] = function_call
+        return reply
+
+    def is_cacheable_question(self, question: str) -> bool:
+        """
+        Only full questions are cached, not acknowledgements or short follow-up fragments.
+        """
+        return (len(normalize_message(question).split()) >= self.min_cacheable_question_words
+                and looks_like_question(question))
+
+    @staticmethod
+    def is_cacheable_reply(reply: dict) -> bool:
+        """
+        Only plain text answers are reused; function calls and booking replies depend on the user.
+        """
+        content = reply.get("content")
+        return (isinstance(content, str) and bool(content.strip()) and "function_call" not in reply
+                and content.strip().lower() != "booking")
+
+    def get_system_prompt(self, include_welcome: bool) -> str:
+        """
+        Return the rendered system prompt, built once per config version.
+        """
+        return config_cache.get(("system_prompt", include_welcome),
+                                lambda: self.render_system_prompt(include_welcome))
+
+    def render_system_prompt(self, include_welcome: bool) -> str:
+        """
+        Render the main prompt, the optional welcome prompt and the formatted FAQ into one system message.
+        """
+        return self.render_base_prompt(include_welcome) + self.get_formatted_faq()
+
+    @staticmethod
+    def render_base_prompt(include_welcome: bool) -> str:
+        welcome_prompt = get_welcome_prompt() + "\n" if include_welcome else ""
+        return (get_prompt() + "\n" +
+                welcome_prompt + "Các thông tin FAQ có sẵn là:\n")
+
+    def get_faq_sections(self) -> dict:
+        """
+        Formatted FAQ text per FAQ question, built once per config version.
+        """
+        return config_cache.get("faq_sections", lambda: {
+            question: self.format_faq_data({question: answer})
+            for question, answer in self.filter_faq_data(get_faq()).items()
+        })
+
+    def get_formatted_faq(self) -> str:
+        return config_cache.get("formatted_faq", lambda: "\n".join(self.get_faq_sections().values()))
 
     @staticmethod
     def correct_price_in_response(text: str) -> str:
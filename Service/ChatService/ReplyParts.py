@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import re
+from typing import Optional
+
+JSON_BLOCK_PATTERN = r"```json\s*(\{[\s\S]*?\})\s*```"
+
+
+def split_text_and_json(response_text):
+    """
+    Split a reply into its text and the ```json block the Messenger template is built from.
+    """
+    if not isinstance(response_text, str):
+        print(f"[⚠️] Invalid response_text type: {type(response_text)}")
+        return "", None
+
+    match = re.search(JSON_BLOCK_PATTERN, response_text)
+
+    if match:
+        json_part = match.group(1).strip()
+        text_without_json = re.sub(JSON_BLOCK_PATTERN, '', response_text, flags=re.DOTALL).strip()
+        return text_without_json, json_part
+
+    return response_text.strip(), None
+
+
+def join_text_and_json(text_part, json_part) -> str:
+    """
+    The message text for a reply with a JSON part, as MessageClient.send_message builds it minus an empty
+    text part.
+    """
+    return "\n\n".join(part for part in (text_part, json_part) if part)
+
+
+def first_block_to_send(block: str, follow_up_keywords) -> Optional[str]:
+    """
+    Return the streamed first paragraph when it can be sent before the full answer, or None when it must
+    wait: JSON templates, the "booking" marker and follow-up paragraphs are only known from the full reply.
+    """
+    content = (block or "").strip()
+    if not content or "```" in content or content.lower() == "booking":
+        return None
+    if any(kw in content.lower() for kw in follow_up_keywords):
+        return None
+    return content
+
+
+def remove_sent_prefix(text, sent_prefix):
+    """
+    Drop the paragraph already sent while streaming from the start of `text`. Whitespace is compared
+    loosely, since the full reply may wrap or indent the paragraph differently.
+    """
+    if not sent_prefix:
+        return text
+    if text.startswith(sent_prefix):
+        return text[len(sent_prefix):].strip()
+    words = sent_prefix.split()
+    match = re.match(r"\s*" + r"\s+".join(re.escape(word) for word in words), text)
+    if match:
+        return text[match.end():].strip()
+    return text
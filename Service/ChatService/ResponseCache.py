@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, Counter
+
+from Service.ChatService.MessageClassifier import normalize_message
+
+
+def character_ngrams(text: str, size=3) -> set:
+    padded = f" {text} "
+    return {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+
+
+class ResponseCache:
+    """
+    Cache of LLM answers for frequently repeated questions.
+
+    Lookups try the exact normalized question first, then the most similar cached question by character
+    trigram Jaccard similarity. Entries are scoped by the caller and dropped when the config cache
+    generation changes, so an answer is never reused after the prompt or FAQ changes. Eviction is LRU
+    bounded by `maxsize`, plus a TTL.
+    """
+
+    def __init__(self, maxsize=1000, ttl_seconds=6 * 3600, similarity_threshold=0.8, version_provider=None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version_provider = version_provider or (lambda: None)
+        self._entries = OrderedDict()
+        self._ngram_index = defaultdict(set)
+        self._version = None
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        # Accents are kept: "đau xé" and "đậu xe" are different questions
+        return normalize_message(question)
+
+    def get(self, question: str, scope=None):
+        text = self.normalize(question)
+        if not text:
+            return None
+        with self._lock:
+            self._check_version()
+            key = (scope, text)
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                self._counters["exact_hits"] += 1
+                return copy.deepcopy(entry["reply"])
+
+            similar_key = self._find_similar(scope, text)
+            if similar_key is not None:
+                self._entries.move_to_end(similar_key)
+                self._counters["similar_hits"] += 1
+                return copy.deepcopy(self._entries[similar_key]["reply"])
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, question: str, reply: dict, scope=None):
+        text = self.normalize(question)
+        if not text:
+            return
+        with self._lock:
+            self._check_version()
+            key = (scope, text)
+            if key in self._entries:
+                self._remove(key)
+            grams = character_ngrams(text)
+            self._entries[key] = {"reply": copy.deepcopy(reply), "grams": grams, "created_at": time.monotonic(),
+                                  "numbers": re.findall(r"\d+", text)}
+            for gram in grams:
+                self._ngram_index[gram].add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._ngram_index.clear()
+
+    def _check_version(self):
+        version = self.version_provider()
+        if version != self._version:
+            self._entries.clear()
+            self._ngram_index.clear()
+            self._version = version
+
+    def _expired(self, entry) -> bool:
+        return time.monotonic() - entry["created_at"] > self.ttl_seconds
+
+    def _find_similar(self, scope, text):
+        grams = character_ngrams(text)
+        overlaps = Counter()
+        for gram in grams:
+            for key in self._ngram_index.get(gram, ()):
+                if key[0] == scope:
+                    overlaps[key] += 1
+
+        numbers = re.findall(r"\d+", text)
+        best_key, best_score = None, 0.0
+        for key, overlap in overlaps.items():
+            entry = self._entries[key]
+            # "3 người" and "5 người" are close as text but need different answers
+            if entry["numbers"] != numbers or self._expired(entry):
+                continue
+            score = overlap / (len(grams) + len(entry["grams"]) - overlap)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity_threshold else None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for gram in entry["grams"]:
+            keys = self._ngram_index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._ngram_index[gram]
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["similar_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0,
+            }
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScheduledTask:
+    __slots__ = ("deadline", "key", "fn", "args", "cancelled")
+
+    def __init__(self, deadline, key, fn, args):
+        self.deadline = deadline
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DelayScheduler:
+    """
+    Run delayed callbacks from one timer thread backed by a heap, dispatching them to a fixed worker pool.
+
+    `debounce(key, ...)` replaces the pending callback for the same key, so a burst of messages from
+    thousands of users keeps a constant number of threads instead of one threading.Timer per message.
+    """
+
+    def __init__(self, worker_count=8, name="delay-scheduler"):
+        self.name = name
+        self.worker_count = worker_count
+        self._heap = []
+        self._keyed = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix=f"{name}-worker")
+        self._cancelled_count = 0
+        self._running = True
+        self._draining = False
+        self._active = 0
+        self._counters = {"scheduled": 0, "replaced": 0, "dispatched": 0, "failed": 0, "max_lag_ms": 0.0}
+        self._timer_thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._timer_thread.start()
+
+    def call_later(self, delay, fn, *args) -> ScheduledTask:
+        return self._schedule(None, delay, fn, args)
+
+    def debounce(self, key, delay, fn, *args) -> ScheduledTask:
+        """
+        Schedule `fn(*args)` after `delay` seconds, cancelling the pending call for `key` if any.
+        """
+        return self._schedule(key, delay, fn, args)
+
+    def cancel(self, key) -> bool:
+        with self._condition:
+            task = self._keyed.pop(key, None)
+            if task is None:
+                return False
+            self._cancel_locked(task)
+            return True
+
+    def _schedule(self, key, delay, fn, args):
+        task = ScheduledTask(time.monotonic() + delay, key, fn, args)
+        with self._condition:
+            if not self._running:
+                raise RuntimeError(f"{self.name} has been shut down")
+            if key is not None:
+                previous = self._keyed.get(key)
+                if previous is not None:
+                    self._cancel_locked(previous)
+                    self._counters["replaced"] += 1
+                self._keyed[key] = task
+            heapq.heappush(self._heap, (task.deadline, next(self._sequence), task))
+            self._counters["scheduled"] += 1
+            self._condition.notify()
+        return task
+
+    def _cancel_locked(self, task):
+        task.cancel()
+        self._cancelled_count += 1
+        # Cancelled entries are removed lazily; compact when they dominate the heap
+        if self._cancelled_count > 1024 and self._cancelled_count > len(self._heap) // 2:
+            self._heap = [item for item in self._heap if not item[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled_count = 0
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and (not self._heap or
+                                         (not self._draining and self._heap[0][0] > time.monotonic())):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+                _, _, task = heapq.heappop(self._heap)
+                if task.cancelled:
+                    self._cancelled_count = max(0, self._cancelled_count - 1)
+                    continue
+                if task.key is not None and self._keyed.get(task.key) is task:
+                    del self._keyed[task.key]
+                lag_ms = (time.monotonic() - task.deadline) * 1000
+                self._counters["max_lag_ms"] = max(self._counters["max_lag_ms"], round(lag_ms, 2))
+                self._counters["dispatched"] += 1
+                self._active += 1
+            self._executor.submit(self._execute, task)
+
+    def _execute(self, task):
+        try:
+            task.fn(*task.args)
+        except Exception as e:
+            with self._condition:
+                self._counters["failed"] += 1
+            print(f"❌ Error in scheduled task {task.key or task.fn}: {e}")
+            traceback.print_exc()
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    @property
+    def draining(self) -> bool:
+        """
+        True once `drain` started: callbacks run ahead of their deadline and can skip their own waiting checks.
+        """
+        with self._condition:
+            return self._draining
+
+    def drain(self, timeout=10) -> bool:
+        """
+        Run every pending callback now instead of at its deadline, including callbacks scheduled by them,
+        and wait up to `timeout` seconds for all of them to finish. Return True when nothing is left.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._draining = True
+            pending = len(self._heap) - self._cancelled_count
+            self._condition.notify_all()
+            if pending or self._active:
+                print(f"🛑 Draining {self.name} ({pending} pending)...")
+            while self._running and (self._active or len(self._heap) > self._cancelled_count):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠️ {self.name} drain timed out with {len(self._heap) - self._cancelled_count} pending")
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._heap) - self._cancelled_count
+
+    def shutdown(self, wait=True):
+        """
+        Stop the timer thread; callbacks already dispatched finish on the worker pool. Callbacks still
+        waiting for their deadline are dropped, call `drain` first to run them.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._timer_thread.join(timeout=5)
+        self._executor.shutdown(wait=wait)
+
+    def get_metrics(self) -> dict:
+        with self._condition:
+            return {
+                **self._counters,
+                "pending": len(self._heap) - self._cancelled_count,
+                "workers": self.worker_count,
+            }
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from Service.RateLimiter import RateLimiter
+
+
+class FollowUpCampaign:
+    """
+    Send follow-up reminders to many users concurrently.
+
+    Each target goes through `compose(user_id, hour_diff)` (the LLM call) and `deliver(user_id, text)`
+    (the Graph API send), each behind its own rate limiter, on a bounded worker pool. Progress is
+    checkpointed per user so re-running the same `campaign_id` only handles users not reached yet.
+    """
+
+    def __init__(self, compose, deliver, checkpoint, max_workers=8, compose_limiter: RateLimiter = None,
+                 deliver_limiter: RateLimiter = None, progress_every=50):
+        self.compose = compose
+        self.deliver = deliver
+        self.checkpoint = checkpoint
+        self.max_workers = max_workers
+        self.compose_limiter = compose_limiter or RateLimiter(0)
+        self.deliver_limiter = deliver_limiter or RateLimiter(0)
+        self.progress_every = progress_every
+        self._lock = threading.Lock()
+        self._report = {}
+        self._last_report = None
+
+    def run(self, campaign_id, targets, should_continue=None) -> dict:
+        """
+        Process `targets`, an iterable of (user_id, hour_diff), and return the run report.
+
+        `should_continue` is checked before each user; once it returns False no more users are started and
+        the report is marked `interrupted`, so the run can be resumed later under the same `campaign_id`.
+        """
+        done = self.checkpoint.completed_user_ids(campaign_id)
+        if done:
+            print(f"🔁 Resuming {campaign_id}: {len(done)} users already reached")
+
+        counters = Counter()
+        started = time.monotonic()
+        with self._lock:
+            self._report = {"campaign_id": campaign_id, "running": True, "counters": counters, "started": started}
+
+        # Bounded submission keeps memory flat however many targets the cursor yields
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        interrupted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="follow-up") as executor:
+            for user_id, hour_diff in targets:
+                if should_continue is not None and not should_continue():
+                    print(f"⏸ Follow-up campaign {campaign_id} interrupted")
+                    interrupted = True
+                    break
+                if user_id in done:
+                    self._count(counters, "skipped")
+                    continue
+                slots.acquire()
+                future = executor.submit(self._process, campaign_id, user_id, hour_diff, counters)
+                future.add_done_callback(lambda _: slots.release())
+
+        report = {**self._build_report(campaign_id, counters, started, running=False), "interrupted": interrupted}
+        with self._lock:
+            self._report = {}
+            self._last_report = report
+        print(f"✅ Follow-up campaign finished: {report}")
+        return report
+
+    def _process(self, campaign_id, user_id, hour_diff, counters):
+        try:
+            self.compose_limiter.acquire()
+            text = self.compose(user_id, hour_diff)
+            if not text:
+                self.checkpoint.mark(campaign_id, user_id, "empty")
+                self._count(counters, "empty")
+                return
+            self.deliver_limiter.acquire()
+            self.deliver(user_id, text)
+            self.checkpoint.mark(campaign_id, user_id, "sent")
+            self._count(counters, "sent")
+        except Exception as e:
+            print(f"❌ Follow-up to {user_id} failed: {e}")
+            self._count(counters, "failed")
+            try:
+                self.checkpoint.mark(campaign_id, user_id, "failed", error=str(e))
+            except Exception as checkpoint_error:
+                print(f"❌ Error saving follow-up checkpoint for {user_id}: {checkpoint_error}")
+
+    def _count(self, counters, outcome):
+        with self._lock:
+            counters[outcome] += 1
+            processed = sum(counters.values())
+            report = self._report
+        if processed % self.progress_every == 0 and report:
+            print(f"📈 Follow-up progress: {self._build_report(report['campaign_id'], counters, report['started'])}")
+
+    def _build_report(self, campaign_id, counters, started, running=True) -> dict:
+        with self._lock:
+            counts = dict(counters)
+        elapsed = time.monotonic() - started
+        handled = counts.get("sent", 0) + counts.get("failed", 0) + counts.get("empty", 0)
+        return {
+            "campaign_id": campaign_id,
+            "running": running,
+            **counts,
+            "elapsed_seconds": round(elapsed, 1),
+            "per_minute": round(handled / elapsed * 60, 1) if elapsed else 0,
+        }
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            report = self._report
+            last_report = self._last_report
+        return {
+            "current": self._build_report(report["campaign_id"], report["counters"], report["started"])
+            if report else None,
+            "last": last_report,
+            "openai_limiter": self.compose_limiter.get_metrics(),
+            "graph_limiter": self.deliver_limiter.get_metrics(),
+        }
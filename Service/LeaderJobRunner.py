@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from Database.JobRunHistory import JobRunHistory
+from Database.LeaderLease import LeaderLease
+
+
+class LeaderJobRunner:
+    """
+    Daily cron jobs run by the holder of a LeaderLease only, whichever worker or node that is.
+
+    Each run is claimed in the job history under a key made of the job name and its scheduled time, so a
+    schedule runs once even if the cron fires on several workers. The cron fires while the lease may be
+    changing hands, so a worker that becomes leader also catches up on schedules from the last
+    `catch_up_hours` that have no recorded run, and resumes runs left unfinished by the previous leader.
+
+    Jobs are called with their `run_key`, so a resumed run can pick up its own progress.
+    """
+
+    def __init__(self, lease: LeaderLease, job_runs: JobRunHistory, scheduler=None, catch_up_hours=12):
+        self.lease = lease
+        self.job_runs = job_runs
+        self.scheduler = scheduler or BackgroundScheduler()
+        self.catch_up_hours = catch_up_hours
+        self._jobs = {}
+
+    def add_daily_job(self, job, fn, hour, minute=0):
+        self._jobs[job] = (fn, hour, minute)
+        self.scheduler.add_job(self.run_job, 'cron', hour=hour, minute=minute, id=job, args=[job])
+
+    def start(self):
+        self.scheduler.add_job(self.renew_leadership, 'interval', seconds=max(1, self.lease.ttl_seconds // 3),
+                               id="leader_lease", next_run_time=datetime.now())
+        self.scheduler.start()
+
+    def renew_leadership(self):
+        was_leader = self.lease.is_leader
+        if self.lease.try_acquire() and not was_leader:
+            # Catching up can take minutes: run it as its own job so lease renewals keep going
+            self.scheduler.add_job(self.catch_up, id="catch_up", replace_existing=True)
+
+    def catch_up(self, now=None):
+        now = now or datetime.now()
+        for job in self._jobs:
+            scheduled_for = self.last_scheduled_time(job, now)
+            if now - scheduled_for <= timedelta(hours=self.catch_up_hours):
+                self.run_job(job, scheduled_for)
+
+    def last_scheduled_time(self, job, now=None) -> datetime:
+        _, hour, minute = self._jobs[job]
+        now = now or datetime.now()
+        scheduled_for = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return scheduled_for if scheduled_for <= now else scheduled_for - timedelta(days=1)
+
+    @staticmethod
+    def run_key(job, scheduled_for: datetime) -> str:
+        return f"{job}:{scheduled_for:%Y-%m-%dT%H:%M}"
+
+    def run_job(self, job, scheduled_for: datetime = None):
+        """
+        Run `job` for its latest schedule if this worker is leader and that run was not claimed yet, or was
+        left unfinished by a previous leader.
+
+        A job returning a dict with `interrupted` set is recorded as interrupted, to be resumed later.
+        """
+        if not self.lease.is_leader:
+            print(f"⏭ Bỏ qua {job}: worker này không phải leader.")
+            return None
+        run_key = self.run_key(job, scheduled_for or self.last_scheduled_time(job))
+        if not self.job_runs.start(job, run_key, self.lease.owner_id):
+            if not self.job_runs.take_over(run_key, self.lease.owner_id):
+                print(f"⏭ Bỏ qua {job}: lần chạy {run_key} đã được worker khác nhận.")
+                return None
+            print(f"🔁 Tiếp tục lần chạy dang dở {run_key}")
+
+        fn = self._jobs[job][0]
+        try:
+            result = fn(run_key=run_key)
+            interrupted = isinstance(result, dict) and result.get("interrupted")
+            self.job_runs.finish(run_key, "interrupted" if interrupted else "succeeded", result=result)
+            return result
+        except Exception as e:
+            print(f"❌ Job {job} thất bại: {e}")
+            self.job_runs.finish(run_key, "failed", error=str(e))
+            return None
+
+    def shutdown(self):
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        self.lease.release()
+
+    def get_metrics(self) -> dict:
+        return {
+            "lease": self.lease.get_metrics(),
+            "jobs": {job.id: str(job.next_run_time) for job in self.scheduler.get_jobs()},
+        }
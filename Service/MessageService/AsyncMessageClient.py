@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+
+from Service.MessageService.GraphHttpClient import GRAPH_BASE_URL, GRAPH_POOL_SIZE, GRAPH_CONNECT_TIMEOUT_SECONDS, \
+    GRAPH_READ_TIMEOUT_SECONDS, GRAPH_MAX_RETRIES, GRAPH_BACKOFF_SECONDS, IDEMPOTENT_METHODS, is_retryable_status
+
+
+class AsyncMessageClient:
+    """
+    asyncio variant of the Graph API calls in MessageClient, for sending many messages concurrently
+    from one thread (e.g. bulk follow-ups). Uses a pooled httpx.AsyncClient and the same retry policy.
+
+    Only talks to the Graph API; chat logging and sheet updates stay in MessageClient.
+    """
+
+    def __init__(self, page_access_token, page_id, graph_base_url=GRAPH_BASE_URL, pool_size=GRAPH_POOL_SIZE,
+                 max_retries=GRAPH_MAX_RETRIES, backoff_seconds=GRAPH_BACKOFF_SECONDS, verify=True):
+        self.page_access_token = page_access_token
+        self.page_id = page_id
+        self.graph_base_url = graph_base_url.rstrip("/")
+        self.api_url = f'{self.graph_base_url}/v21.0/me/messages'
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.client = httpx.AsyncClient(
+            headers={'Authorization': f'Bearer {self.page_access_token}'},
+            timeout=httpx.Timeout(GRAPH_READ_TIMEOUT_SECONDS, connect=GRAPH_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            verify=verify,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def request(self, method, url, **kwargs) -> httpx.Response:
+        """
+        Send a request with exponential backoff (honouring Retry-After), using the same policy as
+        `create_graph_session`: 429 and connection failures always, 5xx and other transport errors
+        only for reads, since a send may already have been delivered.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                not_sent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if attempt == self.max_retries or not (not_sent or method.upper() in IDEMPOTENT_METHODS):
+                    raise
+                await asyncio.sleep(self.backoff_seconds * 2 ** attempt)
+                continue
+            if not is_retryable_status(method, response.status_code) or attempt == self.max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else self.backoff_seconds * 2 ** attempt
+            await asyncio.sleep(delay)
+
+    async def send_message(self, recipient_id, message_text, tag=None) -> dict:
+        data = {
+            'recipient': {'id': recipient_id},
+            'message': {'text': message_text}
+        }
+        if tag:
+            data["tag"] = tag
+        response = await self.request("POST", self.api_url, json=data)
+        return response.json()
+
+    async def send_image(self, recipient_id, image_url="https://i.imgur.com/I0IFANJ.png") -> dict:
+        data = {
+            'recipient': {'id': recipient_id},
+            'message': {'attachment': {"type": "image", "payload": {"url": image_url}}}
+        }
+        response = await self.request("POST", self.api_url, json=data)
+        return response.json()
+
+    async def get_conversation_id(self, user_id):
+        try:
+            response = await self.request("GET", f'{self.graph_base_url}/v22.0/me/conversations', params={
+                'user_id': user_id,
+                'platform': 'MESSENGER',
+                'access_token': self.page_access_token
+            })
+            if response.status_code == 200:
+                return response.json().get('data')[0].get('id')
+        except Exception as e:
+            print(f"❌ Lỗi khi lấy ID cuộc trò chuyện: {e}")
+        return None
+
+    async def get_user_name_from_conversation_id(self, user_id) -> str:
+        try:
+            # One call: the conversation with its participants, without the messages
+            response = await self.request("GET", f'{self.graph_base_url}/v22.0/me/conversations', params={
+                'user_id': user_id,
+                'platform': 'MESSENGER',
+                'fields': 'participants',
+                'access_token': self.page_access_token
+            })
+            if response.status_code == 200:
+                conversations = response.json().get('data') or [{}]
+                participants = conversations[0].get('participants', {}).get('data', [])
+                return next((item.get('name', 'Người dùng') for item in participants
+                             if item.get('id') != self.page_id), 'Người dùng')
+        except Exception as e:
+            print(f"❌ Lỗi khi lấy tên người dùng từ ID cuộc trò chuyện: {e}")
+        return "Người dùng"
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL", "https://graph.facebook.com")
+GRAPH_POOL_SIZE = int(os.getenv("GRAPH_POOL_SIZE", "20"))
+GRAPH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GRAPH_CONNECT_TIMEOUT_SECONDS", "3"))
+GRAPH_READ_TIMEOUT_SECONDS = float(os.getenv("GRAPH_READ_TIMEOUT_SECONDS", "10"))
+GRAPH_MAX_RETRIES = int(os.getenv("GRAPH_MAX_RETRIES", "3"))
+GRAPH_BACKOFF_SECONDS = float(os.getenv("GRAPH_BACKOFF_SECONDS", "0.5"))
+# Rate limiting and transient server errors; other 4xx mean the request itself is wrong
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# A 5xx or a read timeout on a send may come after Facebook delivered the message, so sends only retry
+# a 429, which means the request was rejected before being processed
+NON_IDEMPOTENT_RETRY_STATUS_CODES = (429,)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def is_retryable_status(method, status_code) -> bool:
+    if method.upper() in IDEMPOTENT_METHODS:
+        return status_code in RETRY_STATUS_CODES
+    return status_code in NON_IDEMPOTENT_RETRY_STATUS_CODES
+
+
+class GraphRetry(Retry):
+    """
+    urllib3 retry policy whose status retries depend on the method (see `is_retryable_status`).
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if not is_retryable_status(method, status_code):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_graph_session(pool_size=GRAPH_POOL_SIZE, max_retries=GRAPH_MAX_RETRIES,
+                         backoff_seconds=GRAPH_BACKOFF_SECONDS) -> requests.Session:
+    """
+    Keep-alive session for the Graph API: one TLS handshake per pooled connection instead of per call,
+    with exponential backoff retries (honouring Retry-After) on 429, on 5xx for reads, and on connection
+    failures. Read timeouts are never retried: the request may already have been processed.
+    """
+    retry = GraphRetry(
+        total=max_retries,
+        read=0,
+        backoff_factor=backoff_seconds,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class GraphHttpClient:
+    """
+    Thread-safe Graph API transport: pooled session, default timeouts and call metrics.
+    """
+
+    def __init__(self, session: requests.Session = None,
+                 timeout=(GRAPH_CONNECT_TIMEOUT_SECONDS, GRAPH_READ_TIMEOUT_SECONDS)):
+        self.session = session or create_graph_session()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._request_seconds = 0.0
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record("errors", started)
+            raise
+        self._record("requests" if response.ok else "failed_responses", started)
+        return response
+
+    def _record(self, outcome, started):
+        with self._lock:
+            self._counters[outcome] += 1
+            self._request_seconds += time.perf_counter() - started
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            calls = sum(self._counters.values())
+            return {
+                **self._counters,
+                "avg_ms": round(self._request_seconds / calls * 1000, 1) if calls else 0,
+            }
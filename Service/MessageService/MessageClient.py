@@ -1,20 +1,36 @@
 # -*- coding: utf-8 -*-
 import requests
 
-from Database.Connection import post_chat, get_constant_message
+from Database.Connection import post_chat, get_constant_message, get_user_profile, save_user_profile
 from Database.SheetConnection import save_booking_to_sheet, add_user_to_sheet, get_chatbot_turn_on, \
     get_user_existed_on_sheet, get_follow_up_turn_on
+from Service.MessageService.GraphHttpClient import GraphHttpClient, GRAPH_BASE_URL
+from Service.MessageService.UserProfileCache import UserProfileCache
+
+DEFAULT_USER_NAME = "Người dùng"
 
 
 class MessageClient:
-    def __init__(self, page_access_token, page_id):
+    def __init__(self, page_access_token, page_id, http_client: GraphHttpClient = None, graph_base_url=GRAPH_BASE_URL):
         self.page_access_token = page_access_token
         self.page_id = page_id
-        self.api_url = 'https://graph.facebook.com/v21.0/me/messages'
+        self.graph_base_url = graph_base_url.rstrip("/")
+        self.api_url = f'{self.graph_base_url}/v21.0/me/messages'
         self.headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.page_access_token}'
         }
+        # Pooled keep-alive session with timeouts and retries, shared by every Graph API call below
+        self.http = http_client or GraphHttpClient()
+        # Names are read from memory, then MongoDB, and only fetched from Facebook when unknown
+        self.user_profiles = UserProfileCache(fetcher=self.fetch_user_name, store_loader=get_user_profile,
+                                              store_saver=save_user_profile)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        return self.http.request(method, url, **kwargs)
+
+    def get_metrics(self) -> dict:
+        return self.http.get_metrics()
 
     # Gửi tin nhắn trả lời qua Facebook Messenger
     def send_message(self, recipient_id, message_text, user_input_message):
@@ -39,7 +55,7 @@ class MessageClient:
             return {"error": "Tin nhắn rỗng, không gửi đi"}
         else:
             try:
-                response = requests.post(self.api_url, headers=self.headers, json=data)
+                response = self.request("POST", self.api_url, headers=self.headers, json=data)
                 response.raise_for_status()
                 result = response.json()
                 print(f"✅ Đã gửi tin nhắn thành công: {result}")
@@ -55,7 +71,8 @@ class MessageClient:
             'recipient': {'id': recipient_id},
             'message': {'text': get_constant_message("introduce")}
         }
-        response = requests.post(
+        response = self.request(
+            "POST",
             self.api_url,
             headers=self.headers,
             json=data
@@ -84,7 +101,7 @@ class MessageClient:
                 }
             }
         }
-        response = requests.post(self.api_url, headers=self.headers, json=data)
+        response = self.request("POST", self.api_url, headers=self.headers, json=data)
         return response.json()
 
     def send_message_with_no_logs(self, recipient_id, message_text):
@@ -95,7 +112,7 @@ class MessageClient:
             },
             "tag": "CONFIRMED_EVENT_UPDATE"
         }
-        response = requests.post(self.api_url, headers=self.headers, json=data)
+        response = self.request("POST", self.api_url, headers=self.headers, json=data)
         return response.json()
 
     def save_user(self, user_id, is_chatbot_on=False):
@@ -132,13 +149,13 @@ class MessageClient:
         Lấy ID cuộc trò chuyện của người dùng từ sheet.
         """
         try:
-            url = f'https://graph.facebook.com/v22.0/me/conversations'
+            url = f'{self.graph_base_url}/v22.0/me/conversations'
             params = {
                 'user_id': user_id,
                 'platform': 'MESSENGER',
                 'access_token': self.page_access_token
             }
-            response = requests.get(url=url, params=params)
+            response = self.request("GET", url, params=params)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('data')[0].get('id')
@@ -147,22 +164,26 @@ class MessageClient:
             return None
 
     def get_user_name_from_conversation_id(self, user_id):
+        return self.user_profiles.get_name(user_id) or DEFAULT_USER_NAME
+
+    def fetch_user_name(self, user_id):
+        """
+        Lấy tên người dùng từ Facebook bằng một lần gọi: cuộc trò chuyện kèm participants, không lấy messages.
+        """
         try:
-            conversation_id = self.get_conversation_id(user_id)
-            if conversation_id is None:
-                return "Người dùng"
-            url = f"https://graph.facebook.com/v22.0/{conversation_id}"
+            url = f'{self.graph_base_url}/v22.0/me/conversations'
             params = {
-                'fields': 'messages,id,participants',
+                'user_id': user_id,
+                'platform': 'MESSENGER',
+                'fields': 'participants',
                 'access_token': self.page_access_token
             }
-            response = requests.get(url=url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                participants = data.get('participants', {}).get('data', [])
-                return next((item.get('name', 'Người dùng') for item in participants if item.get('id') != self.page_id), 'Người dùng')
-            else:
-                return "Người dùng"
+            response = self.request("GET", url, params=params)
+            if response.status_code != 200:
+                return None
+            conversations = response.json().get('data') or [{}]
+            participants = conversations[0].get('participants', {}).get('data', [])
+            return next((item.get('name') for item in participants if item.get('id') != self.page_id), None)
         except Exception as e:
             print(f"❌ Lỗi khi lấy tên người dùng từ ID cuộc trò chuyện: {e}")
-            return "Người dùng"
+            return None
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from telegram import Bot
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import RetryAfter, TelegramError
+
+BATCH_SEPARATOR = "\n\n"
+
+
+class TelegramNotifier:
+    """
+    Long-lived Telegram sender for staff alerts, running one Bot on its own event loop thread.
+
+    `notify` only queues the alert and returns immediately. Alerts arriving within `batch_window_seconds`
+    are joined into one Telegram message, and messages are spaced `min_interval_seconds` apart to stay
+    under Telegram's group rate limit.
+    """
+
+    def __init__(self, token, chat_id, batch_window_seconds=2.0, max_batch_size=10, min_interval_seconds=3.0,
+                 max_queue_size=1000, bot_factory=Bot):
+        self.token = token
+        self.chat_id = chat_id
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch_size = max_batch_size
+        self.min_interval_seconds = min_interval_seconds
+        self.max_queue_size = max_queue_size
+        self.bot_factory = bot_factory
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sent_at = None
+        self._counters = Counter()
+
+    def start(self):
+        """
+        Start the event loop thread; called lazily by `notify` so forked workers each get their own.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, name="telegram-notifier", daemon=True)
+                self._thread.start()
+        # Every caller waits, not only the one that started the thread: the queue is created by the loop
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        consumer = self._loop.create_task(self._consume())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            consumer.cancel()
+            self._loop.run_until_complete(asyncio.gather(consumer, return_exceptions=True))
+            self._loop.close()
+
+    def notify(self, text: str) -> bool:
+        """
+        Queue an alert without blocking. Return False when the queue is full and the alert was dropped.
+        """
+        self.start()
+        with self._lock:
+            if self._pending >= self.max_queue_size:
+                self._counters["dropped"] += 1
+                print("⚠️ Telegram alert queue is full, dropping alert")
+                return False
+            self._pending += 1
+            self._counters["queued"] += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+        return True
+
+    def _create_bot(self):
+        try:
+            return self.bot_factory(token=self.token)
+        except Exception as e:
+            # e.g. InvalidToken when TELEGRAM_TOKEN is not configured: alerts are dropped, not left pending
+            print(f"❌ Telegram notifier disabled, cannot create bot: {e}")
+            return None
+
+    async def _consume(self):
+        bot = self._create_bot()
+        carry = []
+        while True:
+            batch = carry or [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_window_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            text, count, carry = self.pack(batch)
+            outcome = "failed"
+            try:
+                if bot is not None:
+                    await self._wait_for_rate_limit()
+                    outcome = await self._send(bot, text)
+            except Exception as e:
+                print(f"❌ Error sending Telegram alert: {e}")
+            finally:
+                with self._lock:
+                    self._pending -= count
+                    self._counters[f"alerts_{outcome}"] += count
+                    self._counters["messages_sent" if outcome == "sent" else "messages_failed"] += 1
+
+    @staticmethod
+    def pack(batch: list) -> tuple:
+        """
+        Join as many alerts as fit in one Telegram message. Return (text, alert count, leftover alerts).
+        """
+        parts, length = [], 0
+        for alert in batch:
+            added = len(alert) + (len(BATCH_SEPARATOR) if parts else 0)
+            if parts and length + added > MessageLimit.MAX_TEXT_LENGTH:
+                break
+            parts.append(alert[:MessageLimit.MAX_TEXT_LENGTH])
+            length += added
+        return BATCH_SEPARATOR.join(parts), len(parts), batch[len(parts):]
+
+    async def _wait_for_rate_limit(self):
+        if self._last_sent_at is not None:
+            wait = self._last_sent_at + self.min_interval_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def _send(self, bot, text: str, attempts=3) -> str:
+        outcome = "failed"
+        for attempt in range(attempts):
+            try:
+                await bot.send_message(chat_id=self.chat_id, text=text, parse_mode=ParseMode.HTML)
+                outcome = "sent"
+                break
+            except RetryAfter as e:
+                print(f"⏳ Telegram rate limit, retrying in {e.retry_after}s")
+                await asyncio.sleep(float(e.retry_after))
+            except TelegramError as e:
+                print(f"❌ Error sending Telegram alert (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                print(f"❌ Error sending Telegram alert: {e}")
+                break
+        self._last_sent_at = time.monotonic()
+        return outcome
+
+    def shutdown(self, timeout=10):
+        """
+        Wait up to `timeout` seconds for queued alerts to be sent, then stop the loop.
+        """
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {**self._counters, "pending": self._pending, "running": self._thread is not None}
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import Counter
+
+from cachetools import TTLCache
+
+
+class UserProfileCache:
+    """
+    User names looked up in three tiers: an in-process LRU with TTL, a persistent store (MongoDB, shared
+    by every worker) and finally the Graph API. Fetched names are written back to both caches.
+
+    Failed lookups are not cached, so a temporary Graph API error does not stick to the user.
+    """
+
+    def __init__(self, fetcher, store_loader=None, store_saver=None, maxsize=10000, ttl_seconds=6 * 3600):
+        self.fetcher = fetcher
+        self.store_loader = store_loader
+        self.store_saver = store_saver
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def get_name(self, user_id):
+        with self._lock:
+            name = self._cache.get(user_id)
+        if name is not None:
+            return self._count("memory_hits", name)
+
+        name = self._load_from_store(user_id)
+        if name is not None:
+            self._remember(user_id, name)
+            return self._count("store_hits", name)
+
+        name = self.fetcher(user_id)
+        if not name:
+            return self._count("fetch_failures", None)
+        self._remember(user_id, name)
+        if self.store_saver:
+            try:
+                self.store_saver(user_id, name)
+            except Exception as e:
+                print(f"❌ Error saving user profile {user_id}: {e}")
+        return self._count("fetches", name)
+
+    def _load_from_store(self, user_id):
+        if not self.store_loader:
+            return None
+        try:
+            profile = self.store_loader(user_id)
+        except Exception as e:
+            print(f"❌ Error loading user profile {user_id}: {e}")
+            return None
+        return profile.get("name") if profile else None
+
+    def _remember(self, user_id, name):
+        with self._lock:
+            self._cache[user_id] = name
+
+    def _count(self, outcome, name):
+        with self._lock:
+            self._counters[outcome] += 1
+        return name
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            lookups = sum(self._counters.values())
+            hits = self._counters["memory_hits"] + self._counters["store_hits"]
+            return {
+                **self._counters,
+                "entries": len(self._cache),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0,
+            }
@@ -0,0 +1,94 @@
+import threading
+from collections import deque
+
+from Service.DelayScheduler import DelayScheduler
+
+
+class OutboundMessageScheduler:
+    """
+    Per-recipient outbound queue: sends for one recipient run one at a time in the order they were queued,
+    each `delay` seconds after the previous one finished.
+
+    The pauses between parts of an answer are timer entries on a DelayScheduler instead of time.sleep,
+    so a small worker pool can pace thousands of conversations.
+    """
+
+    def __init__(self, scheduler: DelayScheduler):
+        self.scheduler = scheduler
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._counters = {"queued": 0, "sent": 0, "failed": 0}
+
+    def send(self, recipient_id, fn, *args, delay=0):
+        """
+        Queue `fn(*args)` for `recipient_id`, to run `delay` seconds after the previous queued send.
+        """
+        with self._lock:
+            self._counters["queued"] += 1
+            queue = self._queues.get(recipient_id)
+            if queue is not None:
+                queue.append((delay, fn, args))
+                return
+            # Nothing in flight for this recipient: start its queue
+            self._queues[recipient_id] = deque()
+        try:
+            self.scheduler.call_later(delay, self._run, recipient_id, fn, args)
+        except Exception:
+            # Later sends to this recipient would otherwise wait forever behind a send that never runs
+            self._finish(recipient_id, "failed")
+            raise
+
+    def _run(self, recipient_id, fn, args):
+        try:
+            fn(*args)
+            outcome = "sent"
+        except Exception as e:
+            outcome = "failed"
+            print(f"❌ Error sending queued message to {recipient_id}: {e}")
+        self._finish(recipient_id, outcome)
+
+    def _finish(self, recipient_id, outcome):
+        """
+        Record the outcome of the recipient's send in flight and schedule its next queued send, if any.
+        """
+        while True:
+            with self._lock:
+                self._counters[outcome] += 1
+                queue = self._queues[recipient_id]
+                if not queue:
+                    del self._queues[recipient_id]
+                    return
+                delay, next_fn, next_args = queue.popleft()
+            try:
+                self.scheduler.call_later(delay, self._run, recipient_id, next_fn, next_args)
+                return
+            except Exception as e:
+                print(f"❌ Error scheduling queued message to {recipient_id}: {e}")
+                outcome = "failed"
+
+    def drain(self, timeout=10) -> bool:
+        """
+        Send every queued message now, skipping the remaining pauses, and wait for them.
+        """
+        return self.scheduler.drain(timeout)
+
+    def shutdown(self):
+        self.scheduler.shutdown()
+
+    def pending_count(self, recipient_id=None) -> int:
+        """
+        Sends not finished yet, including the one in flight, for one recipient or overall.
+        """
+        with self._lock:
+            if recipient_id is not None:
+                queue = self._queues.get(recipient_id)
+                return len(queue) + 1 if queue is not None else 0
+            return sum(len(queue) + 1 for queue in self._queues.values())
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "active_recipients": len(self._queues),
+                "pending": sum(len(queue) + 1 for queue in self._queues.values()),
+            }
@@ -0,0 +1,49 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads: `acquire` blocks until a call is allowed under `rate_per_second`,
+    letting up to `burst` calls through at once after an idle period. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1, name="rate-limiter"):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self.name = name
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {"acquired": 0, "waited_seconds": 0.0}
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping as needed. Return how long the caller waited, in seconds.
+        """
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                if self.rate_per_second <= 0:
+                    wait = 0
+                else:
+                    now = time.monotonic()
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+                    self._updated_at = now
+                    wait = 0 if self._tokens >= 1 else (1 - self._tokens) / self.rate_per_second
+                if wait == 0:
+                    if self.rate_per_second > 0:
+                        self._tokens -= 1
+                    waited = time.monotonic() - started
+                    self._counters["acquired"] += 1
+                    self._counters["waited_seconds"] += waited
+                    return waited
+            time.sleep(wait)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_second": self.rate_per_second,
+                "acquired": self._counters["acquired"],
+                "waited_seconds": round(self._counters["waited_seconds"], 3),
+            }
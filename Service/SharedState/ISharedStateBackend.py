@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class ISharedStateBackend(ABC):
+    """
+    State shared by every worker handling webhooks: message dedup, debounce buffers and permission cache.
+    """
+
+    @abstractmethod
+    def mark_message_processed(self, message_id: str) -> bool:
+        """
+        Atomically record a message id. Return False when it was already recorded.
+        """
+        pass
+
+    @abstractmethod
+    def append_message(self, user_id: str, message_text: str) -> None:
+        """
+        Add a message to the user's debounce buffer and mark the time of the latest message.
+        """
+        pass
+
+    @abstractmethod
+    def claim_messages(self, user_id: str, quiet_seconds: float) -> Optional[list]:
+        """
+        Take and clear the user's buffer if no message arrived during the last `quiet_seconds`.
+        Return None when a newer message is still being debounced.
+        """
+        pass
+
+    @abstractmethod
+    def get_permission(self, user_id: str) -> Optional[bool]:
+        """
+        Return the cached chatbot permission, or None when it is not cached.
+        """
+        pass
+
+    @abstractmethod
+    def set_permission(self, user_id: str, value: bool) -> None:
+        pass
+
+    @abstractmethod
+    def delete_permission(self, user_id: str) -> bool:
+        pass
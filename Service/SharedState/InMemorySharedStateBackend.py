@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+from Service.SharedState.ISharedStateBackend import ISharedStateBackend
+
+
+class InMemorySharedStateBackend(ISharedStateBackend):
+    """
+    Process-local backend, correct only when a single worker receives the webhooks.
+    """
+
+    def __init__(self, processed_ttl=300, permission_ttl=300, maxsize=10000):
+        self._lock = threading.Lock()
+        self._processed_message_ids = TTLCache(maxsize=maxsize, ttl=processed_ttl)
+        self._permission_cache = TTLCache(maxsize=maxsize, ttl=permission_ttl)
+        self._message_buffers = {}
+
+    def mark_message_processed(self, message_id: str) -> bool:
+        with self._lock:
+            if message_id in self._processed_message_ids:
+                return False
+            self._processed_message_ids[message_id] = True
+            return True
+
+    def append_message(self, user_id: str, message_text: str) -> None:
+        with self._lock:
+            messages, _ = self._message_buffers.get(user_id, ([], 0))
+            if message_text not in messages:
+                messages.append(message_text)
+            self._message_buffers[user_id] = (messages, time.time())
+
+    def claim_messages(self, user_id: str, quiet_seconds: float) -> Optional[list]:
+        with self._lock:
+            messages, last_message_at = self._message_buffers.get(user_id, ([], 0))
+            if time.time() - last_message_at < quiet_seconds:
+                return None
+            self._message_buffers.pop(user_id, None)
+            return messages
+
+    def get_permission(self, user_id: str) -> Optional[bool]:
+        with self._lock:
+            return self._permission_cache.get(user_id)
+
+    def set_permission(self, user_id: str, value: bool) -> None:
+        with self._lock:
+            self._permission_cache[user_id] = value
+
+    def delete_permission(self, user_id: str) -> bool:
+        with self._lock:
+            return self._permission_cache.pop(user_id, None) is not None
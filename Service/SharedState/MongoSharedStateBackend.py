@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from Database.Connection import get_database
+from Service.SharedState.ISharedStateBackend import ISharedStateBackend
+
+PROCESSED_MESSAGE_COLLECTION_NAME = "processed_messages"
+MESSAGE_BUFFER_COLLECTION_NAME = "message_buffers"
+PERMISSION_CACHE_COLLECTION_NAME = "permission_cache"
+
+
+class MongoSharedStateBackend(ISharedStateBackend):
+    """
+    Backend stored in MongoDB so every gunicorn worker and node sees the same state.
+
+    Expiry relies on TTL indexes; reads also filter on the expiry date because the TTL monitor
+    only runs once a minute.
+    """
+
+    def __init__(self, processed_ttl=300, permission_ttl=300, database_provider=get_database):
+        self.processed_ttl = processed_ttl
+        self.permission_ttl = permission_ttl
+        self.database_provider = database_provider
+        self._indexes_ready = False
+
+    def _collection(self, name):
+        db = self.database_provider()
+        if not self._indexes_ready:
+            self.ensure_indexes(db)
+        return db[name]
+
+    def ensure_indexes(self, db):
+        db[PROCESSED_MESSAGE_COLLECTION_NAME].create_index("created_at", expireAfterSeconds=self.processed_ttl)
+        db[PERMISSION_CACHE_COLLECTION_NAME].create_index("expires_at", expireAfterSeconds=0)
+        db[MESSAGE_BUFFER_COLLECTION_NAME].create_index("last_message_at", expireAfterSeconds=3600)
+        self._indexes_ready = True
+
+    def mark_message_processed(self, message_id: str) -> bool:
+        try:
+            self._collection(PROCESSED_MESSAGE_COLLECTION_NAME).insert_one(
+                {"_id": message_id, "created_at": datetime.utcnow()}
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def append_message(self, user_id: str, message_text: str) -> None:
+        # $addToSet keeps the arrival order and skips duplicated texts
+        self._collection(MESSAGE_BUFFER_COLLECTION_NAME).update_one(
+            {"_id": user_id},
+            {"$addToSet": {"messages": message_text}, "$set": {"last_message_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    def claim_messages(self, user_id: str, quiet_seconds: float) -> Optional[list]:
+        collection = self._collection(MESSAGE_BUFFER_COLLECTION_NAME)
+        quiet_since = datetime.utcnow() - timedelta(seconds=quiet_seconds)
+        buffer = collection.find_one_and_delete({"_id": user_id, "last_message_at": {"$lte": quiet_since}})
+        if buffer is not None:
+            return buffer.get("messages", [])
+        # Either another worker claimed the buffer already or a newer message is still pending
+        return None if collection.count_documents({"_id": user_id}, limit=1) else []
+
+    def get_permission(self, user_id: str) -> Optional[bool]:
+        permission = self._collection(PERMISSION_CACHE_COLLECTION_NAME).find_one(
+            {"_id": user_id, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        return permission.get("value") if permission else None
+
+    def set_permission(self, user_id: str, value: bool) -> None:
+        self._collection(PERMISSION_CACHE_COLLECTION_NAME).update_one(
+            {"_id": user_id},
+            {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.permission_ttl)}},
+            upsert=True
+        )
+
+    def delete_permission(self, user_id: str) -> bool:
+        result = self._collection(PERMISSION_CACHE_COLLECTION_NAME).delete_one({"_id": user_id})
+        return result.deleted_count > 0
@@ -0,0 +1,21 @@
+import os
+
+from Service.SharedState.ISharedStateBackend import ISharedStateBackend
+from Service.SharedState.InMemorySharedStateBackend import InMemorySharedStateBackend
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "mongo")
+
+
+def create_shared_state_backend(kind: str = None) -> ISharedStateBackend:
+    """
+    Build the shared state backend selected by `kind` or the SHARED_STATE_BACKEND environment variable.
+
+    Use "mongo" whenever more than one worker receives webhooks; "memory" is for local runs and tests.
+    """
+    kind = (kind or SHARED_STATE_BACKEND).lower()
+    if kind == "memory":
+        return InMemorySharedStateBackend()
+    if kind == "mongo":
+        from Service.SharedState.MongoSharedStateBackend import MongoSharedStateBackend
+        return MongoSharedStateBackend()
+    raise ValueError(f"Unknown shared state backend: {kind}")
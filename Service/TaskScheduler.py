@@ -1,42 +1,89 @@
+import os
 from datetime import datetime, timedelta
 
-from apscheduler.schedulers.background import BackgroundScheduler
-
-from Database.Connection import get_all_chat
+from Database.CampaignCheckpoint import CampaignCheckpoint
+from Database.Connection import iter_inactive_chats
+from Database.JobRunHistory import JobRunHistory
+from Database.LeaderLease import LeaderLease
 from Database.SheetConnection import get_chat_and_follow_up_turn_on, \
     set_follow_up_to_false_by_user_ids
 from Service.ChatService import IChatService
+from Service.FollowUpCampaign import FollowUpCampaign
+from Service.LeaderJobRunner import LeaderJobRunner
 from Service.MessageService import MessageClient
+from Service.RateLimiter import RateLimiter
+
+FOLLOW_UP_WORKER_COUNT = int(os.getenv("FOLLOW_UP_WORKER_COUNT", "8"))
+FOLLOW_UP_OPENAI_RPS = float(os.getenv("FOLLOW_UP_OPENAI_RPS", "5"))
+FOLLOW_UP_GRAPH_RPS = float(os.getenv("FOLLOW_UP_GRAPH_RPS", "20"))
+
+# Every worker runs the scheduler, but only the holder of this lease executes jobs
+SCHEDULER_LEASE_NAME = "task-scheduler"
+SCHEDULER_LEASE_TTL_SECONDS = int(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", "60"))
 
 
 class TaskScheduler:
-    def __init__(self, chatService: IChatService, message: MessageClient):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.add_job(self.check_inactivity, 'cron', hour=10, minute=0)
-        self.scheduler.start()
-        print("🔁 Scheduler đã khởi động...")
+    def __init__(self, chatService: IChatService, message: MessageClient, lease: LeaderLease = None,
+                 job_runs: JobRunHistory = None):
         self.chatService = chatService
         self.message = message
+        self.follow_up_campaign = FollowUpCampaign(
+            compose=self.compose_reminder,
+            deliver=self.deliver_reminder,
+            checkpoint=CampaignCheckpoint(),
+            max_workers=FOLLOW_UP_WORKER_COUNT,
+            compose_limiter=RateLimiter(FOLLOW_UP_OPENAI_RPS, burst=FOLLOW_UP_WORKER_COUNT, name="openai"),
+            deliver_limiter=RateLimiter(FOLLOW_UP_GRAPH_RPS, burst=FOLLOW_UP_WORKER_COUNT, name="graph"),
+        )
+        self.jobs = LeaderJobRunner(
+            lease=lease or LeaderLease(SCHEDULER_LEASE_NAME, ttl_seconds=SCHEDULER_LEASE_TTL_SECONDS),
+            job_runs=job_runs or JobRunHistory(),
+        )
+        self.job_runs = self.jobs.job_runs
+        self.jobs.add_daily_job("check_inactivity", self.check_inactivity, hour=10)
+        self.jobs.start()
+        print("🔁 Scheduler đã khởi động...")
+
+    def shutdown(self):
+        self.jobs.shutdown()
+
+    def get_metrics(self) -> dict:
+        return self.jobs.get_metrics()
 
     @staticmethod
     def parse_updated_at(updated_at_str):
         return datetime.fromisoformat(updated_at_str.replace("Z", "+00:00"))
 
     def send_reminder(self, user_id, hour_diff=5):
+        self.deliver_reminder(user_id, self.compose_reminder(user_id, hour_diff))
+
+    def compose_reminder(self, user_id, hour_diff) -> str:
         gpt_message = self.chatService.ask_follow_up(user_id, hour_diff)
-        self.message.send_message_with_no_logs(user_id, self.chatService.convert_markdown_bold_to_unicode(gpt_message.get('content', '')))
+        return self.chatService.convert_markdown_bold_to_unicode(gpt_message.get('content', ''))
+
+    def deliver_reminder(self, user_id, text):
+        response = self.message.send_message_with_no_logs(user_id, text)
+        if isinstance(response, dict) and response.get("error"):
+            raise RuntimeError(response["error"].get("message", response["error"]))
 
-    def check_inactivity(self, threshold_minutes=1440): # 1440 minutes = 24 hours
+    def check_inactivity(self, run_key=None, threshold_minutes=1440): # 1440 minutes = 24 hours
         now = datetime.utcnow()
         list_active_users = get_chat_and_follow_up_turn_on()
-        for user_data in get_all_chat():
-            last_update = user_data.get('updated_at')
-            if (now - last_update > timedelta(minutes=threshold_minutes)
-                    and user_data.get('user_id') in list_active_users):
-                self.send_reminder(user_data.get('user_id'), self.get_hour_diff(last_update))
-            else:
-                print(f"✔ User {user_data['user_id']} vẫn hoạt động hoặc follow-up tạm thời tắt.")
-        set_follow_up_to_false_by_user_ids(list_active_users, action=False)
+        # Only inactive chats of users with follow-up on are streamed from MongoDB
+        targets = ((user_data.get('user_id'), self.get_hour_diff(user_data.get('updated_at')))
+                   for user_data in iter_inactive_chats(now - timedelta(minutes=threshold_minutes),
+                                                        set(list_active_users)))
+        # One campaign per scheduled run: a resumed run skips the users its checkpoints already reached,
+        # and stops starting new users as soon as this worker loses the lease
+        if run_key:
+            report = self.follow_up_campaign.run(f"follow-up-{run_key}", targets,
+                                                 should_continue=lambda: self.jobs.lease.is_leader)
+        else:
+            report = self.follow_up_campaign.run(f"follow-up-{now:%Y-%m-%d}", targets)
+        print(f"✔ Đã gửi nhắc nhở cho {report.get('sent', 0)}/{len(list_active_users)} người dùng đang bật follow-up.")
+        if not report.get("interrupted"):
+            set_follow_up_to_false_by_user_ids(list_active_users, action=False)
+        return report
 
     @staticmethod
     def get_hour_diff(last_update):
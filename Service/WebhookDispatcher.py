@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+import traceback
+
+_STOP = object()
+
+
+class WebhookDispatcher:
+    """
+    Bounded work queue processing webhook entries on a fixed pool of worker threads.
+
+    The webhook route only enqueues entries, so Facebook gets its 200 right away. When the queue is
+    full `submit` and `submit_batch` return False and the caller can answer with 503 to apply backpressure.
+    """
+
+    def __init__(self, handler, worker_count=4, max_queue_size=1000):
+        self.handler = handler
+        self.worker_count = worker_count
+        self.max_queue_size = max_queue_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._workers = []
+        self._accepting = True
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._counters = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0, "in_flight": 0,
+                          "max_queue_depth": 0}
+        self._total_wait_seconds = 0.0
+        self._total_process_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            self._accepting = True
+            for index in range(self.worker_count):
+                worker = threading.Thread(target=self._run, name=f"webhook-worker-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        print(f"🧵 Webhook dispatcher started with {self.worker_count} workers (queue size {self.max_queue_size})")
+
+    def submit(self, entry) -> bool:
+        """
+        Enqueue a webhook entry without blocking. Return False when the queue is full or shutting down.
+        """
+        return self.submit_batch([entry])
+
+    def submit_batch(self, entries) -> bool:
+        """
+        Enqueue all entries of one webhook delivery, or none of them when the queue has no room for the
+        whole batch or is shutting down. Facebook redelivers the whole batch after a 503, so enqueueing
+        part of it would process those entries twice.
+        """
+        entries = list(entries)
+        with self._submit_lock:
+            if not self._accepting:
+                return False
+            # Only submitters add to the queue, so the room checked here cannot shrink before the puts
+            if self.max_queue_size - self._queue.qsize() < len(entries):
+                with self._lock:
+                    self._counters["rejected"] += len(entries)
+                print(f"⚠️ Webhook queue is full ({self.max_queue_size}), rejecting {len(entries)} entries")
+                return False
+            enqueued_at = time.monotonic()
+            for entry in entries:
+                self._queue.put_nowait((entry, enqueued_at))
+
+        with self._lock:
+            self._counters["accepted"] += len(entries)
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._process(*item)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, entry, enqueued_at):
+        started = time.monotonic()
+        with self._lock:
+            self._counters["in_flight"] += 1
+            self._total_wait_seconds += started - enqueued_at
+        failed = False
+        try:
+            self.handler(entry)
+        except Exception as e:
+            failed = True
+            print(f"❌ Error while processing webhook entry: {e}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._counters["in_flight"] -= 1
+                self._counters["failed" if failed else "processed"] += 1
+                self._total_process_seconds += time.monotonic() - started
+
+    def shutdown(self, timeout=10):
+        """
+        Stop accepting entries, let the workers drain the queue and wait for them to exit.
+        """
+        with self._submit_lock:
+            self._accepting = False
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if not workers:
+            return
+        print(f"🛑 Draining webhook queue ({self._queue.qsize()} pending)...")
+        for _ in workers:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            finished = self._counters["processed"] + self._counters["failed"]
+            return {
+                **self._counters,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_queue_size,
+                "workers": len(self._workers),
+                "avg_wait_ms": round(self._total_wait_seconds / finished * 1000, 2) if finished else 0,
+                "avg_process_ms": round(self._total_process_seconds / finished * 1000, 2) if finished else 0,
+            }
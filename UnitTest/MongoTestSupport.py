@@ -0,0 +1,18 @@
+import functools
+import os
+
+from pymongo import MongoClient
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+
+
+@functools.lru_cache(maxsize=None)
+def mongo_available():
+    """
+    True when a MongoDB server answers at TEST_MONGO_URI; checked once per test run.
+    """
+    try:
+        MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+
+SYSTEM_MESSAGE = {"role": "system", "content": "prompt"}
+
+
+class TestAskPipeline(unittest.TestCase):
+    def setUp(self):
+        self.chat_service = OpenAIChatService(openai_key="dummy", model="dummy", enable_response_cache=False,
+                                              max_parallel_requests=4)
+        self.context_loaded = threading.Event()
+        self.completed = []
+
+    def use_fakes(self, label, classify_seconds=0.2, load_seconds=0.2):
+        def classify(message):
+            time.sleep(classify_seconds)
+            return label
+
+        def load_context(user_id, history=None):
+            time.sleep(load_seconds)
+            self.context_loaded.set()
+            return [], SYSTEM_MESSAGE, []
+
+        self.chat_service.message_classifier = SimpleNamespace(classify=classify)
+        self.chat_service.load_context = load_context
+
+    def test_classify_and_context_loading_run_concurrently(self):
+        self.use_fakes("other")
+        self.chat_service.complete_question = lambda question, *args: {"role": "assistant", "content": question}
+
+        started = time.monotonic()
+        response = self.chat_service.ask("Giá bao nhiêu", "user")
+
+        # Sequential stages would take 0.4s
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual(response["content"], [{"role": "assistant", "content": "Giá bao nhiêu"}])
+        self.assertEqual(set(response["timings"]), {"classify", "load_context", "complete", "total"})
+        self.assertGreaterEqual(response["timings"]["classify"], 200)
+        metrics = self.chat_service.get_metrics()
+        self.assertEqual((metrics["total"]["count"], metrics["complete"]["count"]), (1, 1))
+
+    def test_booking_returns_without_waiting_for_context(self):
+        self.use_fakes("booking", classify_seconds=0, load_seconds=0.5)
+        self.chat_service.complete_question = lambda *args: self.fail("booking must not call the LLM")
+
+        started = time.monotonic()
+        response = self.chat_service.ask("Cho em đặt lịch", "user")
+
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertFalse(self.context_loaded.is_set())
+        self.assertEqual(response["content"], [{"content": "booking"}])
+        self.assertNotIn("complete", response["timings"])
+        self.assertTrue(self.context_loaded.wait(2))
+
+    def test_complete_questions_keeps_input_order(self):
+        def complete_question(question, system_message, chat_history, functions, on_first_block=None):
+            # Earlier questions finish last
+            time.sleep(0.05 * (5 - int(question)))
+            self.completed.append(question)
+            return {"content": question, "streamed": on_first_block is not None}
+
+        self.chat_service.complete_question = complete_question
+        started = time.monotonic()
+        results = self.chat_service.complete_questions(["1", "2", "3", "4"], SYSTEM_MESSAGE, [], [],
+                                                       on_first_block=print)
+
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertNotEqual(self.completed, ["1", "2", "3", "4"])
+        self.assertEqual([result["content"] for result in results], ["1", "2", "3", "4"])
+        # Only the first question streams its first paragraph
+        self.assertEqual([result["streamed"] for result in results], [True, False, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
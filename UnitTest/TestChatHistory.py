@@ -0,0 +1,35 @@
+import threading
+import unittest
+
+from Database.ChatHistory import ChatHistory
+
+
+class TestChatHistory(unittest.TestCase):
+    def test_history_is_loaded_once_per_turn(self):
+        loads = []
+
+        def loader(user_id):
+            loads.append(user_id)
+            return [{"role": "user", "content": "xin chào"}]
+
+        history = ChatHistory("user", loader=loader)
+        threads = [threading.Thread(target=history.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(history.get(), [{"role": "user", "content": "xin chào"}])
+        self.assertEqual(loads, ["user"])
+
+    def test_missing_chat_is_memoized(self):
+        loads = []
+        history = ChatHistory("new user", loader=lambda user_id: loads.append(user_id))
+
+        self.assertIsNone(history.get())
+        self.assertIsNone(history.get())
+        self.assertEqual(len(loads), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from pymongo import MongoClient
+
+import Database.Connection as connection
+from UnitTest.MongoTestSupport import TEST_MONGO_URI, mongo_available
+
+
+@unittest.skipUnless(mongo_available(), "MongoDB is not running locally")
+class TestChatPersistence(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient(TEST_MONGO_URI)
+        self.database_name = f"saleadvisor_test_{uuid.uuid4().hex[:8]}"
+        patcher = mock.patch.object(connection, "get_database", lambda: self.client[self.database_name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        indexes = mock.patch.object(connection, "_chat_indexes_ready", False)
+        indexes.start()
+        self.addCleanup(indexes.stop)
+
+    def tearDown(self):
+        self.client.drop_database(self.database_name)
+        self.client.close()
+
+    def test_post_chat_upserts_and_keeps_last_messages(self):
+        for i in range(25):
+            connection.post_chat("user", [{"role": "user", "content": str(i)}])
+
+        chats = list(self.client[self.database_name][connection.CHAT_COLLECTION_NAME].find())
+        self.assertEqual(len(chats), 1)
+        self.assertEqual(len(chats[0]["messages"]), 20)
+        self.assertEqual(connection.get_chat_by_userid("user", limit=3),
+                         [{"role": "user", "content": str(i)} for i in (22, 23, 24)])
+        self.assertIsNone(connection.get_chat_by_userid("unknown"))
+
+    def test_stored_messages_follow_history_limit(self):
+        with mock.patch.object(connection, "CHAT_STORED_MESSAGES_LIMIT", 30):
+            for i in range(35):
+                connection.post_chat("user", [{"role": "user", "content": str(i)}])
+
+        self.assertEqual(len(connection.get_chat_by_userid("user", limit=30)), 30)
+
+    def test_iter_inactive_chats_filters_by_date_and_users(self):
+        collection = self.client[self.database_name][connection.CHAT_COLLECTION_NAME]
+        now = datetime.utcnow()
+        collection.insert_many([
+            {"user_id": "old-active", "updated_at": now - timedelta(days=3), "messages": []},
+            {"user_id": "old-inactive", "updated_at": now - timedelta(days=2), "messages": []},
+            {"user_id": "recent-active", "updated_at": now, "messages": []},
+        ])
+        since = now - timedelta(days=1)
+
+        self.assertEqual([chat["user_id"] for chat in connection.iter_inactive_chats(since)],
+                         ["old-active", "old-inactive"])
+        self.assertEqual([chat["user_id"] for chat in connection.iter_inactive_chats(
+            since, {"old-active", "recent-active"})], ["old-active"])
+        with mock.patch.object(connection, "INACTIVITY_IN_QUERY_LIMIT", 0):
+            self.assertEqual([chat["user_id"] for chat in connection.iter_inactive_chats(
+                since, {"old-active", "recent-active"})], ["old-active"])
+        self.assertEqual(list(connection.iter_inactive_chats(since, set())), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from Database.ChatWriteBuffer import ChatWriteBuffer
+
+
+class TestChatWriteBuffer(unittest.TestCase):
+    def setUp(self):
+        self.writes = []
+        self.buffer = ChatWriteBuffer("user", writer=lambda user_id, messages, is_update: self.writes.append(
+            (user_id, messages, is_update)))
+
+    def test_turn_is_written_once(self):
+        self.buffer.add_user_message("giá bao nhiêu")
+        self.buffer.add_assistant_message("Dạ 390.000đ ạ")
+        self.buffer.add_user_message("giá bao nhiêu")
+        self.buffer.add_assistant_message("Chị muốn đặt lịch không ạ?")
+        self.buffer.flush()
+
+        self.assertEqual(self.writes, [("user", [
+            {"role": "user", "content": "giá bao nhiêu"},
+            {"role": "assistant", "content": "Dạ 390.000đ ạ"},
+            {"role": "assistant", "content": "Chị muốn đặt lịch không ạ?"},
+        ], True)])
+
+    def test_empty_turn_is_not_written(self):
+        with self.buffer:
+            pass
+        self.assertEqual(self.writes, [])
+
+    def test_assistant_only_turn_does_not_touch_updated_at(self):
+        with self.buffer as turn:
+            turn.add_assistant_message("Dạ em chào chị")
+        self.assertFalse(self.writes[0][2])
+
+    def test_write_errors_are_not_raised(self):
+        def broken_writer(user_id, messages, is_update):
+            raise RuntimeError("mongo down")
+
+        buffer = ChatWriteBuffer("user", writer=broken_writer)
+        buffer.add_user_message("xin chào")
+        buffer.flush()
+        self.assertEqual(buffer.messages, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from Database.ConfigCache import ConfigCache
+
+
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.version = 1
+        self.calls = 0
+        self.cache = ConfigCache(ttl_seconds=60, version_loader=lambda: self.version)
+        self.cache.refresh()
+
+    def load_prompt(self, prompt_type):
+        self.calls += 1
+        return f"{prompt_type}-{self.version}"
+
+    def test_cached_loader_is_called_once(self):
+        get_prompt = self.cache.cached(self.load_prompt)
+        self.assertEqual(get_prompt("main"), "main-1")
+        self.assertEqual(get_prompt("main"), "main-1")
+        self.assertEqual(get_prompt("welcome"), "welcome-1")
+        self.assertEqual(self.calls, 2)
+
+    def test_version_change_invalidates_entries(self):
+        get_prompt = self.cache.cached(self.load_prompt)
+        get_prompt("main")
+        self.assertFalse(self.cache.check_version())
+
+        self.version = 2
+        self.assertTrue(self.cache.check_version())
+        self.assertEqual(get_prompt("main"), "main-2")
+        self.assertEqual(self.calls, 2)
+
+    def test_expired_entries_are_reloaded(self):
+        self.cache.ttl_seconds = 0
+        get_prompt = self.cache.cached(self.load_prompt)
+        get_prompt("main")
+        get_prompt("main")
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
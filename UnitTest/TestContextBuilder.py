@@ -0,0 +1,68 @@
+import unittest
+
+from Service.ChatService.ContextBuilder import ContextBuilder, estimate_tokens, SUMMARY_PREFIX
+from Service.ChatService.FaqRetriever import FaqRetriever
+
+
+class TestContextBuilder(unittest.TestCase):
+    def setUp(self):
+        self.builder = ContextBuilder(history_token_budget=60, faq_token_budget=40, summary_token_budget=30)
+
+    def test_estimate_tokens_counts_accented_words_double(self):
+        self.assertEqual(estimate_tokens("gia bao nhieu"), 3)
+        self.assertEqual(estimate_tokens("giá bao nhiêu?"), 6)
+        self.assertEqual(estimate_tokens(None), 0)
+
+    def test_short_history_is_kept_unchanged(self):
+        history = [{"role": "user", "content": "xin chào"}, {"role": "assistant", "content": "Dạ em chào chị"}]
+        self.assertEqual(self.builder.trim_history(history), history)
+        self.assertIsNone(self.builder.trim_history(None))
+
+    def test_long_history_keeps_recent_messages_and_summarizes_the_rest(self):
+        history = []
+        for i in range(10):
+            history.append({"role": "user", "content": f"câu hỏi số {i}"})
+            history.append({"role": "assistant", "content": f"Dạ đây là câu trả lời số {i} ạ"})
+
+        trimmed = self.builder.trim_history(history)
+
+        self.assertEqual(trimmed[-1], history[-1])
+        self.assertLess(len(trimmed), len(history))
+        self.assertEqual(trimmed[0]["role"], "system")
+        self.assertTrue(trimmed[0]["content"].startswith(SUMMARY_PREFIX))
+        self.assertIn("câu hỏi số", trimmed[0]["content"])
+        self.assertGreater(self.builder.get_metrics()["history_messages_dropped"], 0)
+
+    def test_select_faq_returns_relevant_sections_within_budget(self):
+        index = FaqRetriever({
+            "Giá bấm huyệt": "Giá bấm huyệt: 390.000đ/1 suất\n",
+            "Địa chỉ": "Địa chỉ: 12 Nguyễn Trãi, Quận 1\n",
+            "Giờ mở cửa": "Giờ mở cửa: 8h - 20h hằng ngày\n",
+        })
+
+        selected = self.builder.select_faq("Giá bấm huyệt bao nhiêu vậy", index)
+
+        self.assertIn("390.000", selected)
+        self.assertNotIn("Nguyễn Trãi", selected)
+        self.assertNotIn("8h", selected)
+
+    def test_select_faq_without_hits_falls_back_to_faq_within_budget(self):
+        index = FaqRetriever({
+            "Giá bấm huyệt": "Giá bấm huyệt: 390.000đ/1 suất\n",
+            "Địa chỉ": "Địa chỉ: 12 Nguyễn Trãi, Quận 1\n",
+            "Giờ mở cửa": "Giờ mở cửa: 8h - 20h hằng ngày\n",
+        })
+
+        for question in ["ok", "vậy còn gói kia thì sao"]:
+            selected = self.builder.select_faq(question, index)
+            self.assertIn("390.000", selected)
+            self.assertIn("Nguyễn Trãi", selected)
+        self.assertEqual(self.builder.get_metrics()["faq_fallbacks"], 2)
+
+    def test_full_faq_fits_budget(self):
+        self.assertTrue(self.builder.fits_faq_budget("Giá: 390.000đ"))
+        self.assertFalse(self.builder.fits_faq_budget("giá " * 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
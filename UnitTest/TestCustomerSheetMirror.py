@@ -0,0 +1,105 @@
+import threading
+import unittest
+
+from Database.CustomerSheetMirror import CustomerSheetMirror
+
+
+class FakeWorksheet:
+    def __init__(self, values):
+        self.values = values
+        self.calls = []
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return [list(row) for row in self.values]
+
+    def update_cell(self, row, col, value):
+        self.calls.append(("update_cell", row, col, value))
+
+    def append_row(self, row):
+        self.calls.append(("append_row", row))
+        row_number = len(self.values) + 1
+        return {"updates": {"updatedRange": f"Customer!A{row_number}:D{row_number}"}}
+
+
+class TestCustomerSheetMirror(unittest.TestCase):
+    def setUp(self):
+        self.sheet = FakeWorksheet([
+            ["ID_Facebook", "Name", "Turn on Chat bot", "Follow up"],
+            ["111", "An", "TRUE", "TRUE"],
+            ["222", "Binh", "FALSE", "TRUE"],
+        ])
+        self.mirror = CustomerSheetMirror(sheet_loader=lambda: self.sheet, refresh_seconds=3600)
+        self.mirror.refresh()
+
+    def tearDown(self):
+        self.mirror.stop_auto_refresh()
+
+    def test_lookup_does_not_download_sheet_again(self):
+        self.assertTrue(self.mirror.contains("111"))
+        self.assertEqual(self.mirror.get("222")["Turn on Chat bot"], "FALSE")
+        self.assertIsNone(self.mirror.get("333"))
+        self.assertEqual(self.sheet.calls.count("get_all_values"), 1)
+
+    def test_set_value_writes_through(self):
+        self.assertTrue(self.mirror.set_value("222", "Turn on Chat bot", True))
+        self.assertIn(("update_cell", 3, 3, True), self.sheet.calls)
+        self.assertEqual(self.mirror.get("222")["Turn on Chat bot"], "TRUE")
+        self.assertFalse(self.mirror.set_value("333", "Follow up", False))
+
+    def test_append_indexes_new_row(self):
+        row_number = self.mirror.append(["333", "Chi", False, True])
+        self.assertEqual(row_number, 4)
+        self.assertEqual(self.mirror.row_numbers["333"], [4])
+        self.assertEqual(self.mirror.get("333")["Follow up"], "TRUE")
+
+    def test_refresh_picks_up_manual_edits(self):
+        self.sheet.values[1][3] = "FALSE"
+        self.mirror.refresh()
+        self.assertEqual(self.mirror.find_user_ids(lambda row: row["Follow up"] == "TRUE"), ["222"])
+
+    def test_refresh_skips_download_when_spreadsheet_unchanged(self):
+        self.sheet.spreadsheet = FakeSpreadsheet("2026-01-01T00:00:00Z")
+        self.mirror.refresh()
+        record = self.mirror.records["222"]
+        self.mirror.refresh()
+        self.assertEqual(self.sheet.calls.count("get_all_values"), 2)
+
+        self.sheet.values[1][3] = "FALSE"
+        self.sheet.spreadsheet.modified_time = "2026-01-01T00:05:00Z"
+        self.mirror.refresh()
+        self.assertEqual(self.sheet.calls.count("get_all_values"), 3)
+        self.assertEqual(self.mirror.get("111")["Follow up"], "FALSE")
+        # Unchanged rows keep their record
+        self.assertIs(self.mirror.records["222"], record)
+
+    def test_write_during_refresh_is_not_overwritten_by_the_download(self):
+        writer = threading.Thread(target=self.mirror.set_value, args=("111", "Turn on Chat bot", False))
+        download = self.sheet.get_all_values
+
+        def slow_download():
+            # A booking turns the chat bot off while the sheet is being downloaded
+            writer.start()
+            writer.join(0.2)
+            return download()
+
+        self.sheet.get_all_values = slow_download
+        self.sheet.values[2][1] = "Bình"
+        self.mirror.refresh(force=True)
+        writer.join()
+
+        self.assertEqual(self.mirror.get("222")["Name"], "Bình")
+        self.assertEqual(self.mirror.get("111")["Turn on Chat bot"], "FALSE")
+        self.assertIn(("update_cell", 2, 3, False), self.sheet.calls)
+
+
+class FakeSpreadsheet:
+    def __init__(self, modified_time):
+        self.modified_time = modified_time
+
+    def get_lastUpdateTime(self):
+        return self.modified_time
+
+
+if __name__ == '__main__':
+    unittest.main()
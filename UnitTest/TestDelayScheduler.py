@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from collections import Counter
+
+from Service.DelayScheduler import DelayScheduler
+
+
+class TestDelayScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = DelayScheduler(worker_count=4, name="test-debounce")
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def wait_until(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_debounce_replaces_pending_call(self):
+        calls = []
+        for text in ["a", "b", "c"]:
+            self.scheduler.debounce("user", 0.05, calls.append, text)
+
+        self.assertTrue(self.wait_until(lambda: calls))
+        time.sleep(0.1)
+        self.assertEqual(calls, ["c"])
+
+    def test_cancel_drops_pending_call(self):
+        calls = []
+        self.scheduler.debounce("user", 0.05, calls.append, "a")
+        self.assertTrue(self.scheduler.cancel("user"))
+        time.sleep(0.1)
+        self.assertEqual(calls, [])
+
+    def test_burst_keeps_thread_count_constant(self):
+        # 1,000 users sending 3 messages each used to create 3,000 threading.Timer threads
+        flushed = Counter()
+        lock = threading.Lock()
+        threads_before = threading.active_count()
+        peak_threads = threads_before
+
+        def flush(user_id):
+            with lock:
+                flushed[user_id] += 1
+
+        for _ in range(3):
+            for user in range(1000):
+                self.scheduler.debounce(f"user-{user}", 0.2, flush, f"user-{user}")
+            peak_threads = max(peak_threads, threading.active_count())
+
+        self.assertTrue(self.wait_until(lambda: len(flushed) == 1000))
+        peak_threads = max(peak_threads, threading.active_count())
+
+        self.assertLessEqual(peak_threads - threads_before, self.scheduler.worker_count)
+        self.assertEqual(set(flushed.values()), {1})
+        self.assertEqual(self.scheduler.get_metrics()["replaced"], 2000)
+
+    def test_drain_runs_pending_calls_now(self):
+        calls = []
+
+        def first(text):
+            calls.append(text)
+            # Scheduled while draining: runs right away as well
+            self.scheduler.call_later(60, calls.append, "chained")
+
+        self.scheduler.debounce("user", 60, first, "buffered")
+        self.scheduler.call_later(60, calls.append, "delayed")
+
+        started = time.monotonic()
+        self.assertTrue(self.scheduler.drain(timeout=5))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(self.scheduler.draining)
+        self.assertCountEqual(calls, ["buffered", "delayed", "chained"])
+        self.assertEqual(self.scheduler.pending_count(), 0)
+
+    def test_drain_times_out_on_slow_calls(self):
+        self.scheduler.call_later(0, time.sleep, 0.5)
+        self.assertFalse(self.scheduler.drain(timeout=0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
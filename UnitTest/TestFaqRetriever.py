@@ -0,0 +1,32 @@
+import unittest
+
+from Service.ChatService.FaqRetriever import FaqRetriever
+
+
+class TestFaqRetriever(unittest.TestCase):
+    def setUp(self):
+        self.retriever = FaqRetriever({
+            "Giá bấm huyệt": "Giá bấm huyệt:\n- Bấm huyệt trị liệu: 390.000đ (thời gian: 60 phút)\n",
+            "Giá massage": "Giá massage:\n- Massage body: 450.000đ (thời gian: 90 phút)\n",
+            "Địa chỉ": "Địa chỉ: 12 Nguyễn Trãi, Quận 1\n",
+            "Giờ mở cửa": "Giờ mở cửa: 8h - 20h hằng ngày\n",
+        })
+
+    def test_best_section_ranks_first_without_accents(self):
+        ranked = self.retriever.search("bam huyet gia bao nhieu")
+        self.assertEqual(self.retriever.titles[ranked[0][0]], "Giá bấm huyệt")
+
+        ranked = self.retriever.search("Phòng khám ở địa chỉ nào vậy?")
+        self.assertEqual(self.retriever.titles[ranked[0][0]], "Địa chỉ")
+
+    def test_top_k_limits_results(self):
+        self.assertEqual(len(self.retriever.search("giá", top_k=1)), 1)
+        self.assertEqual(len(self.retriever.search("giá")), 2)
+
+    def test_unrelated_question_returns_nothing(self):
+        self.assertEqual(self.retriever.search("xin chào"), [])
+        self.assertEqual(FaqRetriever({}).search("giá"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
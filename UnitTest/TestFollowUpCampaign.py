@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+
+from Service.FollowUpCampaign import FollowUpCampaign
+from Service.RateLimiter import RateLimiter
+
+
+class InMemoryCheckpoint:
+    def __init__(self):
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def completed_user_ids(self, campaign_id):
+        with self.lock:
+            return {user_id for (campaign, user_id), status in self.statuses.items()
+                    if campaign == campaign_id and status == "sent"}
+
+    def mark(self, campaign_id, user_id, status, error=None):
+        with self.lock:
+            self.statuses[(campaign_id, user_id)] = status
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_spaces_calls_after_burst(self):
+        limiter = RateLimiter(rate_per_second=20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        # 2 burst tokens, then 4 more at 20/s
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+        self.assertEqual(limiter.get_metrics()["acquired"], 6)
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(0)
+        started = time.monotonic()
+        for _ in range(1000):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+class TestFollowUpCampaign(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint = InMemoryCheckpoint()
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def compose(self, user_id, hour_diff):
+        time.sleep(0.05)
+        return f"{user_id} after {hour_diff}h"
+
+    def deliver(self, user_id, text):
+        with self.lock:
+            self.delivered.append((user_id, text))
+
+    def test_runs_targets_concurrently(self):
+        campaign = FollowUpCampaign(self.compose, self.deliver, self.checkpoint, max_workers=10)
+        started = time.monotonic()
+        report = campaign.run("day-1", ((f"user-{i}", 24) for i in range(40)))
+
+        self.assertEqual(report["sent"], 40)
+        self.assertEqual(len(self.delivered), 40)
+        # 40 x 50ms sequentially would take 2s
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(campaign.get_metrics()["last"]["sent"], 40)
+
+    def test_rerun_resumes_after_failures(self):
+        failing = {"user-3", "user-7"}
+
+        def flaky_deliver(user_id, text):
+            if user_id in failing:
+                raise RuntimeError("graph down")
+            self.deliver(user_id, text)
+
+        targets = [(f"user-{i}", 30) for i in range(10)]
+        report = FollowUpCampaign(self.compose, flaky_deliver, self.checkpoint, max_workers=4).run("day-1", targets)
+        self.assertEqual((report["sent"], report["failed"]), (8, 2))
+
+        failing.clear()
+        report = FollowUpCampaign(self.compose, flaky_deliver, self.checkpoint, max_workers=4).run("day-1", targets)
+        self.assertEqual((report["skipped"], report.get("sent")), (8, 2))
+        self.assertEqual(len(self.delivered), 10)
+
+    def test_empty_reply_is_not_sent(self):
+        campaign = FollowUpCampaign(lambda user_id, hour_diff: "", self.deliver, self.checkpoint)
+        report = campaign.run("day-1", [("user-1", 24)])
+        self.assertEqual(report["empty"], 1)
+        self.assertEqual(self.delivered, [])
+
+    def test_stops_starting_users_when_told_to(self):
+        checks = iter([True, True, False])
+        campaign = FollowUpCampaign(self.compose, self.deliver, self.checkpoint, max_workers=1)
+        report = campaign.run("day-1", [(f"user-{i}", 24) for i in range(5)], should_continue=lambda: next(checks))
+        self.assertTrue(report["interrupted"])
+        self.assertEqual(report["sent"], 2)
+
+        report = campaign.run("day-1", [(f"user-{i}", 24) for i in range(5)])
+        self.assertFalse(report["interrupted"])
+        self.assertEqual((report["sent"], report["skipped"]), (3, 2))
+
+    def test_deliver_rate_is_limited(self):
+        campaign = FollowUpCampaign(lambda user_id, hour_diff: "hi", self.deliver, self.checkpoint, max_workers=8,
+                                    deliver_limiter=RateLimiter(50, burst=1))
+        started = time.monotonic()
+        campaign.run("day-1", [(f"user-{i}", 24) for i in range(11)])
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import requests
+
+from Service.MessageService.AsyncMessageClient import AsyncMessageClient
+from Service.MessageService.GraphHttpClient import GraphHttpClient, create_graph_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    statuses = []
+    delay_seconds = 0.0
+    calls = 0
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        FlakyHandler.calls += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay_seconds)
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGraphHttpClient(unittest.TestCase):
+    def setUp(self):
+        FlakyHandler.statuses = []
+        FlakyHandler.delay_seconds = 0.0
+        FlakyHandler.calls = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v21.0/me/messages"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_retries_rate_limit_and_server_errors(self):
+        FlakyHandler.statuses = [429, 503]
+        client = GraphHttpClient(session=create_graph_session(max_retries=3, backoff_seconds=0))
+
+        response = client.request("GET", self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get_metrics()["requests"], 1)
+
+    def test_post_retries_rate_limit_only(self):
+        FlakyHandler.statuses = [429, 503, 200]
+        client = GraphHttpClient(session=create_graph_session(max_retries=3, backoff_seconds=0))
+
+        # The 503 may come after the message was delivered, so it is returned instead of resent
+        self.assertEqual(client.request("POST", self.url, json={}).status_code, 503)
+        self.assertEqual(FlakyHandler.calls, 2)
+
+    def test_client_errors_are_not_retried(self):
+        FlakyHandler.statuses = [400, 200]
+        client = GraphHttpClient(session=create_graph_session(max_retries=3, backoff_seconds=0))
+
+        self.assertEqual(client.request("POST", self.url, json={}).status_code, 400)
+        self.assertEqual(client.get_metrics()["failed_responses"], 1)
+
+    def test_read_timeout_is_not_retried(self):
+        FlakyHandler.delay_seconds = 0.3
+        client = GraphHttpClient(session=create_graph_session(max_retries=3, backoff_seconds=0), timeout=(1, 0.1))
+
+        with self.assertRaises(requests.exceptions.RequestException):
+            client.request("POST", self.url, json={})
+        self.assertEqual(client.get_metrics()["errors"], 1)
+        self.assertEqual(FlakyHandler.calls, 1)
+
+
+class TestAsyncMessageClient(unittest.TestCase):
+    def run_client(self, handler, coroutine):
+        async def run():
+            client = AsyncMessageClient("token", "page", backoff_seconds=0)
+            client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with client:
+                return await coroutine(client)
+
+        return asyncio.run(run())
+
+    def test_send_message_does_not_retry_server_errors_or_read_timeouts(self):
+        calls = []
+
+        def server_error(request):
+            calls.append(request)
+            return httpx.Response(503, json={"error": {}})
+
+        def read_timeout(request):
+            calls.append(request)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        self.assertEqual(self.run_client(server_error, lambda client: client.send_message("user", "hi")),
+                         {"error": {}})
+        with self.assertRaises(httpx.ReadTimeout):
+            self.run_client(read_timeout, lambda client: client.send_message("user", "hi"))
+        self.assertEqual(len(calls), 2)
+
+    def test_send_message_retries_rate_limit_and_connect_errors(self):
+        outcomes = ["connect", 429, 200]
+
+        def handler(request):
+            outcome = outcomes.pop(0)
+            if outcome == "connect":
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(outcome, json={"message_id": "m_1"})
+
+        self.assertEqual(self.run_client(handler, lambda client: client.send_message("user", "xin chào")),
+                         {"message_id": "m_1"})
+        self.assertEqual(outcomes, [])
+
+    def test_get_retries_server_errors(self):
+        statuses = [503, 200]
+
+        def handler(request):
+            return httpx.Response(statuses.pop(0), json={"data": [{"id": "t_1"}]})
+
+        self.assertEqual(self.run_client(handler, lambda client: client.get_conversation_id("user")), "t_1")
+        self.assertEqual(statuses, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from Service.LeaderJobRunner import LeaderJobRunner
+
+
+class FakeLease:
+    def __init__(self, owner_id="worker-1", leader=False):
+        self.owner_id = owner_id
+        self.ttl_seconds = 60
+        self.is_leader = leader
+        self.acquire_result = True
+
+    def try_acquire(self):
+        self.is_leader = self.acquire_result
+        return self.is_leader
+
+    def release(self):
+        self.is_leader = False
+
+    def get_metrics(self):
+        return {"leader": self.is_leader}
+
+
+class InMemoryJobRuns:
+    def __init__(self):
+        self.runs = {}
+
+    def start(self, job, run_key, owner_id):
+        if run_key in self.runs:
+            return False
+        self.runs[run_key] = {"job": job, "owner_id": owner_id, "status": "running", "attempts": 1}
+        return True
+
+    def take_over(self, run_key, owner_id, max_attempts=3):
+        run = self.runs.get(run_key)
+        if run is None or run["attempts"] >= max_attempts:
+            return False
+        if run["status"] in ("failed", "interrupted") or (run["status"] == "running" and run["owner_id"] != owner_id):
+            run.update(owner_id=owner_id, status="running", attempts=run["attempts"] + 1)
+            return True
+        return False
+
+    def finish(self, run_key, status, result=None, error=None):
+        self.runs[run_key].update(status=status, result=result, error=error)
+
+
+class TestLeaderJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.lease = FakeLease()
+        self.job_runs = InMemoryJobRuns()
+        self.runner = LeaderJobRunner(self.lease, self.job_runs, scheduler=BackgroundScheduler())
+        self.calls = []
+        self.runner.add_daily_job("check_inactivity", lambda run_key: self.calls.append(run_key) or {"sent": 1},
+                                  hour=10)
+
+    def test_last_scheduled_time_is_today_once_the_hour_passed(self):
+        self.assertEqual(self.runner.last_scheduled_time("check_inactivity", datetime(2026, 3, 2, 10, 0, 5)),
+                         datetime(2026, 3, 2, 10, 0))
+        self.assertEqual(self.runner.last_scheduled_time("check_inactivity", datetime(2026, 3, 2, 9, 59)),
+                         datetime(2026, 3, 1, 10, 0))
+
+    def test_followers_skip_and_the_schedule_runs_once(self):
+        scheduled_for = datetime(2026, 3, 2, 10, 0)
+        self.assertIsNone(self.runner.run_job("check_inactivity", scheduled_for))
+        self.assertEqual(self.calls, [])
+
+        self.lease.is_leader = True
+        self.assertEqual(self.runner.run_job("check_inactivity", scheduled_for), {"sent": 1})
+        self.assertIsNone(self.runner.run_job("check_inactivity", scheduled_for))
+        self.assertEqual(self.calls, ["check_inactivity:2026-03-02T10:00"])
+        self.assertEqual(self.job_runs.runs["check_inactivity:2026-03-02T10:00"]["status"], "succeeded")
+
+    def test_new_leader_catches_up_a_schedule_missed_during_handover(self):
+        self.runner.renew_leadership()
+        self.assertIsNotNone(self.runner.scheduler.get_job("catch_up"))
+
+        self.runner.catch_up(now=datetime(2026, 3, 2, 10, 1))
+        self.assertEqual(self.calls, ["check_inactivity:2026-03-02T10:00"])
+        self.assertEqual(list(self.job_runs.runs), ["check_inactivity:2026-03-02T10:00"])
+
+        # The cron firing late on the same worker does not run the schedule again
+        self.runner.catch_up(now=datetime(2026, 3, 2, 11, 0))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_catch_up_ignores_schedules_older_than_the_window(self):
+        self.lease.is_leader = True
+        self.runner.catch_up(now=datetime(2026, 3, 2, 23, 0))
+        self.assertEqual(self.calls, [])
+
+    def test_renewal_by_the_current_leader_does_not_catch_up(self):
+        self.lease.is_leader = True
+        self.runner.renew_leadership()
+        self.assertIsNone(self.runner.scheduler.get_job("catch_up"))
+
+    def test_failed_job_is_recorded(self):
+        self.lease.is_leader = True
+        self.runner.add_daily_job("broken", lambda run_key: 1 / 0, hour=11)
+        self.assertIsNone(self.runner.run_job("broken", datetime(2026, 3, 2, 11, 0)))
+        run = self.job_runs.runs["broken:2026-03-02T11:00"]
+        self.assertEqual(run["status"], "failed")
+        self.assertIn("division", run["error"])
+
+    def test_new_leader_resumes_a_run_left_by_a_dead_leader(self):
+        self.job_runs.start("check_inactivity", "check_inactivity:2026-03-02T10:00", "dead-worker")
+        self.lease.is_leader = True
+        self.runner.catch_up(now=datetime(2026, 3, 2, 10, 30))
+        self.assertEqual(self.calls, ["check_inactivity:2026-03-02T10:00"])
+        run = self.job_runs.runs["check_inactivity:2026-03-02T10:00"]
+        self.assertEqual((run["owner_id"], run["status"], run["attempts"]), ("worker-1", "succeeded", 2))
+
+    def test_interrupted_run_is_recorded_and_resumed(self):
+        results = [{"sent": 2, "interrupted": True}, {"sent": 3, "interrupted": False}]
+        self.runner.add_daily_job("campaign", lambda run_key: results.pop(0), hour=10)
+        self.lease.is_leader = True
+        scheduled_for = datetime(2026, 3, 2, 10, 0)
+
+        self.runner.run_job("campaign", scheduled_for)
+        self.assertEqual(self.job_runs.runs["campaign:2026-03-02T10:00"]["status"], "interrupted")
+        self.runner.run_job("campaign", scheduled_for)
+        self.assertEqual(self.job_runs.runs["campaign:2026-03-02T10:00"]["status"], "succeeded")
+        self.assertEqual(results, [])
+
+    def test_run_is_not_retried_past_max_attempts(self):
+        self.runner.add_daily_job("broken", lambda run_key: 1 / 0, hour=11)
+        self.lease.is_leader = True
+        for _ in range(5):
+            self.runner.run_job("broken", datetime(2026, 3, 2, 11, 0))
+        self.assertEqual(self.job_runs.runs["broken:2026-03-02T11:00"]["attempts"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import time
+import unittest
+import uuid
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+
+from Database.JobRunHistory import JobRunHistory, JOB_RUN_COLLECTION_NAME
+from Database.LeaderLease import LeaderLease, LEADER_LEASE_COLLECTION_NAME
+from UnitTest.MongoTestSupport import TEST_MONGO_URI, mongo_available
+
+
+class FakeLeaseCollection:
+    """
+    The subset of a pymongo collection LeaderLease uses, with the same matching and upsert semantics.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def _matches(self, document, query):
+        if document is None or document["_id"] != query["_id"]:
+            return False
+        if "owner_id" in query and document["owner_id"] != query["owner_id"]:
+            return False
+        return "$or" not in query or any(
+            document["owner_id"] == clause["owner_id"] if "owner_id" in clause
+            else document["expires_at"] <= clause["expires_at"]["$lte"]
+            for clause in query["$or"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        document = self.documents.get(query["_id"])
+        if self._matches(document, query):
+            document.update(update["$set"])
+            return dict(document)
+        if not upsert:
+            return None
+        if document is not None:
+            # The real upsert inserts a new document with the same _id, which the unique index rejects
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.documents[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+        return dict(self.documents[query["_id"]])
+
+    def delete_one(self, query):
+        if self._matches(self.documents.get(query["_id"]), query):
+            del self.documents[query["_id"]]
+
+
+class TestLeaderLeaseWithFakeCollection(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeLeaseCollection()
+        self.database_provider = lambda: {LEADER_LEASE_COLLECTION_NAME: self.collection}
+
+    def lease(self, owner_id, ttl_seconds=60):
+        return LeaderLease("scheduler", owner_id=owner_id, ttl_seconds=ttl_seconds,
+                           database_provider=self.database_provider)
+
+    def test_held_lease_rejects_other_owners(self):
+        first, second = self.lease("first"), self.lease("second")
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+        self.assertTrue(first.try_acquire())
+        self.assertEqual((first.is_leader, second.is_leader), (True, False))
+        self.assertEqual(self.collection.documents["scheduler"]["owner_id"], "first")
+        self.assertEqual((first.get_metrics()["acquired"], first.get_metrics()["renewed"]), (1, 1))
+
+    def test_expired_lease_is_taken_over(self):
+        first, second = self.lease("first", ttl_seconds=0), self.lease("second")
+        self.assertTrue(first.try_acquire())
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.try_acquire())
+        self.assertEqual(self.collection.documents["scheduler"]["owner_id"], "second")
+
+    def test_release_only_deletes_own_lease(self):
+        first, second = self.lease("first"), self.lease("second")
+        self.assertTrue(first.try_acquire())
+        second.release()
+        self.assertIn("scheduler", self.collection.documents)
+
+        first.release()
+        self.assertFalse(first.is_leader)
+        self.assertTrue(second.try_acquire())
+
+
+@unittest.skipUnless(mongo_available(), "MongoDB is not running locally")
+class TestLeaderLease(unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient(TEST_MONGO_URI)
+        self.database_name = f"saleadvisor_test_{uuid.uuid4().hex[:8]}"
+        self.database_provider = lambda: self.client[self.database_name]
+
+    def tearDown(self):
+        self.client.drop_database(self.database_name)
+        self.client.close()
+
+    def lease(self, owner_id, ttl_seconds=60):
+        return LeaderLease("scheduler", owner_id=owner_id, ttl_seconds=ttl_seconds,
+                           database_provider=self.database_provider)
+
+    def test_only_one_owner_holds_the_lease(self):
+        workers = [self.lease(f"worker-{i}") for i in range(4)]
+        self.assertEqual([worker.try_acquire() for worker in workers], [True, False, False, False])
+        self.assertTrue(workers[0].try_acquire())
+        self.assertEqual([worker.is_leader for worker in workers], [True, False, False, False])
+
+    def test_expired_or_released_lease_is_taken_over(self):
+        first, second = self.lease("first", ttl_seconds=1), self.lease("second", ttl_seconds=1)
+        self.assertTrue(first.try_acquire())
+        time.sleep(1.1)
+        self.assertFalse(first.is_leader)
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.try_acquire())
+
+        second.release()
+        self.assertTrue(first.try_acquire())
+
+    def test_job_run_is_claimed_once(self):
+        history = JobRunHistory(database_provider=self.database_provider)
+        self.assertTrue(history.start("check_inactivity", "check_inactivity:2026-01-01T10:00", "first"))
+        self.assertFalse(history.start("check_inactivity", "check_inactivity:2026-01-01T10:00", "second"))
+        history.finish("check_inactivity:2026-01-01T10:00", "succeeded", result={"sent": 3})
+
+        run = self.client[self.database_name][JOB_RUN_COLLECTION_NAME].find_one()
+        self.assertEqual((run["owner_id"], run["status"], run["result"]), ("first", "succeeded", {"sent": 3}))
+        self.assertGreaterEqual(run["duration_seconds"], 0)
+        self.assertEqual(len(history.recent("check_inactivity")), 1)
+
+    def test_unfinished_run_is_taken_over_by_another_owner(self):
+        history = JobRunHistory(database_provider=self.database_provider)
+        run_key = "check_inactivity:2026-01-01T10:00"
+        self.assertTrue(history.start("check_inactivity", run_key, "first"))
+        self.assertFalse(history.take_over(run_key, "first"))
+        self.assertTrue(history.take_over(run_key, "second"))
+        history.finish(run_key, "interrupted")
+        self.assertTrue(history.take_over(run_key, "second"))
+        self.assertFalse(history.take_over(run_key, "third"))
+
+        run = self.client[self.database_name][JOB_RUN_COLLECTION_NAME].find_one()
+        self.assertEqual((run["owner_id"], run["attempts"]), ("second", 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from Service.ChatService.MessageClassifier import MessageClassifier, NaiveBayesClassifier, normalize_message, \
+    looks_like_question
+
+TRAINING_SAMPLES = [
+    ("cho em đặt lịch chiều mai", "booking"),
+    ("mình muốn hẹn 3h chiều nay", "booking"),
+    ("cho chị giữ chỗ tối nay 7h", "booking"),
+    ("tối mai còn chỗ không em", "booking"),
+    ("giá bấm huyệt bao nhiêu", "other"),
+    ("phòng khám ở đâu vậy", "other"),
+    ("có gửi xe ô tô được không", "other"),
+    ("bấm huyệt có đau không em", "other"),
+] * 30
+
+
+class TestMessageClassifier(unittest.TestCase):
+    def setUp(self):
+        self.llm_calls = []
+        self.recorded = []
+
+        def llm_classifier(message):
+            self.llm_calls.append(message)
+            return "other"
+
+        self.classifier = MessageClassifier(llm_classifier=llm_classifier,
+                                            training_loader=lambda: TRAINING_SAMPLES,
+                                            training_recorder=lambda message, label: self.recorded.append(label),
+                                            confidence_threshold=0.9)
+
+    def test_normalize_message(self):
+        self.assertEqual(normalize_message("  Giá  bao nhiêu?? "), "giá bao nhiêu")
+
+    def test_booking_rules_alone_do_not_skip_llm(self):
+        self.assertEqual(self.classifier.classify("Cho em ĐẶT LỊCH 5h chiều nhé"), "other")
+        self.assertEqual(len(self.llm_calls), 1)
+
+    def test_booking_rules_raise_model_confidence(self):
+        self.classifier.confidence_threshold = 1.0
+        self.classifier.rule_confidence_boost = 0.5
+        self.classifier.train()
+        self.assertEqual(self.classifier.classify("Cho em ĐẶT LỊCH 5h chiều nhé"), "booking")
+        self.assertEqual(self.llm_calls, [])
+        self.assertEqual(self.classifier.get_metrics()["rules"], 1)
+
+    def test_rules_keep_accents(self):
+        self.classifier.train()
+        self.classifier.rule_confidence_boost = 1.0
+        self.assertFalse(any(pattern.search(normalize_message("dắt chó vào"))
+                             for pattern in self.classifier.booking_patterns))
+        self.assertTrue(any(pattern.search(normalize_message("dat cho 7h toi nay"))
+                            for pattern in self.classifier.booking_patterns))
+
+    def test_questions_are_not_labelled_booking_locally(self):
+        self.classifier.train()
+        self.classifier.rule_confidence_boost = 1.0
+        for message in ("Có cần đặt lịch trước không ạ?", "dắt chó vào được không", "tối mai còn chỗ không"):
+            self.assertTrue(looks_like_question(message))
+            self.assertEqual(self.classifier.classify(message), "other")
+        self.assertEqual(len(self.llm_calls), 3)
+
+    def test_llm_result_is_cached_and_recorded(self):
+        self.assertEqual(self.classifier.classify("Xin chào!"), "other")
+        self.assertEqual(self.classifier.classify("xin chào"), "other")
+        self.assertEqual(len(self.llm_calls), 1)
+        self.assertEqual(self.recorded, ["other"])
+        self.assertEqual(self.classifier.get_metrics()["cache"], 1)
+
+    def test_trained_model_answers_confident_messages(self):
+        self.classifier.train()
+        self.assertEqual(self.classifier.classify("giá bấm huyệt bao nhiêu vậy"), "other")
+        self.assertEqual(self.classifier.classify("cho chị giữ chỗ tối nay 7h"), "booking")
+        self.assertEqual(self.llm_calls, [])
+        self.assertEqual(self.classifier.get_metrics()["model"], 2)
+
+    def test_naive_bayes_is_unsure_about_unseen_text(self):
+        model = NaiveBayesClassifier().fit(TRAINING_SAMPLES)
+        _, confidence = model.predict("thời tiết hôm nay thế nào")
+        self.assertLess(confidence, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,17 @@
 import unittest
+from unittest import mock
 
+import openai
+
+from Database.Connection import config_cache
 from Service.ChatService.OpenAIChatService import OpenAIChatService
 
+SYSTEM_MESSAGE = {"role": "system", "content": "prompt"}
+
+
+def completion(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
 
 class TestOpenAIChatService(unittest.TestCase):
     def setUp(self):
@@ -64,5 +74,64 @@ class TestOpenAIChatService(unittest.TestCase):
         self.assertEqual(self.chat_service.correct_price_in_response(test_input), expected)
 
 
+class TestResponseCaching(unittest.TestCase):
+    def setUp(self):
+        self.chat_service = OpenAIChatService(openai_key="dummy", model="dummy")
+
+    def ask(self, question, chat_history, content):
+        with mock.patch.object(openai.ChatCompletion, "create", return_value=completion(content)) as create:
+            reply = self.chat_service.complete_question(question, SYSTEM_MESSAGE, chat_history, [])
+        return reply["content"], create.call_count
+
+    def test_reply_written_from_one_users_history_is_not_served_to_another(self):
+        first_history = [{"role": "assistant", "content": "Anh muốn đặt lịch 15h chiều nay phải không ạ?"}]
+        second_history = [{"role": "assistant", "content": "Dạ bên em mở cửa từ 9h đến 21h ạ"}]
+        booked = "Dạ vậy em giữ lịch 15h chiều nay cho anh nhé."
+
+        self.assertEqual(self.ask("ok", first_history, booked), (booked, 1))
+        self.assertEqual(self.ask("Ok!", second_history, "Dạ em cảm ơn anh"), ("Dạ em cảm ơn anh", 1))
+        self.assertEqual(self.ask("Còn chỗ đậu xe không ạ?", first_history, "Dạ có ạ"), ("Dạ có ạ", 1))
+        self.assertEqual(self.ask("Còn chỗ đậu xe không ạ?", second_history, "Dạ còn ạ"), ("Dạ còn ạ", 1))
+
+    def test_first_message_questions_are_cached(self):
+        self.assertEqual(self.ask("Giá bấm huyệt bao nhiêu vậy?", [], "Dạ 390k ạ"), ("Dạ 390k ạ", 1))
+        self.assertEqual(self.ask("giá bấm huyệt bao nhiêu vậy", [], "other"), ("Dạ 390k ạ", 0))
+
+        # Acknowledgements and short fragments always go to the model
+        self.assertEqual(self.ask("ok", [], "Dạ vâng ạ"), ("Dạ vâng ạ", 1))
+        self.assertEqual(self.ask("ok", [], "Dạ ạ"), ("Dạ ạ", 1))
+
+
+class TestSystemMessage(unittest.TestCase):
+    FAQ_SECTIONS = {
+        "Giá bấm huyệt": "Giá bấm huyệt: 390.000đ/1 suất\n",
+        "Địa chỉ": "Địa chỉ: 12 Nguyễn Trãi, Quận 1\n",
+        "Giờ mở cửa": "Giờ mở cửa: 8h - 20h hằng ngày\n",
+    }
+
+    def setUp(self):
+        config_cache.invalidate()
+        self.addCleanup(config_cache.invalidate)
+        for name, value in [("get_faq_sections", lambda: self.FAQ_SECTIONS),
+                            ("render_base_prompt", lambda include_welcome: "prompt\n")]:
+            patcher = mock.patch.object(OpenAIChatService, name, side_effect=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_whole_faq_is_sent_while_it_fits_the_budget(self):
+        chat_service = OpenAIChatService(openai_key="dummy", model="dummy")
+        system_message = chat_service.get_system_message(include_welcome=False)
+        self.assertEqual(system_message["content"], "prompt\n" + "\n".join(self.FAQ_SECTIONS.values()))
+
+    def test_question_without_faq_hits_still_gets_the_faq(self):
+        chat_service = OpenAIChatService(openai_key="dummy", model="dummy", faq_token_budget=30)
+        system_message = chat_service.get_system_message(include_welcome=False)
+        self.assertTrue(callable(system_message))
+
+        self.assertIn("Nguyễn Trãi", system_message("Địa chỉ ở đâu vậy")["content"])
+        self.assertNotIn("390.000", system_message("Địa chỉ ở đâu vậy")["content"])
+        self.assertIn("390.000", system_message("ok")["content"])
+
+
 if __name__ == '__main__':
     unittest.main()
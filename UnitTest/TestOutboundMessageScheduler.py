@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+
+from Service.DelayScheduler import DelayScheduler
+from Service.OutboundMessageScheduler import OutboundMessageScheduler
+
+
+class TestOutboundMessageScheduler(unittest.TestCase):
+    def setUp(self):
+        self.delay_scheduler = DelayScheduler(worker_count=2, name="test-outbound")
+        self.outbound = OutboundMessageScheduler(self.delay_scheduler)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.delay_scheduler.shutdown()
+
+    def record(self, recipient_id, text):
+        with self.lock:
+            self.sent.append((recipient_id, text, time.monotonic()))
+
+    def wait_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.outbound.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_sends_keep_order_and_delay_per_recipient(self):
+        started = time.monotonic()
+        self.outbound.send("user", self.record, "user", "main")
+        self.outbound.send("user", self.record, "user", "follow up", delay=0.2)
+        self.outbound.send("user", self.record, "user", "last")
+        self.wait_until_idle()
+
+        self.assertEqual([text for _, text, _ in self.sent], ["main", "follow up", "last"])
+        self.assertGreaterEqual(self.sent[1][2] - started, 0.2)
+        self.assertEqual(self.outbound.get_metrics()["sent"], 3)
+
+    def test_delays_do_not_block_other_recipients(self):
+        started = time.monotonic()
+        for i in range(200):
+            self.outbound.send(i, self.record, i, "main")
+            self.outbound.send(i, self.record, i, "follow up", delay=0.2)
+        self.wait_until_idle()
+
+        self.assertEqual(len(self.sent), 400)
+        # 200 paced conversations on 2 workers take one delay, not 200
+        self.assertLess(time.monotonic() - started, 2)
+        for i in range(200):
+            self.assertEqual([text for recipient, text, _ in self.sent if recipient == i], ["main", "follow up"])
+
+    def test_failed_send_does_not_stop_the_queue(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        self.outbound.send("user", fail)
+        self.outbound.send("user", self.record, "user", "after failure")
+        self.wait_until_idle()
+
+        self.assertEqual([text for _, text, _ in self.sent], ["after failure"])
+        self.assertEqual(self.outbound.get_metrics()["failed"], 1)
+
+    def test_drain_sends_queued_messages_without_pauses(self):
+        self.outbound.send("user", self.record, "user", "main")
+        self.outbound.send("user", self.record, "user", "follow up", delay=30)
+        self.outbound.send("user", self.record, "user", "last", delay=30)
+
+        self.assertTrue(self.outbound.drain(timeout=5))
+        self.assertEqual([text for _, text, _ in self.sent], ["main", "follow up", "last"])
+        self.assertEqual(self.outbound.pending_count(), 0)
+
+    def test_send_that_cannot_be_scheduled_does_not_block_the_recipient(self):
+        self.delay_scheduler.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.outbound.send("user", self.record, "user", "lost")
+        self.assertEqual(self.outbound.pending_count("user"), 0)
+        self.assertEqual(self.outbound.get_metrics()["failed"], 1)
+
+        self.delay_scheduler = DelayScheduler(worker_count=1, name="test-outbound")
+        self.outbound.scheduler = self.delay_scheduler
+        self.outbound.send("user", self.record, "user", "next")
+        self.wait_until_idle()
+        self.assertEqual([text for _, text, _ in self.sent], ["next"])
+
+
+if __name__ == '__main__':
+    unittest.main()
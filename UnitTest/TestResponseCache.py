@@ -0,0 +1,66 @@
+import unittest
+
+from Database.ConfigCache import ConfigCache
+from Service.ChatService.ResponseCache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.version = 1
+        self.cache = ResponseCache(maxsize=3, similarity_threshold=0.7, version_provider=lambda: self.version)
+        self.reply = {"role": "assistant", "content": "Dạ giá 390.000đ/1 suất ạ"}
+
+    def test_exact_and_similar_questions_hit(self):
+        self.cache.put("Giá bấm huyệt bao nhiêu?", self.reply, "returning")
+
+        self.assertEqual(self.cache.get("giá bấm huyệt bao nhiêu", "returning"), self.reply)
+        self.assertEqual(self.cache.get("Giá bấm huyệt bao nhiêu vậy", "returning"), self.reply)
+        self.assertIsNone(self.cache.get("Phòng khám mở cửa mấy giờ", "returning"))
+
+        metrics = self.cache.get_metrics()
+        self.assertEqual((metrics["exact_hits"], metrics["similar_hits"], metrics["misses"]), (1, 1, 1))
+
+    def test_scope_and_numbers_must_match(self):
+        self.cache.put("Giá cho 3 người bao nhiêu", self.reply, "returning")
+
+        self.assertIsNone(self.cache.get("Giá cho 3 người bao nhiêu", "new"))
+        self.assertIsNone(self.cache.get("Giá cho 5 người bao nhiêu", "returning"))
+
+    def test_config_version_change_clears_cache(self):
+        self.cache.put("Giá bấm huyệt bao nhiêu", self.reply, "returning")
+        self.version = 2
+        self.assertIsNone(self.cache.get("Giá bấm huyệt bao nhiêu", "returning"))
+
+    def test_config_change_event_clears_cache(self):
+        config_cache = ConfigCache()
+        cache = ResponseCache(version_provider=lambda: config_cache.generation)
+        cache.put("Giá bấm huyệt bao nhiêu", self.reply)
+
+        # What the change stream watcher does on a faq change: invalidate without touching `version`
+        config_cache.invalidate()
+        self.assertIsNone(config_cache.version)
+        self.assertIsNone(cache.get("Giá bấm huyệt bao nhiêu"))
+
+    def test_accents_distinguish_questions(self):
+        self.cache.put("Có chỗ đậu xe không", self.reply)
+        self.assertIsNone(self.cache.get("Có chỗ đau xé không"))
+        self.assertIsNotNone(self.cache.get("có chỗ đậu xe không"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for question in ["câu hỏi một", "câu hỏi hai", "câu hỏi ba"]:
+            self.cache.put(question, self.reply)
+        self.cache.get("câu hỏi một")
+        self.cache.put("địa chỉ ở đâu", self.reply)
+
+        self.assertIsNotNone(self.cache.get("câu hỏi một"))
+        self.assertEqual(self.cache.get_metrics()["entries"], 3)
+        self.assertEqual(self.cache.get_metrics()["evictions"], 1)
+
+    def test_cached_reply_is_a_copy(self):
+        self.cache.put("Giá bấm huyệt bao nhiêu", self.reply)
+        self.cache.get("Giá bấm huyệt bao nhiêu")["content"] = "changed"
+        self.assertEqual(self.cache.get("Giá bấm huyệt bao nhiêu")["content"], self.reply["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import time
+import unittest
+import uuid
+
+from pymongo import MongoClient
+
+from Service.SharedState.InMemorySharedStateBackend import InMemorySharedStateBackend
+from Service.SharedState.MongoSharedStateBackend import MongoSharedStateBackend
+from UnitTest.MongoTestSupport import TEST_MONGO_URI, mongo_available
+
+
+class SharedStateBackendTests:
+    """
+    Behaviour every backend must provide; mixed into one TestCase per backend.
+    """
+
+    def test_message_is_processed_once(self):
+        self.assertTrue(self.backend.mark_message_processed("mid-1"))
+        self.assertFalse(self.backend.mark_message_processed("mid-1"))
+        self.assertTrue(self.backend.mark_message_processed("mid-2"))
+
+    def test_claim_waits_for_quiet_period(self):
+        self.backend.append_message("user", "xin chào")
+        self.backend.append_message("user", "giá bao nhiêu")
+        self.backend.append_message("user", "xin chào")
+
+        self.assertIsNone(self.backend.claim_messages("user", quiet_seconds=5))
+        time.sleep(0.05)
+        self.assertEqual(self.backend.claim_messages("user", quiet_seconds=0.01), ["xin chào", "giá bao nhiêu"])
+        # A second worker flushing the same user gets nothing
+        self.assertEqual(self.backend.claim_messages("user", quiet_seconds=0.01), [])
+
+    def test_permission_cache(self):
+        self.assertIsNone(self.backend.get_permission("user"))
+        self.backend.set_permission("user", False)
+        self.assertFalse(self.backend.get_permission("user"))
+        self.assertTrue(self.backend.delete_permission("user"))
+        self.assertFalse(self.backend.delete_permission("user"))
+        self.assertIsNone(self.backend.get_permission("user"))
+
+
+class TestInMemorySharedStateBackend(SharedStateBackendTests, unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemorySharedStateBackend()
+
+
+@unittest.skipUnless(mongo_available(), "MongoDB is not running locally")
+class TestMongoSharedStateBackend(SharedStateBackendTests, unittest.TestCase):
+    def setUp(self):
+        self.client = MongoClient(TEST_MONGO_URI)
+        self.database_name = f"saleadvisor_test_{uuid.uuid4().hex[:8]}"
+        self.backend = MongoSharedStateBackend(database_provider=lambda: self.client[self.database_name])
+
+    def tearDown(self):
+        self.client.drop_database(self.database_name)
+        self.client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
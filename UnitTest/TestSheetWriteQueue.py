@@ -0,0 +1,109 @@
+import json
+import unittest
+
+import gspread
+import requests
+
+from Database.SheetWriteQueue import SheetWriteQueue
+
+
+def build_api_error(code):
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": "Quota exceeded"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    def __init__(self, failures=0, error_factory=lambda: build_api_error(429)):
+        self.failures = failures
+        self.error_factory = error_factory
+        self.batches = []
+        self.appended = []
+
+    def fail_if_needed(self):
+        if self.failures:
+            self.failures -= 1
+            raise self.error_factory()
+
+    def batch_update(self, data, value_input_option=None):
+        self.fail_if_needed()
+        self.batches.append(data)
+
+    def append_rows(self, rows):
+        self.fail_if_needed()
+        first_row = len(self.appended) + 2
+        self.appended.extend(rows)
+        return {"updates": {"updatedRange": f"Booking!A{first_row}:D{first_row + len(rows) - 1}"}}
+
+
+class TestSheetWriteQueue(unittest.TestCase):
+    def setUp(self):
+        self.sheets = {"Customer": FakeWorksheet(), "Booking": FakeWorksheet()}
+        self.queue = SheetWriteQueue(sheet_loader=self.sheets.get, max_batch_size=1000,
+                                     flush_interval_seconds=3600, backoff_seconds=0)
+
+    def tearDown(self):
+        self.queue.stop()
+
+    def test_cell_updates_are_coalesced_into_one_batch(self):
+        for row in range(2, 52):
+            self.queue.update_cell("Customer", row, 4, False)
+        self.queue.update_cell("Customer", 2, 4, True)
+        self.queue.flush()
+
+        self.assertEqual(len(self.sheets["Customer"].batches), 1)
+        batch = self.sheets["Customer"].batches[0]
+        self.assertEqual(len(batch), 50)
+        self.assertIn({"range": "D2", "values": [[True]]}, batch)
+
+    def test_appends_call_hook_with_row_range(self):
+        ranges = []
+        self.queue.register_append_hook("Booking", lambda sheet, first, last: ranges.append((first, last)))
+        self.queue.append_row("Booking", ["t1", "1", "An", "hi"])
+        self.queue.append_row("Booking", ["t2", "2", "Binh", "hello"])
+        self.queue.flush()
+
+        self.assertEqual(len(self.sheets["Booking"].appended), 2)
+        self.assertEqual(ranges, [(2, 3)])
+
+    def test_quota_errors_are_retried(self):
+        self.sheets["Customer"].failures = 2
+        self.queue.update_cell("Customer", 2, 3, True)
+        self.queue.flush()
+
+        self.assertEqual(len(self.sheets["Customer"].batches), 1)
+        self.assertEqual(self.queue.get_metrics()["retries"], 2)
+        self.assertEqual(self.queue.pending_count(), 0)
+
+    def test_network_errors_are_retried(self):
+        self.sheets["Booking"] = FakeWorksheet(failures=2, error_factory=requests.exceptions.ConnectionError)
+        self.queue.append_row("Booking", ["t1", "1", "An", "hi"])
+        self.queue.flush()
+
+        self.assertEqual(len(self.sheets["Booking"].appended), 1)
+        self.assertEqual(self.queue.get_metrics()["retries"], 2)
+
+    def test_failed_batch_is_requeued_unless_permanent(self):
+        self.queue.max_retries = 0
+        self.sheets["Booking"] = FakeWorksheet(failures=1, error_factory=requests.exceptions.Timeout)
+        self.queue.append_row("Booking", ["t1", "1", "An", "hi"])
+        self.queue.flush()
+        self.assertEqual(self.queue.pending_count(), 1)
+        self.queue.flush()
+        self.assertEqual(len(self.sheets["Booking"].appended), 1)
+
+        # The sheet could not be loaded at all
+        self.queue.append_row("Missing", ["t2"])
+        self.queue.flush()
+        self.assertEqual(self.queue.pending_count(), 1)
+
+        self.sheets["Customer"] = FakeWorksheet(failures=1, error_factory=lambda: build_api_error(400))
+        self.queue.update_cell("Customer", 2, 3, True)
+        self.queue.flush()
+        # The rejected update is dropped; only the row for the missing sheet is still pending
+        self.assertEqual(self.queue.pending_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
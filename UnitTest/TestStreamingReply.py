@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+import openai
+
+from Service.ChatService.OpenAIChatService import OpenAIChatService
+from Service.ChatService.ReplyParts import first_block_to_send, join_text_and_json, remove_sent_prefix, \
+    split_text_and_json
+
+SYSTEM_MESSAGE = {"role": "system", "content": "prompt"}
+
+
+def sse_chunks(*deltas):
+    return [{"choices": [{"delta": delta}]} for delta in deltas]
+
+
+class TestStreamingReply(unittest.TestCase):
+    def setUp(self):
+        self.chat_service = OpenAIChatService(openai_key="dummy", model="dummy", enable_response_cache=False)
+        self.blocks = []
+
+    def stream(self, *deltas):
+        with mock.patch.object(openai.ChatCompletion, "create", return_value=iter(sse_chunks(*deltas))) as create:
+            reply = self.chat_service.complete_question("câu hỏi", SYSTEM_MESSAGE, [], [],
+                                                        on_first_block=self.blocks.append)
+        self.assertTrue(create.call_args.kwargs["stream"])
+        return reply
+
+    def send_first_block(self, follow_up_keywords=()):
+        """
+        What ChatMessageHandler.send_first_block sends for the streamed block, or None.
+        """
+        self.assertEqual(len(self.blocks), 1)
+        return first_block_to_send(self.chat_service.convert_markdown_bold_to_unicode(self.blocks[0]),
+                                   follow_up_keywords)
+
+    def test_first_block_is_sent_once(self):
+        reply = self.stream({"role": "assistant"}, {"content": "Dạ em chào **anh** ạ."}, {"content": "\n\nCơ sở"},
+                            {"content": " ở Hà Nội ạ.\n\nAnh cần"}, {"content": " thêm gì không ạ?"})
+
+        sent = self.send_first_block()
+        content = self.chat_service.convert_markdown_bold_to_unicode(reply["content"])
+        remaining = remove_sent_prefix(content, sent)
+
+        self.assertEqual(sent, self.chat_service.convert_markdown_bold_to_unicode("Dạ em chào **anh** ạ."))
+        self.assertEqual(remaining, "Cơ sở ở Hà Nội ạ.\n\nAnh cần thêm gì không ạ?")
+        self.assertNotIn(sent, remaining)
+
+    def test_sent_prefix_ignores_whitespace_differences(self):
+        self.assertEqual(remove_sent_prefix("Dạ chào anh,\n em là trợ lý.\n\nPhần sau", "Dạ chào anh, em là trợ lý."),
+                         "Phần sau")
+        self.assertEqual(remove_sent_prefix("Nội dung khác", "Dạ chào anh"), "Nội dung khác")
+
+    def test_follow_up_first_block_is_held_back(self):
+        reply = self.stream({"content": "Anh có muốn đặt lịch hẹn không ạ?\n\n"}, {"content": "Dạ giá 200k ạ."})
+
+        self.assertIsNone(self.send_first_block(follow_up_keywords=["đặt lịch hẹn"]))
+        # Nothing was sent, so the full reply goes out unchanged
+        self.assertEqual(remove_sent_prefix(reply["content"], None), reply["content"])
+
+    def test_function_call_reply_sends_nothing_early(self):
+        reply = self.stream({"function_call": {"name": "send_", "arguments": ""}},
+                            {"function_call": {"name": "introduce", "arguments": "{\"a\":"}},
+                            {"function_call": {"arguments": " 1}\n\n"}})
+
+        self.assertEqual(self.blocks, [])
+        self.assertEqual(reply["function_call"], {"name": "send_introduce", "arguments": "{\"a\": 1}\n\n"})
+        self.assertIsNone(reply["content"])
+
+    def test_json_block_is_held_back_and_text_before_it_sent_once(self):
+        self.stream({"content": "```json\n{\"title\": \"Bảng giá\"}\n```\n\nDạ anh xem ạ."})
+        self.assertIsNone(self.send_first_block())
+
+        self.blocks = []
+        reply = self.stream({"content": "Dạ anh xem bảng giá ạ.\n\n```json\n{\"title\": "},
+                            {"content": "\"Bảng giá\"}\n```"})
+        sent = self.send_first_block()
+        text_part, json_part = split_text_and_json(reply["content"])
+
+        self.assertEqual(sent, "Dạ anh xem bảng giá ạ.")
+        self.assertEqual(remove_sent_prefix(text_part, sent), "")
+        self.assertEqual(json_part, "{\"title\": \"Bảng giá\"}")
+
+        # The template goes out without the streamed paragraph, while the history keeps the whole answer
+        self.assertEqual(join_text_and_json(remove_sent_prefix(text_part, sent), json_part), json_part)
+        self.assertEqual(join_text_and_json(text_part, json_part), f"Dạ anh xem bảng giá ạ.\n\n{json_part}")
+
+
+if __name__ == '__main__':
+    unittest.main()
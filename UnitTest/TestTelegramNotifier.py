@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from telegram.error import InvalidToken, RetryAfter
+
+from Service.MessageService.TelegramNotifier import TelegramNotifier
+
+
+class FakeBot:
+    def __init__(self, token, fail_with=None):
+        self.token = token
+        self.fail_with = list(fail_with or [])
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.fail_with:
+            raise self.fail_with.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+class TestTelegramNotifier(unittest.TestCase):
+    def create_notifier(self, fail_with=None, **kwargs):
+        self.bots = []
+
+        def bot_factory(token):
+            bot = FakeBot(token, fail_with)
+            self.bots.append(bot)
+            return bot
+
+        notifier = TelegramNotifier("token", "group", bot_factory=bot_factory, **kwargs)
+        self.addCleanup(notifier.shutdown, 1)
+        return notifier
+
+    def wait_until_sent(self, notifier, timeout=5):
+        deadline = time.monotonic() + timeout
+        while notifier.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_alerts_within_window_are_batched(self):
+        notifier = self.create_notifier(batch_window_seconds=0.2, min_interval_seconds=0)
+        for i in range(3):
+            self.assertTrue(notifier.notify(f"alert {i}"))
+        self.wait_until_sent(notifier)
+
+        self.assertEqual(len(self.bots[0].sent), 1)
+        self.assertEqual(self.bots[0].sent[0][1], "alert 0\n\nalert 1\n\nalert 2")
+        self.assertEqual(notifier.get_metrics()["alerts_sent"], 3)
+
+    def test_messages_are_rate_limited(self):
+        notifier = self.create_notifier(batch_window_seconds=0, max_batch_size=1, min_interval_seconds=0.2)
+        notifier.notify("first")
+        notifier.notify("second")
+        self.wait_until_sent(notifier)
+
+        (_, _, first_at), (_, _, second_at) = self.bots[0].sent
+        self.assertGreaterEqual(second_at - first_at, 0.19)
+
+    def test_retry_after_is_respected(self):
+        notifier = self.create_notifier(fail_with=[RetryAfter(0)], batch_window_seconds=0, min_interval_seconds=0)
+        notifier.notify("alert")
+        self.wait_until_sent(notifier)
+
+        self.assertEqual([text for _, text, _ in self.bots[0].sent], ["alert"])
+
+    def test_invalid_token_drops_alerts_instead_of_blocking(self):
+        def bot_factory(token):
+            raise InvalidToken()
+
+        notifier = TelegramNotifier("", "group", bot_factory=bot_factory, batch_window_seconds=0)
+        self.assertTrue(notifier.notify("alert"))
+        self.wait_until_sent(notifier)
+
+        self.assertEqual(notifier.pending_count(), 0)
+        self.assertEqual(notifier.get_metrics()["alerts_failed"], 1)
+        started = time.monotonic()
+        notifier.shutdown(timeout=5)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_unexpected_errors_do_not_stop_the_consumer(self):
+        notifier = self.create_notifier(fail_with=[ValueError("boom")], batch_window_seconds=0,
+                                        min_interval_seconds=0)
+        notifier.notify("lost")
+        self.wait_until_sent(notifier)
+        notifier.notify("delivered")
+        self.wait_until_sent(notifier)
+
+        self.assertEqual([text for _, text, _ in self.bots[0].sent], ["delivered"])
+        self.assertEqual(notifier.get_metrics()["alerts_failed"], 1)
+
+    def test_concurrent_first_notifies_all_queue(self):
+        notifier = self.create_notifier(batch_window_seconds=0.2, min_interval_seconds=0)
+        errors = []
+
+        def notify(i):
+            try:
+                notifier.notify(f"alert {i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=notify, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wait_until_sent(notifier)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(notifier.get_metrics()["alerts_sent"], 20)
+
+    def test_pack_splits_batches_over_the_telegram_limit(self):
+        text, count, leftover = TelegramNotifier.pack(["a" * 3000, "b" * 3000, "c"])
+        self.assertEqual((len(text), count, leftover), (3000, 1, ["b" * 3000, "c"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from Service.MessageService.UserProfileCache import UserProfileCache
+
+
+class TestUserProfileCache(unittest.TestCase):
+    def setUp(self):
+        self.fetched = []
+        self.store = {}
+        self.names = {"user": "Nguyễn Văn A"}
+
+        def fetch(user_id):
+            self.fetched.append(user_id)
+            return self.names.get(user_id)
+
+        self.cache = UserProfileCache(fetcher=fetch, store_loader=self.store.get,
+                                      store_saver=lambda user_id, name: self.store.update({user_id: {"name": name}}))
+
+    def test_name_is_fetched_once_then_served_from_memory(self):
+        self.assertEqual(self.cache.get_name("user"), "Nguyễn Văn A")
+        self.assertEqual(self.cache.get_name("user"), "Nguyễn Văn A")
+
+        self.assertEqual(self.fetched, ["user"])
+        self.assertEqual(self.store["user"], {"name": "Nguyễn Văn A"})
+        self.assertEqual(self.cache.get_metrics()["memory_hits"], 1)
+
+    def test_store_is_used_before_the_graph_api(self):
+        self.store["other"] = {"name": "Trần Thị B"}
+
+        self.assertEqual(self.cache.get_name("other"), "Trần Thị B")
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(self.cache.get_metrics()["store_hits"], 1)
+
+    def test_failed_lookup_is_not_cached(self):
+        self.assertIsNone(self.cache.get_name("unknown"))
+        self.names["unknown"] = "Lê Văn C"
+
+        self.assertEqual(self.cache.get_name("unknown"), "Lê Văn C")
+        self.assertEqual(self.fetched, ["unknown", "unknown"])
+
+    def test_store_errors_fall_back_to_fetch(self):
+        def broken_store(user_id):
+            raise RuntimeError("mongo down")
+
+        cache = UserProfileCache(fetcher=lambda user_id: "Nguyễn Văn A", store_loader=broken_store)
+        self.assertEqual(cache.get_name("user"), "Nguyễn Văn A")
+
+
+if __name__ == '__main__':
+    unittest.main()
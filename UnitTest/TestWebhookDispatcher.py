@@ -0,0 +1,50 @@
+import threading
+import unittest
+
+from Service.WebhookDispatcher import WebhookDispatcher
+
+
+class TestWebhookDispatcher(unittest.TestCase):
+    def test_full_queue_rejects_entries(self):
+        release = threading.Event()
+        dispatcher = WebhookDispatcher(handler=lambda entry: release.wait(5), worker_count=1, max_queue_size=2)
+        dispatcher.start()
+
+        results = [dispatcher.submit({"id": i}) for i in range(5)]
+        release.set()
+        dispatcher.shutdown()
+
+        self.assertIn(False, results)
+        metrics = dispatcher.get_metrics()
+        self.assertEqual(metrics["accepted"] + metrics["rejected"], 5)
+        self.assertEqual(metrics["processed"], metrics["accepted"])
+
+    def test_batch_is_rejected_whole_when_the_queue_is_partly_full(self):
+        handled = []
+        dispatcher = WebhookDispatcher(handler=handled.append, worker_count=1, max_queue_size=4)
+        self.assertTrue(dispatcher.submit_batch([{"id": 0}, {"id": 1}]))
+
+        self.assertFalse(dispatcher.submit_batch([{"id": 2}, {"id": 3}, {"id": 4}]))
+        self.assertEqual(dispatcher.get_metrics()["queue_depth"], 2)
+        self.assertTrue(dispatcher.submit_batch([{"id": 5}, {"id": 6}]))
+
+        dispatcher.start()
+        dispatcher.shutdown()
+        self.assertEqual([entry["id"] for entry in handled], [0, 1, 5, 6])
+        metrics = dispatcher.get_metrics()
+        self.assertEqual((metrics["accepted"], metrics["rejected"]), (4, 3))
+
+    def test_shutdown_drains_queued_entries(self):
+        handled = []
+        dispatcher = WebhookDispatcher(handler=handled.append, worker_count=2, max_queue_size=100)
+        dispatcher.start()
+        for i in range(50):
+            self.assertTrue(dispatcher.submit({"id": i}))
+        dispatcher.shutdown()
+
+        self.assertEqual(len(handled), 50)
+        self.assertFalse(dispatcher.submit({"id": 50}))
+
+
+if __name__ == '__main__':
+    unittest.main()
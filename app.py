@@ -1,22 +1,60 @@
 # -*- coding: utf-8 -*-
+import atexit
+import os
 
 from flask import Flask, request, jsonify
 
-from Database.Connection import get_credentials
-from Service.ChatService.ChatMessageHandler import ChatMessageHandler
+from Database.Connection import get_credentials, check_mongo_health, get_mongo_pool_metrics, config_cache, \
+    bump_config_version
+from Database.SheetConnection import get_sheet_api_metrics, customer_mirror, sheet_write_queue
+from Service.ChatService.ChatMessageHandler import ChatMessageHandler, debounce_scheduler, outbound_scheduler, \
+    drain_schedulers
 from Service.ChatService.OpenAIChatService import OpenAIChatService
 from Service.MessageService.MessageClient import MessageClient
 from Service.TaskScheduler import TaskScheduler
+from Service.WebhookDispatcher import WebhookDispatcher
 
 app = Flask(__name__)
 
+WEBHOOK_WORKER_COUNT = int(os.getenv("WEBHOOK_WORKER_COUNT", "4"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+OPENAI_MAX_PARALLEL_REQUESTS = int(os.getenv("OPENAI_MAX_PARALLEL_REQUESTS", "4"))
+CONTEXT_HISTORY_TOKENS = int(os.getenv("CONTEXT_HISTORY_TOKENS", "1500"))
+CONTEXT_FAQ_TOKENS = int(os.getenv("CONTEXT_FAQ_TOKENS", "2500"))
+FAQ_TOP_K = int(os.getenv("FAQ_TOP_K", "5"))
+STREAM_FIRST_BLOCK = os.getenv("STREAM_FIRST_BLOCK", "true").lower() == "true"
+
+
+def shutdown_worker():
+    """
+    Finish the queued work in the order it flows: webhook entries feed the debounce buffers, their
+    flushes queue replies on the outbound scheduler and alerts on the Telegram notifier.
+    """
+    webhook_dispatcher.shutdown()
+    drain_schedulers()
+    chatgpt_bridge.telegram_notifier.shutdown()
+    task_scheduler.shutdown()
+
+
 try:
     VERIFY_TOKEN, PAGE_ACCESS_TOKEN, OPENAI_API_KEY, GPT_MODEL, RECURRING_TIME, FB_PAGE_ID, TELEGRAM_TOKEN, TELEGRAM_GROUP_ID = get_credentials()
     messenger = MessageClient(PAGE_ACCESS_TOKEN, FB_PAGE_ID)
-    chat_service = OpenAIChatService(openai_key=OPENAI_API_KEY, model=GPT_MODEL)
+    chat_service = OpenAIChatService(openai_key=OPENAI_API_KEY, model=GPT_MODEL,
+                                     max_parallel_requests=OPENAI_MAX_PARALLEL_REQUESTS,
+                                     history_token_budget=CONTEXT_HISTORY_TOKENS,
+                                     faq_token_budget=CONTEXT_FAQ_TOKENS,
+                                     faq_top_k=FAQ_TOP_K)
     chatgpt_bridge = ChatMessageHandler(chat_service=chat_service, messenger=messenger, fb_page_id=FB_PAGE_ID,
-                                        telegram_token=TELEGRAM_TOKEN, telegram_group_id=TELEGRAM_GROUP_ID)
+                                        telegram_token=TELEGRAM_TOKEN, telegram_group_id=TELEGRAM_GROUP_ID,
+                                        stream_first_block=STREAM_FIRST_BLOCK)
     task_scheduler = TaskScheduler(chatService=chatgpt_bridge.chat_service, message=messenger)
+    config_cache.start_watcher()
+    chat_service.message_classifier.start_training()
+    webhook_dispatcher = WebhookDispatcher(handler=chatgpt_bridge.handle_entry,
+                                           worker_count=WEBHOOK_WORKER_COUNT,
+                                           max_queue_size=WEBHOOK_QUEUE_SIZE)
+    webhook_dispatcher.start()
+    atexit.register(shutdown_worker)
     print("✅ Credentials retrieved successfully")
 except Exception as e:
     print(f"❌ Error retrieving credentials: {e}")
@@ -44,8 +82,10 @@ def webhook():
     if data.get('object') != 'page':
         return "Not a page object", 404
 
-    for entry in data.get('entry', []):
-        chatgpt_bridge.handle_entry(entry)
+    # Process entries on the worker pool so Facebook is acknowledged immediately; the batch is queued
+    # whole or not at all, since Facebook redelivers all of it after a 503
+    if not webhook_dispatcher.submit_batch(data.get('entry', [])):
+        return "Server busy", 503
 
     return "EVENT_RECEIVED", 200
 
@@ -56,8 +96,8 @@ def delete_cache_permission_api(user_id):
     API endpoint to delete cached permission for a user.
     """
     try:
-        if user_id in chatgpt_bridge.permission_cache:
-            ChatMessageHandler.delete_cache_permission(user_id)
+        if chatgpt_bridge.get_user_existed_on_cached(user_id):
+            chatgpt_bridge.delete_cache_permission(user_id)
             return jsonify({"message": f"Permission cache for user {user_id} has been deleted."}), 200
         else:
             return jsonify({"error": f"No cached permission found for user {user_id}."}), 404
@@ -65,6 +105,62 @@ def delete_cache_permission_api(user_id):
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@app.route('/api/refresh_config', methods=['POST'])
+def refresh_config_api():
+    """
+    API endpoint to force every worker to reload prompts, FAQ, functions and keywords.
+    """
+    try:
+        version = bump_config_version()
+        config_cache.refresh()
+        return jsonify({"message": "Config cache has been refreshed.", "version": version}), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@app.route('/api/job_runs', methods=['GET'])
+def job_runs_api():
+    """
+    API endpoint to list the latest scheduled job runs across all workers.
+    """
+    try:
+        runs = task_scheduler.job_runs.recent(job=request.args.get("job"),
+                                              limit=int(request.args.get("limit", "20")))
+        return jsonify({"runs": [{"run_key": run.pop("_id"), **run} for run in runs]}), 200
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@app.route('/api/health', methods=['GET'])
+def health_api():
+    """
+    API endpoint to report the health and connection metrics of this worker.
+    """
+    mongo_health = check_mongo_health()
+    status_code = 200 if mongo_health.get("status") == "ok" else 503
+    return jsonify({
+        "mongo": {**mongo_health, "pool": get_mongo_pool_metrics()},
+        "config_cache": config_cache.get_metrics(),
+        "sheets": {
+            "api_calls": get_sheet_api_metrics(),
+            "customer_mirror": customer_mirror.get_metrics(),
+            "write_queue": sheet_write_queue.get_metrics(),
+        },
+        "webhook": webhook_dispatcher.get_metrics(),
+        "messenger": messenger.get_metrics(),
+        "user_profiles": messenger.user_profiles.get_metrics(),
+        "debounce": debounce_scheduler.get_metrics(),
+        "outbound": outbound_scheduler.get_metrics(),
+        "telegram": chatgpt_bridge.telegram_notifier.get_metrics(),
+        "scheduler": task_scheduler.get_metrics(),
+        "follow_up": task_scheduler.follow_up_campaign.get_metrics(),
+        "ask_stages": chat_service.get_metrics(),
+        "context": chat_service.context_builder.get_metrics(),
+        "classifier": chat_service.message_classifier.get_metrics(),
+        "response_cache": chat_service.response_cache.get_metrics(),
+    }), status_code
+
+
 if __name__ == '__main__':
     app.run(port=5000, debug=True, use_reloader=False)
 